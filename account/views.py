@@ -1,3 +1,5 @@
+import logging
+
 from django.contrib.auth import authenticate, login as auth_login
 from django.shortcuts import render, redirect
 from django.contrib.auth import logout
@@ -5,6 +7,9 @@ from django.contrib.auth import logout
 from .models import User
 
 
+logger = logging.getLogger(__name__)
+
+
 def login(request):
     if request.method == 'POST':
         email = request.POST.get('email', '')
@@ -31,13 +36,11 @@ def signup(request):
         if name and email and password1 and password2:
             user = User.objects.create_user(name, email, password1)
 
-            print('User created:', user)
+            logger.info('User created: %s', user.pk)
 
             return redirect('/login/')
         else:
-            print('Somethign went wrong')
-    else:
-        print('Just show the form!')
+            logger.info('Signup rejected: missing fields')
 
     return render(request, 'account/signup.html')
 
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from . import api_views
+
+
+urlpatterns = [
+    path('slowest/', api_views.slowest_endpoints, name='api-profiling-slowest'),
+]
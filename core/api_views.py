@@ -0,0 +1,24 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .profiling import get_profiling_config, get_ring_buffer
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def slowest_endpoints(request):
+    """Endpoints with the worst p95 wall time among this process's profiled requests"""
+    ring_buffer = get_ring_buffer()
+    if ring_buffer is None:
+        return Response({'error': 'No RingBufferSink in settings.PROFILING["SINKS"].'}, status=404)
+
+    try:
+        limit = max(int(request.query_params.get('limit', 20)), 1)
+    except ValueError:
+        limit = 20
+    return Response({
+        'sample_rate': get_profiling_config()['SAMPLE_RATE'],
+        'samples': len(ring_buffer.samples),
+        'endpoints': ring_buffer.slowest_endpoints(limit),
+    })
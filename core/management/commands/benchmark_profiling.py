@@ -0,0 +1,89 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from core.profiling import get_ring_buffer
+from project.cache import get_project_cache
+from project.models import Project, ProjectNote
+
+
+BENCHMARK_EMAIL = 'profiling-benchmark@example.invalid'
+
+MIDDLEWARE = 'core.profiling.ProfilingMiddleware'
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the request overhead of ProfilingMiddleware on a list endpoint: '
+        'without it, switched off, at a sample rate, and profiling every request'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', type=float, default=0.01, help='Sample rate to measure besides 0 and 1')
+        parser.add_argument('--rows', type=int, default=20, help='Notes in the benchmark project; the list shows 20 per page')
+        parser.add_argument('--requests', type=int, default=2000, help='Timed requests per case')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the benchmark user and exit')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(email=BENCHMARK_EMAIL).delete()
+            self.stdout.write(f'Deleted {deleted} benchmark row(s)')
+            return
+
+        user, _ = User.objects.get_or_create(email=BENCHMARK_EMAIL, defaults={'name': 'Profiling benchmark'})
+        self.project, _ = Project.objects.get_or_create(name='Profiling benchmark', created_by=user)
+        existing = ProjectNote.objects.filter(project=self.project).count()
+        ProjectNote.objects.bulk_create(
+            ProjectNote(project=self.project, content=f'Note {n}') for n in range(existing, options['rows'])
+        )
+
+        without = [name for name in settings.MIDDLEWARE if name != MIDDLEWARE]
+        # Ring buffer only, so the numbers are the middleware's and not a log handler's
+        sinks = [{'BACKEND': 'core.profiling.RingBufferSink', 'OPTIONS': {'size': 1000}}]
+        cases = [('without middleware', {'MIDDLEWARE': without})] + [
+            (f'SAMPLE_RATE {rate:g}', {'PROFILING': {'SAMPLE_RATE': rate, 'SINKS': sinks}})
+            for rate in (0, options['rate'], 1)
+        ]
+        with override_settings(DEBUG=False, PROFILING={'SAMPLE_RATE': 0, 'SINKS': sinks}):
+            clients = []
+            for label, overrides in cases:
+                # A client loads its middleware, and the sample rate, on its first request
+                with override_settings(**overrides):
+                    client = Client()
+                    client.force_login(user)
+                    for _ in range(10):
+                        self.get(client)
+                clients.append(client)
+
+            # One request per case in turn, so drift in machine speed hits every case alike
+            timings = [[] for _ in cases]
+            for _ in range(options['requests']):
+                for client, case_timings in zip(clients, timings):
+                    case_timings.append(self.timed_get(client))
+            samples = len(get_ring_buffer().samples)
+
+        baseline = statistics.median(timings[0])
+        for (label, _), case_timings in zip(cases, timings):
+            median = statistics.median(case_timings)
+            self.stdout.write(
+                f'{label:<20} p50 {median * 1000:.0f}us, mean {statistics.fmean(case_timings) * 1000:.0f}us per '
+                f'request ({options["rows"]} notes), {(median - baseline) / baseline * 100:+.1f}% at p50'
+            )
+        self.stdout.write(f'{samples} sampled requests in the ring buffer')
+
+    def get(self, client):
+        response = client.get('/project-features/api/notes/', {'project_id': str(self.project.pk)})
+        if response.status_code != 200:
+            raise CommandError(f'The notes list answered {response.status_code}')
+
+    def timed_get(self, client):
+        # Measure serialization and the database, not the project cache
+        get_project_cache().bump(self.project.pk)
+        started = time.perf_counter()
+        self.get(client)
+        return (time.perf_counter() - started) * 1000
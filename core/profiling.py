@@ -0,0 +1,278 @@
+"""Sampled request profiling: wall time, SQL, duplicated queries, serializer time
+
+ProfilingMiddleware picks requests with probability
+settings.PROFILING['SAMPLE_RATE']. For a sampled request it records the
+view, wall time, DB time, query count, repeated query fingerprints (the
+N+1 pattern) and time spent in DRF serializers, and hands the sample to
+every configured sink. Unsampled requests cost one random() call.
+
+Serializer time covers serializers built on ProfiledSerializerMixin;
+nothing outside this module is patched.
+"""
+import json
+import logging
+import math
+import random
+import re
+import statistics
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILING = {
+    'SAMPLE_RATE': 0.0,
+    'DUPLICATE_THRESHOLD': 3,
+    'SINKS': [
+        {'BACKEND': 'core.profiling.RingBufferSink', 'OPTIONS': {'size': 1000}},
+    ],
+}
+
+_current_profile = ContextVar('current_profile', default=None)
+
+_IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_SPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Normalize SQL so the same query with other values or IN-list lengths matches"""
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    sql = _LITERAL_RE.sub('?', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class Profile:
+    """Measurements for one sampled request"""
+
+    def __init__(self, duplicate_threshold):
+        self.duplicate_threshold = duplicate_threshold
+        self.query_count = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.query_count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        return [
+            {'sql': sql, 'count': count}
+            for sql, count in self.fingerprints.most_common()
+            if count >= self.duplicate_threshold
+        ]
+
+    def sample(self, request, response, wall_time):
+        match = getattr(request, 'resolver_match', None)
+        return {
+            'timestamp': time.time(),
+            'method': request.method,
+            'path': request.path,
+            'route': f'{request.method} /{match.route}' if match else f'{request.method} (unresolved)',
+            'view': match._func_path if match else None,
+            'status': response.status_code,
+            'wall_ms': round(wall_time * 1000, 3),
+            'db_ms': round(self.db_time * 1000, 3),
+            'queries': self.query_count,
+            'serializer_ms': round(self.serializer_time * 1000, 3),
+            'duplicates': self.duplicates(),
+        }
+
+
+def _timed(method, *args, **kwargs):
+    """Call a serializer method, adding its time to the current profile, if any"""
+    profile = _current_profile.get()
+    if profile is None or profile.serializer_depth:
+        return method(*args, **kwargs)
+    profile.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        return method(*args, **kwargs)
+    finally:
+        profile.serializer_time += time.perf_counter() - started
+        profile.serializer_depth -= 1
+
+
+class ProfiledSerializerMixin:
+    """Count a DRF serializer's validation and rendering as serializer time
+
+    List it before the DRF base class. A many=True ListSerializer calls
+    its child for each item, so lists are counted too; nested serializers
+    are counted once, as part of their parent. Outside a sampled request
+    the cost is one context variable lookup per call.
+    """
+
+    def run_validation(self, *args, **kwargs):
+        return _timed(super().run_validation, *args, **kwargs)
+
+    def to_representation(self, *args, **kwargs):
+        return _timed(super().to_representation, *args, **kwargs)
+
+
+# Sinks
+
+
+class LogSink:
+    """One JSON line per sample on the core.profiling logger"""
+
+    def __init__(self, level='INFO'):
+        self.level = logging.getLevelName(level)
+
+    def emit(self, sample):
+        logger.log(self.level, json.dumps(sample))
+
+
+class JSONFileSink:
+    """Append samples to a JSON Lines file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, sample):
+        line = json.dumps(sample) + '\n'
+        with self._lock, open(self.path, 'a') as f:
+            f.write(line)
+
+
+class RingBufferSink:
+    """Keep the latest samples in memory for the slowest-endpoints report"""
+
+    def __init__(self, size=1000):
+        self.samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def emit(self, sample):
+        with self._lock:
+            self.samples.append(sample)
+
+    def slowest_endpoints(self, limit=20):
+        with self._lock:
+            samples = list(self.samples)
+
+        by_route = {}
+        for sample in samples:
+            by_route.setdefault(sample['route'], []).append(sample)
+
+        report = []
+        for route, route_samples in by_route.items():
+            wall = sorted(sample['wall_ms'] for sample in route_samples)
+            report.append({
+                'route': route,
+                'view': route_samples[-1]['view'],
+                'samples': len(route_samples),
+                'mean_ms': round(statistics.fmean(wall), 3),
+                'p95_ms': wall[math.ceil(len(wall) * 0.95) - 1],
+                'max_ms': wall[-1],
+                'mean_db_ms': round(statistics.fmean(sample['db_ms'] for sample in route_samples), 3),
+                'mean_queries': round(statistics.fmean(sample['queries'] for sample in route_samples), 1),
+                'mean_serializer_ms': round(
+                    statistics.fmean(sample['serializer_ms'] for sample in route_samples), 3
+                ),
+                'duplicates': route_samples[-1]['duplicates'],
+            })
+        report.sort(key=lambda row: row['p95_ms'], reverse=True)
+        return report[:limit]
+
+
+_sinks = None
+_sinks_lock = threading.Lock()
+
+
+def get_profiling_config():
+    return {**DEFAULT_PROFILING, **getattr(settings, 'PROFILING', {})}
+
+
+def get_sinks():
+    """Sinks configured by settings.PROFILING['SINKS'], built once per process"""
+    global _sinks
+    if _sinks is None:
+        with _sinks_lock:
+            if _sinks is None:
+                _sinks = [
+                    import_string(sink['BACKEND'])(**sink.get('OPTIONS', {}))
+                    for sink in get_profiling_config()['SINKS']
+                ]
+    return _sinks
+
+
+@receiver(setting_changed)
+def reset_sinks(setting, **kwargs):
+    global _sinks
+    if setting == 'PROFILING':
+        _sinks = None
+
+
+def get_ring_buffer():
+    return next((sink for sink in get_sinks() if isinstance(sink, RingBufferSink)), None)
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = get_profiling_config()
+        self.sample_rate = config['SAMPLE_RATE']
+        self.duplicate_threshold = config['DUPLICATE_THRESHOLD']
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile = Profile(self.duplicate_threshold)
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        self.emit(profile.sample(request, response, time.perf_counter() - started))
+        return response
+
+    async def __acall__(self, request):
+        # Async views run their queries in worker threads, out of reach of
+        # execute_wrapper here, so only wall time is recorded for them
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        profile = Profile(self.duplicate_threshold)
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.emit(profile.sample(request, response, time.perf_counter() - started))
+        return response
+
+    def emit(self, sample):
+        for sink in get_sinks():
+            try:
+                sink.emit(sample)
+            except Exception:
+                logger.exception('Profiling sink %s failed', type(sink).__name__)
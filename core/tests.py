@@ -1,3 +1,200 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
 
-# Create your tests here.
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.http import HttpResponse
+from rest_framework import serializers
+
+from account.models import User
+from project.models import Project, ProjectNote
+from project.serializers import ProjectNoteSerializer
+
+from .profiling import (
+    JSONFileSink, LogSink, ProfilingMiddleware, RingBufferSink, fingerprint, get_ring_buffer,
+)
+
+
+RING_BUFFER = {'BACKEND': 'core.profiling.RingBufferSink', 'OPTIONS': {'size': 100}}
+
+
+class FailingSink:
+    def emit(self, sample):
+        raise OSError('disk full')
+
+
+def profiling(sample_rate=1.0, sinks=(RING_BUFFER,)):
+    return override_settings(PROFILING={'SAMPLE_RATE': sample_rate, 'DUPLICATE_THRESHOLD': 3, 'SINKS': list(sinks)})
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_values_and_in_lists_are_normalized(self):
+        self.assertEqual(
+            fingerprint('SELECT *  FROM t WHERE id = 12 AND name = \'it\'\'s\' AND x IN (%s, %s, %s)'),
+            'SELECT * FROM t WHERE id = ? AND name = ? AND x IN (...)',
+        )
+        self.assertEqual(
+            fingerprint('SELECT 1 FROM t WHERE id IN (%s)'), fingerprint('SELECT 2 FROM t WHERE id IN (%s, %s)')
+        )
+
+
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Profiled', created_by=cls.user)
+        for n in range(3):
+            ProjectNote.objects.create(project=cls.project, content=f'Note {n}')
+
+    def call(self, get_response):
+        return ProfilingMiddleware(get_response)(RequestFactory().get('/profiled/'))
+
+    def test_sampled_request_records_queries_and_duplicates(self):
+        def view(request):
+            for note in ProjectNote.objects.filter(project=self.project):
+                Project.objects.get(pk=note.project_id)
+            return HttpResponse()
+
+        with profiling():
+            self.call(view)
+            [sample] = get_ring_buffer().samples
+
+        self.assertEqual(sample['route'], 'GET (unresolved)')
+        self.assertEqual(sample['path'], '/profiled/')
+        self.assertEqual(sample['status'], 200)
+        self.assertEqual(sample['queries'], 4)
+        self.assertGreater(sample['wall_ms'], 0)
+        [duplicate] = sample['duplicates']
+        self.assertEqual(duplicate['count'], 3)
+        self.assertIn('"project_project"', duplicate['sql'])
+
+    def test_serializer_time_counts_profiled_serializers_only(self):
+        class PlainNoteSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = ProjectNote
+                fields = ['id', 'content']
+
+        def view(serializer_class):
+            def get_response(request):
+                notes = list(ProjectNote.objects.all())
+                serializer_class(notes, many=True).data
+                serializer_class(data={'project': self.project.pk, 'content': 'New'}).is_valid()
+                return HttpResponse()
+            return get_response
+
+        with profiling():
+            self.call(view(ProjectNoteSerializer))
+            self.call(view(PlainNoteSerializer))
+            profiled, plain = get_ring_buffer().samples
+
+        self.assertGreater(profiled['serializer_ms'], 0)
+        self.assertEqual(plain['serializer_ms'], 0)
+
+    def test_drf_is_left_unpatched(self):
+        originals = (serializers.BaseSerializer.is_valid, serializers.Serializer.data, serializers.ListSerializer.data)
+        with profiling():
+            self.call(lambda request: HttpResponse())
+        self.assertEqual(
+            (serializers.BaseSerializer.is_valid, serializers.Serializer.data, serializers.ListSerializer.data),
+            originals,
+        )
+
+    def test_unsampled_requests_are_not_measured(self):
+        with profiling(sample_rate=0), self.assertNumQueries(1):
+            self.call(lambda request: HttpResponse(ProjectNote.objects.count()))
+            self.assertEqual(len(get_ring_buffer().samples), 0)
+
+    def test_a_failing_sink_does_not_fail_the_request(self):
+        sinks = [{'BACKEND': 'core.tests.FailingSink'}, RING_BUFFER]
+        with profiling(sinks=sinks), self.assertLogs('core.profiling', 'ERROR') as logs:
+            response = self.call(lambda request: HttpResponse('ok'))
+            self.assertEqual(len(get_ring_buffer().samples), 1)
+        self.assertEqual(response.content, b'ok')
+        self.assertIn('Profiling sink FailingSink failed', logs.output[0])
+
+    def test_api_request_through_the_stack(self):
+        self.client.force_login(self.user)
+        with profiling():
+            response = self.client.get('/project-features/api/notes/', {'project_id': self.project.pk})
+            [sample] = get_ring_buffer().samples
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sample['view'], 'project.viewsets.ProjectNoteViewSet')
+        self.assertEqual(sample['route'], 'GET /project-features/api/notes/$')
+        self.assertGreater(sample['queries'], 0)
+        self.assertGreater(sample['serializer_ms'], 0)
+
+
+def sample(route, wall_ms, db_ms=1.0, queries=2, serializer_ms=0.5):
+    return {
+        'route': route, 'view': f'views.{route}', 'wall_ms': wall_ms, 'db_ms': db_ms,
+        'queries': queries, 'serializer_ms': serializer_ms, 'duplicates': [],
+    }
+
+
+class SinkTests(SimpleTestCase):
+    def test_log_sink_writes_one_json_line(self):
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            LogSink().emit(sample('GET /a/', 5.0))
+        self.assertEqual(json.loads(logs.records[0].getMessage())['route'], 'GET /a/')
+
+    def test_json_file_sink_appends_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'samples.jsonl')
+            sink = JSONFileSink(path)
+            sink.emit(sample('GET /a/', 5.0))
+            sink.emit(sample('GET /b/', 7.0))
+            with open(path) as f:
+                self.assertEqual([json.loads(line)['route'] for line in f], ['GET /a/', 'GET /b/'])
+
+    def test_ring_buffer_keeps_the_latest_samples(self):
+        sink = RingBufferSink(size=3)
+        for wall_ms in range(5):
+            sink.emit(sample('GET /a/', wall_ms))
+        self.assertEqual([s['wall_ms'] for s in sink.samples], [2, 3, 4])
+
+    def test_slowest_endpoints_aggregates_per_route_by_p95(self):
+        sink = RingBufferSink()
+        for n in range(20):
+            sink.emit(sample('GET /steady/', 10.0, queries=n % 2 * 2))
+        for wall_ms in (1.0, 1.0, 50.0):
+            sink.emit(sample('GET /spiky/', wall_ms, db_ms=3.0))
+
+        spiky, steady = sink.slowest_endpoints()
+        self.assertEqual(spiky, {
+            'route': 'GET /spiky/', 'view': 'views.GET /spiky/', 'samples': 3,
+            'mean_ms': 17.333, 'p95_ms': 50.0, 'max_ms': 50.0, 'mean_db_ms': 3.0,
+            'mean_queries': 2.0, 'mean_serializer_ms': 0.5, 'duplicates': [],
+        })
+        self.assertEqual((steady['samples'], steady['p95_ms'], steady['mean_queries']), (20, 10.0, 1.0))
+        self.assertEqual(sink.slowest_endpoints(limit=1), [spiky])
+
+
+class SlowestEndpointsApiTests(TestCase):
+    url = '/project-features/api/profiling/slowest/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('Staff', 'staff@example.com', 'pw', is_staff=True)
+        cls.user = User.objects.create_user('User', 'user@example.com', 'pw')
+
+    def test_staff_only(self):
+        self.client.force_login(self.user)
+        with profiling(sample_rate=0):
+            self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_report(self):
+        self.client.force_login(self.staff)
+        with profiling(sample_rate=0.5):
+            ring_buffer = get_ring_buffer()
+            for route, wall_ms in (('GET /a/', 5.0), ('GET /b/', 9.0), ('GET /c/', 1.0)):
+                ring_buffer.emit(sample(route, wall_ms))
+            data = self.client.get(self.url, {'limit': 2}).json()
+
+        self.assertEqual(data['sample_rate'], 0.5)
+        self.assertEqual(data['samples'], 3)
+        self.assertEqual([endpoint['route'] for endpoint in data['endpoints']], ['GET /b/', 'GET /a/'])
+
+    def test_without_a_ring_buffer(self):
+        self.client.force_login(self.staff)
+        with profiling(sample_rate=0, sinks=[{'BACKEND': 'core.profiling.LogSink'}]):
+            self.assertEqual(self.client.get(self.url).status_code, 404)
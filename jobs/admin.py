@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'queue', 'status', 'attempts', 'run_at', 'created_at', 'finished_at']
+    list_filter = ['status', 'queue', 'name']
+    search_fields = ['name', 'dedupe_key']
+    readonly_fields = ['locked_by', 'locked_at', 'result', 'last_error', 'created_at', 'finished_at']
+    raw_id_fields = ['owner']
@@ -0,0 +1,26 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .models import Job
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_detail(request, pk):
+    """Status and result of a job the user started"""
+    job = Job.objects.filter(pk=pk, owner=request.user).first()
+    if job is None:
+        return Response({'error': 'Job not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response({
+        'id': job.pk,
+        'name': job.name,
+        'status': job.status,
+        'attempts': job.attempts,
+        'result': job.result,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'failed': job.status == Job.FAILED,
+    })
@@ -0,0 +1,10 @@
+import time
+
+from .queue import job
+
+
+@job('jobs.noop', queue='benchmark', max_attempts=1)
+def noop(sleep=0):
+    """Does nothing (for `manage.py benchmark_jobs`)"""
+    if sleep:
+        time.sleep(sleep)
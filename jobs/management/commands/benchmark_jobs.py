@@ -0,0 +1,62 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.process import worker_process
+
+
+class Command(BaseCommand):
+    help = 'Measure job throughput: queue no-op jobs and drain them with N worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=10000, help='Jobs per run')
+        parser.add_argument('--workers', default='1,2,4', help='Comma-separated worker counts to try')
+        parser.add_argument('--batch-size', type=int, default=10)
+        parser.add_argument('--sleep', type=float, default=0, help='Seconds each job sleeps, to model I/O')
+
+    def handle(self, *args, **options):
+        settings_module = os.environ['DJANGO_SETTINGS_MODULE']
+        context = multiprocessing.get_context('spawn')
+        worker_options = {
+            'queues': ['benchmark'],
+            'batch_size': options['batch_size'],
+            'poll_interval': 0.05,
+            'stats_interval': 3600,
+            'stop_when_empty': True,
+        }
+        for workers in [int(count) for count in options['workers'].split(',')]:
+            Job.objects.filter(queue='benchmark').delete()
+            now = timezone.now()
+            Job.objects.bulk_create(
+                [Job(name='jobs.noop', queue='benchmark', kwargs={'sleep': options['sleep']}, run_at=now,
+                     max_attempts=1) for _ in range(options['jobs'])],
+                batch_size=1000,
+            )
+            processes = [
+                context.Process(target=worker_process, args=(settings_module, worker_options))
+                for _ in range(workers)
+            ]
+            started = time.perf_counter()
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+            elapsed = time.perf_counter() - started
+
+            finished = Job.objects.filter(queue='benchmark', status=Job.DONE).aggregate(
+                done=Count('*'), first=Min('finished_at'), last=Max('finished_at')
+            )
+            left = options['jobs'] - finished['done']
+            # Worker start-up (importing Django) is excluded from the rate
+            span = (finished['last'] - finished['first']).total_seconds() if finished['done'] > 1 else 0
+            rate = (finished['done'] - 1) / span if span else 0
+            self.stdout.write(
+                f"{workers} worker(s): {finished['done']} jobs, {rate:.0f} jobs/s ({elapsed:.1f}s wall)"
+                + (f' ({left} not done)' if left else '')
+            )
+        Job.objects.filter(queue='benchmark').delete()
@@ -0,0 +1,58 @@
+import multiprocessing
+import os
+import signal
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import get_jobs_config
+from jobs.process import worker_process
+
+
+class Command(BaseCommand):
+    help = 'Run job queue worker processes until interrupted'
+
+    def add_arguments(self, parser):
+        config = get_jobs_config()
+        parser.add_argument('--workers', type=int, default=1, help='Worker processes to start')
+        parser.add_argument(
+            '--queues', default=','.join(config['QUEUES']), help='Comma-separated queues to take jobs from'
+        )
+        parser.add_argument('--batch-size', type=int, default=config['BATCH_SIZE'], help='Jobs claimed at a time')
+        parser.add_argument(
+            '--poll-interval', type=float, default=config['POLL_INTERVAL'], help='Seconds to sleep when idle'
+        )
+        parser.add_argument('--stats-interval', type=float, default=60, help='Seconds between worker reports')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queues are empty')
+
+    def handle(self, *args, **options):
+        worker_options = {
+            'queues': [name.strip() for name in options['queues'].split(',') if name.strip()],
+            'batch_size': options['batch_size'],
+            'poll_interval': options['poll_interval'],
+            'stats_interval': options['stats_interval'],
+            'stop_when_empty': options['burst'],
+        }
+        settings_module = os.environ['DJANGO_SETTINGS_MODULE']
+        if options['workers'] == 1:
+            worker_process(settings_module, worker_options)
+            return
+
+        # spawn, not fork: each worker opens its own database connections
+        context = multiprocessing.get_context('spawn')
+        processes = [
+            context.Process(target=worker_process, args=(settings_module, worker_options), name=f'worker-{n}')
+            for n in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {len(processes)} worker(s) on {', '.join(worker_options['queues'])}")
+
+        def stop(signum, frame):
+            for process in processes:
+                if process.is_alive():
+                    os.kill(process.pid, signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for process in processes:
+            process.join()
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='locked_by',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """One call of a registered job function, waiting, running or finished
+
+    Workers claim queued rows whose run_at has passed (see jobs.queue). A
+    dedupe_key allows only one queued job per key: enqueueing the same
+    key again returns the job already waiting.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    queue = models.CharField(max_length=50, default='default')
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    # Lower runs first
+    priority = models.SmallIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    dedupe_key = models.CharField(max_length=255, blank=True, null=True)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name='jobs', on_delete=models.CASCADE, blank=True, null=True
+    )
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    result = models.JSONField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['queue', 'priority', 'run_at'], condition=Q(status='queued'), name='jobs_job_ready_idx'
+            ),
+            models.Index(fields=['status', 'locked_at'], name='jobs_job_lease_idx'),
+            models.Index(fields=['status', 'finished_at'], name='jobs_job_finished_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'], condition=Q(status='queued'), name='jobs_job_unique_queued_dedupe_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
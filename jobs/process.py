@@ -0,0 +1,36 @@
+"""Entry point of spawned worker processes
+
+Kept free of Django imports: a spawned child imports this module to find
+its target before Django is set up, so models can only be imported once
+worker_process has called django.setup().
+"""
+import logging
+import os
+import signal
+
+
+logger = logging.getLogger('jobs.worker')
+
+
+def worker_process(settings_module, options):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+    from .worker import Worker
+
+    worker = Worker(
+        queues=options['queues'], batch_size=options['batch_size'], poll_interval=options['poll_interval']
+    )
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+
+    def report(snapshot):
+        logger.info('%s processed=%d succeeded=%d retried=%d failed=%d rate=%.1f/s',
+                    worker.name, snapshot['processed'], snapshot['succeeded'], snapshot['retried'],
+                    snapshot['failed'], snapshot['rate'])
+
+    worker.run(
+        max_jobs=options.get('max_jobs'), stop_when_empty=options.get('stop_when_empty', False),
+        report=report, report_interval=options['stats_interval'],
+    )
@@ -0,0 +1,233 @@
+"""Database-backed job queue
+
+Jobs are rows in jobs_job, so enqueueing inside a transaction commits or
+rolls back with the caller's own writes, and a worker never sees a job
+for data that does not exist yet.
+
+Claiming uses SELECT ... FOR UPDATE SKIP LOCKED where the database has
+it (Postgres, MySQL 8): each worker locks a different batch of ready
+rows without waiting on the others. Elsewhere (SQLite) a worker reads
+candidate ids and claims them with a conditional UPDATE ... WHERE
+status = 'queued'; rows another worker got first simply are not updated.
+Either way the claimed rows are tagged with a per-claim token and read
+back by it.
+
+A claimed job holds a lease. Workers refresh it while the job runs, and
+a job whose lease ran out (its worker died) goes back to the queue.
+Failed jobs are retried with exponential backoff and jitter until
+max_attempts.
+"""
+import logging
+import random
+import traceback
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS = {
+    'QUEUES': ['default'],
+    # Jobs claimed per round trip
+    'BATCH_SIZE': 10,
+    # Idle sleep between polls, in seconds
+    'POLL_INTERVAL': 1.0,
+    # A running job whose worker stops refreshing it for this long is requeued
+    'LEASE': timedelta(minutes=5),
+    # Finished jobs are deleted after this long
+    'RETENTION': timedelta(days=7),
+}
+
+
+LOCKED_BY_MAX_LENGTH = Job._meta.get_field('locked_by').max_length
+
+
+def get_jobs_config():
+    return {**DEFAULT_JOBS, **getattr(settings, 'JOBS', {})}
+
+
+@dataclass
+class JobDefinition:
+    name: str
+    func: object
+    queue: str
+    max_attempts: int
+    retry_delay: timedelta
+    max_retry_delay: timedelta
+    every: timedelta = None
+
+    def enqueue(self, kwargs=None, **options):
+        return enqueue(self.name, kwargs, **options)
+
+    def backoff(self, attempts):
+        """Delay before retry `attempts`: doubles each time up to max_retry_delay, jittered to 50-100%"""
+        delay = min(self.retry_delay * 2 ** (attempts - 1), self.max_retry_delay)
+        return delay * random.uniform(0.5, 1.0)
+
+
+registry = {}
+
+
+def job(name=None, *, queue='default', max_attempts=5, retry_delay=timedelta(seconds=10),
+        max_retry_delay=timedelta(hours=1), every=None):
+    """Register a function as a job
+
+    The function is called with the JSON kwargs it was enqueued with and
+    may return a JSON-serializable result. `every` makes it periodic:
+    workers keep one instance queued and schedule the next run when one
+    finishes. The decorated function gains an `enqueue` attribute.
+    """
+    def decorator(func):
+        definition = JobDefinition(
+            name=name or f'{func.__module__}.{func.__name__}',
+            func=func,
+            queue=queue,
+            max_attempts=max_attempts,
+            retry_delay=retry_delay,
+            max_retry_delay=max_retry_delay,
+            every=every,
+        )
+        registry[definition.name] = definition
+        func.job = definition
+        func.enqueue = definition.enqueue
+        return func
+    return decorator
+
+
+def enqueue(name, kwargs=None, *, dedupe_key=None, run_at=None, delay=None, priority=0, owner=None, queue=None):
+    """Queue a call of job `name`; returns the Job, or the queued one with the same dedupe_key"""
+    definition = registry[name]
+    if run_at is None:
+        run_at = timezone.now() + (delay or timedelta(0))
+    new_job = Job(
+        name=name,
+        queue=queue or definition.queue,
+        kwargs=kwargs or {},
+        priority=priority,
+        run_at=run_at,
+        max_attempts=definition.max_attempts,
+        dedupe_key=dedupe_key,
+        owner=owner,
+    )
+    if dedupe_key is None:
+        new_job.save()
+        return new_job
+
+    queued = Job.objects.filter(dedupe_key=dedupe_key, status=Job.QUEUED).first()
+    if queued is not None:
+        return queued
+    try:
+        with transaction.atomic():
+            new_job.save()
+        return new_job
+    except IntegrityError:
+        # Another process queued the same key between the check and the insert
+        return Job.objects.get(dedupe_key=dedupe_key, status=Job.QUEUED)
+
+
+def claim(queues, worker_id, limit):
+    """Mark up to `limit` ready jobs as running for this worker and return them"""
+    now = timezone.now()
+    # Worker ids contain the hostname, which may be a long FQDN
+    token = f'{worker_id[:LOCKED_BY_MAX_LENGTH - 13]}:{uuid.uuid4().hex[:12]}'
+    ready = (
+        Job.objects.filter(status=Job.QUEUED, queue__in=queues, run_at__lte=now)
+        .order_by('priority', 'run_at')
+        .values_list('pk', flat=True)
+    )
+    claimed = {'status': Job.RUNNING, 'locked_by': token, 'locked_at': now, 'attempts': F('attempts') + 1}
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(ready.select_for_update(skip_locked=True)[:limit])
+            if ids:
+                Job.objects.filter(pk__in=ids).update(**claimed)
+    else:
+        # Try again if other workers took every candidate, so an empty
+        # result always means there was nothing ready
+        while True:
+            ids = list(ready[:limit])
+            if not ids or Job.objects.filter(pk__in=ids, status=Job.QUEUED).update(**claimed):
+                break
+    if not ids:
+        return []
+    return list(Job.objects.filter(pk__in=ids, locked_by=token).order_by('priority', 'run_at'))
+
+
+def complete(claimed_job, result=None):
+    updated = Job.objects.filter(pk=claimed_job.pk, locked_by=claimed_job.locked_by).update(
+        status=Job.DONE, result=result, finished_at=timezone.now(), locked_at=None
+    )
+    if updated:
+        _schedule_next(claimed_job)
+    return bool(updated)
+
+
+def retry_or_fail(claimed_job, error):
+    """Requeue with backoff, or mark failed once max_attempts is used up"""
+    definition = registry.get(claimed_job.name)
+    filtered = Job.objects.filter(pk=claimed_job.pk, locked_by=claimed_job.locked_by)
+    now = timezone.now()
+    if definition is not None and claimed_job.attempts < claimed_job.max_attempts:
+        try:
+            with transaction.atomic():
+                updated = filtered.update(
+                    status=Job.QUEUED, run_at=now + definition.backoff(claimed_job.attempts),
+                    locked_by='', locked_at=None, last_error=error,
+                )
+            return bool(updated)
+        except IntegrityError:
+            # A newer job with the same dedupe_key is queued and will do the work
+            error += '\nNot retried: a newer job with the same dedupe key is queued.'
+    updated = filtered.update(status=Job.FAILED, finished_at=now, locked_at=None, last_error=error)
+    if updated:
+        _schedule_next(claimed_job)
+    return bool(updated)
+
+
+def format_error(exc):
+    return ''.join(traceback.format_exception(exc))[-10000:]
+
+
+def refresh_lease(token):
+    """Extend the lease on every job still running under one claim"""
+    return Job.objects.filter(locked_by=token, status=Job.RUNNING).update(locked_at=timezone.now())
+
+
+def release_expired(lease=None):
+    """Put running jobs whose worker stopped refreshing them back in the queue"""
+    lease = lease or get_jobs_config()['LEASE']
+    released = 0
+    expired = Job.objects.filter(status=Job.RUNNING, locked_at__lt=timezone.now() - lease)
+    for stale in expired.iterator():
+        released += retry_or_fail(stale, f'Lease expired on {stale.locked_by}')
+    return released
+
+
+def prune(retention=None):
+    retention = retention or get_jobs_config()['RETENTION']
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.DONE, Job.FAILED], finished_at__lt=timezone.now() - retention
+    ).delete()
+    return deleted
+
+
+def schedule_periodic():
+    """Make sure every periodic job has one run queued"""
+    for definition in registry.values():
+        if definition.every is not None:
+            enqueue(definition.name, dedupe_key=f'periodic:{definition.name}')
+
+
+def _schedule_next(finished_job):
+    definition = registry.get(finished_job.name)
+    if definition is not None and definition.every is not None:
+        enqueue(definition.name, dedupe_key=f'periodic:{definition.name}', delay=definition.every)
@@ -0,0 +1,170 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from . import queue
+from .models import Job
+
+
+@queue.job('jobs.tests.flaky', queue='tests', max_attempts=3, retry_delay=timedelta(seconds=10),
+           max_retry_delay=timedelta(seconds=30))
+def flaky():
+    raise RuntimeError('flaky')
+
+
+@queue.job('jobs.tests.hourly', queue='tests', max_attempts=1, every=timedelta(hours=1))
+def hourly():
+    pass
+
+
+def make_ready(job):
+    Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+
+class ClaimTests(TestCase):
+    def test_long_worker_id_fits_locked_by(self):
+        job = queue.enqueue('jobs.noop')
+        worker_id = 'build-agent-' + 'x' * 300 + '.internal.example.com:4242'
+        [claimed] = queue.claim(['benchmark'], worker_id, 10)
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertLessEqual(len(claimed.locked_by), queue.LOCKED_BY_MAX_LENGTH)
+        self.assertEqual(claimed.status, Job.RUNNING)
+
+        self.assertTrue(queue.complete(claimed, {'ok': True}))
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.DONE)
+
+    def test_dedupe_key(self):
+        first = queue.enqueue('jobs.noop', dedupe_key='same')
+        second = queue.enqueue('jobs.noop', dedupe_key='same')
+        self.assertEqual(first.pk, second.pk)
+
+    def test_dedupe_key_collapses_only_queued_jobs(self):
+        first = queue.enqueue('jobs.noop', {'n': 1}, dedupe_key='same')
+        self.assertEqual(queue.enqueue('jobs.noop', {'n': 2}, dedupe_key='same').kwargs, {'n': 1})
+        self.assertEqual(Job.objects.filter(dedupe_key='same').count(), 1)
+
+        # Once the job runs, the same key queues a new one
+        [claimed] = queue.claim(['benchmark'], 'worker', 10)
+        self.assertEqual(claimed.pk, first.pk)
+        second = queue.enqueue('jobs.noop', {'n': 2}, dedupe_key='same')
+        self.assertNotEqual(second.pk, first.pk)
+        self.assertEqual(second.status, Job.QUEUED)
+        self.assertEqual(queue.enqueue('jobs.noop', dedupe_key='same').pk, second.pk)
+
+
+class RetryTests(TestCase):
+    def test_backoff_doubles_up_to_the_maximum(self):
+        with mock.patch('jobs.queue.random.uniform', return_value=1.0):
+            delays = [flaky.job.backoff(attempts) for attempts in range(1, 5)]
+        self.assertEqual([delay.total_seconds() for delay in delays], [10, 20, 30, 30])
+
+    def test_failed_job_is_retried_until_max_attempts(self):
+        job = flaky.enqueue()
+        for attempt in (1, 2):
+            [claimed] = queue.claim(['tests'], 'worker', 10)
+            self.assertEqual(claimed.attempts, attempt)
+            before = timezone.now()
+            self.assertTrue(queue.retry_or_fail(claimed, f'error {attempt}'))
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.QUEUED)
+            self.assertEqual(job.locked_by, '')
+            self.assertEqual(job.last_error, f'error {attempt}')
+            # Jittered to 50-100% of 10s, then 20s
+            delay = 10 * 2 ** (attempt - 1)
+            self.assertGreaterEqual(job.run_at, before + timedelta(seconds=delay / 2))
+            self.assertLessEqual(job.run_at, timezone.now() + timedelta(seconds=delay))
+            self.assertEqual(queue.claim(['tests'], 'worker', 10), [])
+            make_ready(job)
+
+        [claimed] = queue.claim(['tests'], 'worker', 10)
+        self.assertEqual(claimed.attempts, 3)
+        self.assertTrue(queue.retry_or_fail(claimed, 'error 3'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.last_error, 'error 3')
+        self.assertIsNotNone(job.finished_at)
+        make_ready(job)
+        self.assertEqual(queue.claim(['tests'], 'worker', 10), [])
+
+
+class LeaseTests(TestCase):
+    def expire(self, job):
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(minutes=10))
+
+    def test_release_expired_requeues_a_stale_lease(self):
+        job = flaky.enqueue()
+        [claimed] = queue.claim(['tests'], 'dead-worker', 10)
+        self.assertEqual(queue.release_expired(timedelta(minutes=5)), 0)
+
+        self.expire(job)
+        self.assertEqual(queue.release_expired(timedelta(minutes=5)), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual((job.locked_by, job.locked_at), ('', None))
+        self.assertEqual(job.last_error, f'Lease expired on {claimed.locked_by}')
+        self.assertEqual(job.attempts, 1)
+
+    def test_refreshed_lease_is_kept(self):
+        job = flaky.enqueue()
+        [claimed] = queue.claim(['tests'], 'worker', 10)
+        self.expire(job)
+        self.assertEqual(queue.refresh_lease(claimed.locked_by), 1)
+        self.assertEqual(queue.release_expired(timedelta(minutes=5)), 0)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.RUNNING)
+
+    def test_stale_worker_cannot_finish_a_job_another_worker_took_over(self):
+        job = flaky.enqueue()
+        [stale] = queue.claim(['tests'], 'slow-worker', 10)
+        self.expire(job)
+        queue.release_expired(timedelta(minutes=5))
+        make_ready(job)
+        [current] = queue.claim(['tests'], 'other-worker', 10)
+        self.assertNotEqual(current.locked_by, stale.locked_by)
+
+        self.assertFalse(queue.complete(stale, {'from': 'slow-worker'}))
+        self.assertFalse(queue.retry_or_fail(stale, 'too late'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.result), (Job.RUNNING, current.locked_by, None))
+
+        self.assertTrue(queue.complete(current, {'from': 'other-worker'}))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (Job.DONE, {'from': 'other-worker'}))
+
+
+class PeriodicTests(TestCase):
+    def queued(self):
+        return Job.objects.filter(name='jobs.tests.hourly', status=Job.QUEUED)
+
+    def test_schedule_periodic_keeps_one_run_queued(self):
+        queue.schedule_periodic()
+        queue.schedule_periodic()
+        [job] = self.queued()
+        self.assertEqual(job.dedupe_key, 'periodic:jobs.tests.hourly')
+
+    def test_finished_run_schedules_the_next(self):
+        queue.schedule_periodic()
+        [claimed] = queue.claim(['tests'], 'worker', 10)
+        self.assertEqual(self.queued().count(), 0)
+
+        before = timezone.now()
+        self.assertTrue(queue.complete(claimed))
+        [next_run] = self.queued()
+        self.assertNotEqual(next_run.pk, claimed.pk)
+        self.assertGreaterEqual(next_run.run_at, before + timedelta(hours=1))
+        self.assertLessEqual(next_run.run_at, timezone.now() + timedelta(hours=1))
+
+    def test_failed_run_schedules_the_next(self):
+        queue.schedule_periodic()
+        [claimed] = queue.claim(['tests'], 'worker', 10)
+        self.assertTrue(queue.retry_or_fail(claimed, 'boom'))
+        self.assertEqual(Job.objects.get(pk=claimed.pk).status, Job.FAILED)
+        self.assertEqual(self.queued().count(), 1)
+
+    def test_stale_completion_schedules_nothing(self):
+        queue.schedule_periodic()
+        [claimed] = queue.claim(['tests'], 'worker', 10)
+        Job.objects.filter(pk=claimed.pk).update(locked_by='someone-else')
+        self.assertFalse(queue.complete(claimed))
+        self.assertEqual(self.queued().count(), 0)
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from . import api_views
+
+
+urlpatterns = [
+    path('<int:pk>/', api_views.job_detail, name='api-job-detail'),
+]
@@ -0,0 +1,169 @@
+"""Worker processes for the job queue
+
+`manage.py run_workers --workers N` starts N processes, each running a
+Worker loop: claim a batch, run the jobs one by one, and poll again,
+sleeping POLL_INTERVAL only while the queue is empty. A background
+thread refreshes the lease on the batch being worked on. Between
+batches a worker also requeues jobs with expired leases, deletes old
+finished jobs and keeps periodic jobs scheduled.
+
+SIGTERM or SIGINT stops a worker after its current job; the rest of its
+batch is handed back to the queue.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from . import queue
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+HOUSEKEEPING_INTERVAL = 30
+
+
+class WorkerStats:
+    """Job counters for one worker process"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.succeeded = 0
+        self.retried = 0
+        self.failed = 0
+
+    def snapshot(self):
+        elapsed = time.monotonic() - self.started
+        processed = self.succeeded + self.retried + self.failed
+        return {
+            'processed': processed,
+            'succeeded': self.succeeded,
+            'retried': self.retried,
+            'failed': self.failed,
+            'rate': processed / elapsed if elapsed else 0.0,
+        }
+
+
+class _LeaseKeeper(threading.Thread):
+    """Refresh the lease of the claim being worked on every third of LEASE"""
+
+    def __init__(self, interval):
+        super().__init__(name='job-lease', daemon=True)
+        self.interval = interval
+        self.token = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.wait(self.interval):
+                token = self.token
+                if token:
+                    queue.refresh_lease(token)
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class Worker:
+    def __init__(self, queues=None, batch_size=None, poll_interval=None, name=None):
+        config = queue.get_jobs_config()
+        self.queues = queues or config['QUEUES']
+        self.batch_size = batch_size or config['BATCH_SIZE']
+        self.poll_interval = poll_interval if poll_interval is not None else config['POLL_INTERVAL']
+        self.lease = config['LEASE']
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.stats = WorkerStats()
+        self._stopping = threading.Event()
+
+    def stop(self, *args):
+        self._stopping.set()
+
+    def run(self, max_jobs=None, stop_when_empty=False, report=None, report_interval=60):
+        """Process jobs until stopped (or max_jobs / an empty queue, for benchmarks)"""
+        keeper = _LeaseKeeper(self.lease.total_seconds() / 3)
+        keeper.start()
+        queue.schedule_periodic()
+        last_housekeeping = last_report = time.monotonic()
+        try:
+            while not self._stopping.is_set():
+                limit = self.batch_size
+                if max_jobs is not None:
+                    limit = min(limit, max_jobs - self.stats.snapshot()['processed'])
+                    if limit <= 0:
+                        break
+                batch = queue.claim(self.queues, self.name, limit)
+                if batch:
+                    keeper.token = batch[0].locked_by
+                    self.run_batch(batch)
+                    keeper.token = None
+                elif stop_when_empty:
+                    break
+                else:
+                    self._stopping.wait(self.poll_interval)
+
+                now = time.monotonic()
+                if now - last_housekeeping >= HOUSEKEEPING_INTERVAL:
+                    self.housekeeping()
+                    last_housekeeping = now
+                if report and now - last_report >= report_interval:
+                    report(self.stats.snapshot())
+                    last_report = now
+                close_old_connections()
+        finally:
+            keeper.stop()
+        if report:
+            report(self.stats.snapshot())
+        return self.stats
+
+    def run_batch(self, batch):
+        for position, claimed_job in enumerate(batch):
+            if self._stopping.is_set():
+                self.hand_back(batch[position:])
+                return
+            self.execute(claimed_job)
+
+    def execute(self, claimed_job):
+        definition = queue.registry.get(claimed_job.name)
+        if definition is None:
+            queue.retry_or_fail(claimed_job, f'No job registered as {claimed_job.name!r}')
+            self.stats.failed += 1
+            return
+        try:
+            result = definition.func(**claimed_job.kwargs)
+            # Fail now rather than when the row is saved
+            json.dumps(result)
+        except Exception as exc:
+            logger.warning('Job %s #%s failed (attempt %s/%s): %s', claimed_job.name, claimed_job.pk,
+                           claimed_job.attempts, claimed_job.max_attempts, exc)
+            queue.retry_or_fail(claimed_job, queue.format_error(exc))
+            if claimed_job.attempts < claimed_job.max_attempts:
+                self.stats.retried += 1
+            else:
+                self.stats.failed += 1
+        else:
+            queue.complete(claimed_job, result)
+            self.stats.succeeded += 1
+
+    def hand_back(self, unstarted):
+        """Return claimed jobs this worker will not start, without using up an attempt"""
+        for claimed_job in unstarted:
+            Job.objects.filter(pk=claimed_job.pk, locked_by=claimed_job.locked_by).update(
+                status=Job.QUEUED, attempts=claimed_job.attempts - 1, locked_by='', locked_at=None,
+                run_at=timezone.now(),
+            )
+
+    def housekeeping(self):
+        released = queue.release_expired(self.lease)
+        if released:
+            logger.warning('Requeued %d job(s) with expired leases', released)
+        queue.prune()
+        queue.schedule_periodic()
+
@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'polysia_projects.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once the app registry is ready
+from project.events import route_project_events  # noqa: E402
+
+application = route_project_events(django_application)
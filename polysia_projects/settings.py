@@ -26,9 +26,12 @@ INSTALLED_APPS = [
     'project',
     'task',
     'todolist',
+    'search',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # 👈 important for static files
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -91,6 +94,13 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    # Project attachments, deduplicated by content (project.storage)
+    'attachments': {'BACKEND': 'project.storage.ContentAddressedStorage'},
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Django REST Framework Configuration
@@ -105,3 +115,105 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
+
+# Live project events (server-sent events, needs an ASGI server).
+# Use 'project.live.BrokerBackend' with `manage.py run_live_broker` when
+# running more than one worker process, or when load testing with
+# `manage.py load_test_live`.
+LIVE_FEED = {
+    'BACKEND': os.environ.get('LIVE_FEED_BACKEND', 'project.live.InMemoryBackend'),
+    'OPTIONS': {},
+}
+
+# Per-project response cache, invalidated by model signals.
+# LocalMemoryBackend only sees writes made in its own process; with several
+# workers use {'BACKEND': 'project.cache.DjangoCacheBackend', 'OPTIONS': {'alias': 'default'}}
+# over a shared CACHES backend.
+PROJECT_CACHE = {
+    'BACKEND': 'project.cache.LocalMemoryBackend',
+    'OPTIONS': {'max_entries': 1024},
+    'TIMEOUT': 300,
+}
+
+# Token bucket limits for share links ('N/s|m|h|d', N is also the burst).
+# Use 'project.ratelimit.CacheBackend' to share buckets between workers.
+SHARE_RATE_LIMITS = {
+    'BACKEND': 'project.ratelimit.InMemoryBackend',
+    'OPTIONS': {},
+    # Reverse proxies that append to X-Forwarded-For; with 0 every client
+    # behind a proxy would share the proxy's address
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+    'RATES': {
+        'shared_ip': '120/m',
+        'shared_token': '600/m',
+        'share_create': '20/m',
+    },
+}
+
+# Full-text search. None picks the backend for the database: FTS5 on
+# SQLite, tsvector on Postgres, icontains elsewhere.
+SEARCH = {
+    'BACKEND': None,
+}
+
+# Resumable uploads (project.uploads). Staged chunks should live on the same
+# filesystem as MEDIA_ROOT so finished files are moved, not copied.
+UPLOADS = {
+    'STAGING_DIR': os.path.join(MEDIA_ROOT, 'staging'),
+    'MAX_SIZE': 10 * 1024 ** 3,
+}
+
+# Attachment downloads (project.downloads). 'stream' serves files from
+# Django; behind nginx use 'x-accel-redirect' with an internal location
+# at X_ACCEL_PREFIX aliasing MEDIA_ROOT, behind Apache 'x-sendfile'.
+DOWNLOADS = {
+    'MODE': os.environ.get('DOWNLOADS_MODE', 'stream'),
+    'X_ACCEL_PREFIX': '/protected-media/',
+}
+
+# Attachment previews (project.previews). QUEUE None leaves new files to
+# `manage.py generate_previews`; image thumbnails need Pillow.
+PREVIEWS = {
+    'QUEUE': 'project.previews.JobPreviewQueue',
+    'THUMBNAIL_SIZE': 256,
+}
+
+# Job queue (jobs app). Run workers with `manage.py run_workers --workers N
+# --queues default,previews`; see jobs.queue for the other options.
+JOBS = {
+    'QUEUES': ['default', 'previews'],
+    'BATCH_SIZE': 10,
+    'POLL_INTERVAL': 1.0,
+}
+
+# Request profiling (core.profiling). SAMPLE_RATE is the fraction of
+# requests measured; 0 turns it off. Sinks: core.profiling.LogSink,
+# JSONFileSink ({'path': ...}) and RingBufferSink, which backs
+# /project-features/api/profiling/slowest/.
+PROFILING = {
+    'SAMPLE_RATE': float(os.environ.get('PROFILING_SAMPLE_RATE', '0')),
+    'DUPLICATE_THRESHOLD': 3,
+    'SINKS': [
+        {'BACKEND': 'core.profiling.RingBufferSink', 'OPTIONS': {'size': 1000}},
+        {'BACKEND': 'core.profiling.LogSink', 'OPTIONS': {'level': 'INFO'}},
+    ],
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '{asctime} {levelname} {name}: {message}', 'style': '{'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'root': {'handlers': ['console'], 'level': 'WARNING'},
+    'loggers': {
+        'django': {'handlers': ['console'], 'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO'), 'propagate': False},
+        'core.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'account': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'project': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'jobs': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
@@ -11,6 +11,9 @@ urlpatterns = [
     path('projects/', include('project.urls')),
     path('projects/<uuid:project_id>/', include('todolist.urls')),
     path('projects/<uuid:project_id>/<uuid:todolist_id>/', include('task.urls')),
+    path('project-features/api/profiling/', include('core.api_urls')),
+    path('project-features/api/search/', include('search.urls')),
+    path('project-features/api/jobs/', include('jobs.urls')),
     path('project-features/api/', include('project.api_urls')),
 ] 
 
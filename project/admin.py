@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Project, ProjectFile, ProjectNote, ShareLink, Comment, Reminder
+from .models import Blob, FilePreview, Project, ProjectFile, ProjectNote, ShareLink, Comment, Reminder
 
 
 @admin.register(Project)
@@ -12,9 +12,24 @@ class ProjectAdmin(admin.ModelAdmin):
 
 @admin.register(ProjectFile)
 class ProjectFileAdmin(admin.ModelAdmin):
-    list_display = ['name', 'project', 'attachment']
+    list_display = ['name', 'filename', 'project', 'size', 'attachment']
     list_filter = ['project']
-    search_fields = ['name']
+    search_fields = ['name', 'filename', 'content_hash']
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ['content_hash', 'size', 'refcount', 'updated_at']
+    search_fields = ['content_hash']
+    readonly_fields = ['content_hash', 'size', 'refcount', 'created_at', 'updated_at']
+
+
+@admin.register(FilePreview)
+class FilePreviewAdmin(admin.ModelAdmin):
+    list_display = ['content_hash', 'kind', 'width', 'height', 'error', 'created_at']
+    list_filter = ['kind']
+    search_fields = ['content_hash']
+    exclude = ['thumbnail']
 
 
 @admin.register(ProjectNote)
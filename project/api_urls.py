@@ -1,9 +1,14 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from task.api_views import bulk_tasks
+from todolist.api_views import bulk_todolists
 from .viewsets import (
     ShareLinkViewSet, CommentViewSet, ReminderViewSet, ProjectNoteViewSet
 )
-from .api_views import share_project
+from .api_views import (
+    share_project, shared_project, project_dashboard, project_changes_since, cache_stats,
+    import_projects, create_upload, upload_detail, start_export,
+)
 
 router = DefaultRouter()
 router.register(r'share-links', ShareLinkViewSet, basename='sharelink')
@@ -13,6 +18,16 @@ router.register(r'notes', ProjectNoteViewSet, basename='note')
 
 urlpatterns = [
     path('projects/<uuid:project_id>/share/', share_project, name='api-share-project'),
+    path('projects/import/', import_projects, name='api-import-projects'),
+    path('projects/<uuid:project_id>/exports/', start_export, name='api-start-export'),
+    path('projects/<uuid:project_id>/uploads/', create_upload, name='api-create-upload'),
+    path('uploads/<uuid:upload_id>/', upload_detail, name='api-upload-detail'),
+    path('shared/<str:token>/', shared_project, name='api-shared-project'),
+    path('projects/<uuid:project_id>/dashboard/', project_dashboard, name='api-project-dashboard'),
+    path('projects/<uuid:project_id>/changes/', project_changes_since, name='api-project-changes'),
+    path('projects/<uuid:project_id>/todolists/bulk/', bulk_todolists, name='api-bulk-todolists'),
+    path('projects/<uuid:project_id>/tasks/bulk/', bulk_tasks, name='api-bulk-tasks'),
+    path('cache-stats/', cache_stats, name='api-cache-stats'),
     path('', include(router.urls)),
 ]
 
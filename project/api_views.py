@@ -1,15 +1,31 @@
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.http import urlencode
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from django.http import Http404
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, throttle_classes
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
 
-from .models import ShareLink, Project
-from .serializers import ShareLinkSerializer
+from .cache import get_project_cache
+from .export import EXPORT_FORMATS
+from .importer import ImportFormatError, ProjectImporter, guess_format, open_text, read_records
+from .jobs import export_project
+from .models import ShareLink, Project, Upload
+from .pagination import CommentCursorPagination, ProjectNoteCursorPagination, ReminderCursorPagination
+from .sync import decode_sync_token, new_sync_token, project_changes
+from .ratelimit import ShareCreateThrottle, SharedLinkThrottle
+from .sharing import resolve_share_token, shared_snapshot
+from .uploads import UploadConflict, append_chunk, discard_upload, get_upload_config, start_upload
+from .serializers import (
+    ShareLinkSerializer, CommentSerializer, ReminderSerializer, ProjectNoteSerializer
+)
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([ShareCreateThrottle])
 def share_project(request, project_id):
     """Create or get share link for a project"""
     project = get_object_or_404(Project, id=project_id)
@@ -22,8 +38,7 @@ def share_project(request, project_id):
         )
 
     # Check if active share link exists
-    existing_link = ShareLink.objects.filter(
-        project=project, 
+    existing_link = project.share_links.select_related('created_by').filter(
         is_active=True
     ).first()
 
@@ -39,3 +54,262 @@ def share_project(request, project_id):
     serializer = ShareLinkSerializer(share_link, context={'request': request})
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+
+
+def _first_page(request, queryset, serializer_class, list_url_name, project, pagination_class=None):
+    """Serialize the first page of a project collection plus a link to the next one"""
+    list_url = request.build_absolute_uri(reverse(list_url_name))
+
+    if pagination_class is not None:
+        paginator = pagination_class()
+        rows = paginator.paginate_queryset(queryset, request)
+        # Point the cursor link at the collection's own list endpoint
+        query = urlencode({'project_id': project.id, 'pagination': 'cursor'})
+        paginator.base_url = f"{list_url}?{query}"
+        next_url = paginator.get_next_link()
+    else:
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        rows = list(queryset[:page_size + 1])
+        next_url = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            query = urlencode({'project_id': project.id, 'page': 2})
+            next_url = f"{list_url}?{query}"
+
+    serializer = serializer_class(rows, many=True, context={'request': request})
+    return {'results': serializer.data, 'next': next_url}
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@throttle_classes([SharedLinkThrottle])
+def shared_project(request, token):
+    """Public read-only snapshot of a project behind a share link"""
+    project_id = resolve_share_token(token)
+    if project_id is None:
+        raise Http404
+
+    return Response(shared_snapshot(project_id))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def project_dashboard(request, project_id):
+    """Notes, comments, reminders and share links of a project in one response"""
+    sync_token = new_sync_token()
+    project = get_object_or_404(Project, id=project_id)
+
+    # Verify ownership
+    if project.created_by_id != request.user.id:
+        return Response(
+            {'error': 'You do not have permission to view this project.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    notes = project.notes.order_by('-created_at')
+    comments = project.comments.select_related('user').order_by('-timestamp')
+    reminders = project.reminders.with_current_status().select_related('created_by').order_by('reminder_datetime')
+    share_links = project.share_links.select_related('created_by').order_by('-created_at')
+
+    # Rows fetched through the related managers already carry `project`,
+    # so project_name and the share URLs need no extra queries
+    return Response({
+        'notes': _first_page(
+            request, notes, ProjectNoteSerializer, 'note-list', project, ProjectNoteCursorPagination
+        ),
+        'comments': _first_page(
+            request, comments, CommentSerializer, 'comment-list', project, CommentCursorPagination
+        ),
+        'reminders': _first_page(
+            request, reminders, ReminderSerializer, 'reminder-list', project, ReminderCursorPagination
+        ),
+        'share_links': _first_page(request, share_links, ShareLinkSerializer, 'sharelink-list', project),
+        'sync_token': sync_token,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def project_changes_since(request, project_id):
+    """Notes, comments and reminders created, updated or deleted since a sync token"""
+    project = get_object_or_404(Project, id=project_id)
+
+    # Verify ownership
+    if project.created_by_id != request.user.id:
+        return Response(
+            {'error': 'You do not have permission to view this project.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    since = None
+    token = request.query_params.get('since')
+    if token:
+        since = decode_sync_token(token)
+        if since is None:
+            return Response({'error': 'Invalid sync token.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    changes = project_changes(project, since)
+    context = {'request': request}
+    return Response({
+        'reset': changes['reset'],
+        'notes': ProjectNoteSerializer(changes['notes'], many=True, context=context).data,
+        'comments': CommentSerializer(changes['comments'], many=True, context=context).data,
+        'reminders': ReminderSerializer(changes['reminders'], many=True, context=context).data,
+        'deleted': [
+            {'type': tombstone.model, 'id': tombstone.object_id}
+            for tombstone in changes['deleted']
+        ],
+        'sync_token': changes['sync_token'],
+    })
+
+
+def _upload_response(request, upload, status_code=status.HTTP_200_OK, body=True):
+    data = {
+        'id': upload.id,
+        'offset': upload.offset,
+        'length': upload.length,
+        'complete': upload.is_complete,
+        'file_id': upload.project_file_id,
+        'url': request.build_absolute_uri(reverse('api-upload-detail', args=[upload.id])),
+    }
+    response = Response(data if body else None, status=status_code)
+    response['Upload-Offset'] = str(upload.offset)
+    response['Upload-Length'] = str(upload.length)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_upload(request, project_id):
+    """Start a resumable upload: {"name", "filename", "length"}
+
+    Then PATCH the bytes to the returned url with an Upload-Offset header,
+    in as many chunks as needed; HEAD tells where to resume.
+    """
+    project = get_object_or_404(Project, id=project_id)
+    if project.created_by != request.user:
+        return Response(
+            {'error': 'You do not have permission to upload to this project.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    filename = str(request.data.get('filename', '')).strip()
+    name = str(request.data.get('name', '') or filename).strip()
+    try:
+        length = int(request.data.get('length', request.headers.get('Upload-Length', '')))
+    except (TypeError, ValueError):
+        length = -1
+    if not filename or length < 0:
+        return Response({'error': 'filename and a non-negative length are required.'}, status=status.HTTP_400_BAD_REQUEST)
+    if length > get_upload_config()['MAX_SIZE']:
+        return Response({'error': 'File is too large.'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    upload = start_upload(project, request.user, name[:255], filename[:255], length)
+    if length == 0:
+        append_chunk(upload, 0, None, 0)
+    response = _upload_response(request, upload, status.HTTP_201_CREATED)
+    response['Location'] = response.data['url']
+    return response
+
+
+@api_view(['GET', 'HEAD', 'PATCH', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def upload_detail(request, upload_id):
+    """HEAD/GET: current offset; PATCH: append a chunk; DELETE: abandon the upload"""
+    upload = get_object_or_404(Upload, id=upload_id, created_by=request.user)
+
+    if request.method in ('GET', 'HEAD'):
+        return _upload_response(request, upload, body=request.method == 'GET')
+
+    if request.method == 'DELETE':
+        if upload.is_complete:
+            return Response({'error': 'Upload already completed.'}, status=status.HTTP_409_CONFLICT)
+        discard_upload(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    if request.content_type != 'application/offset+octet-stream':
+        return Response(
+            {'error': 'Send chunks as application/offset+octet-stream.'},
+            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+        )
+    try:
+        offset = int(request.headers['Upload-Offset'])
+        content_length = int(request.headers['Content-Length'])
+    except (KeyError, ValueError):
+        return Response({'error': 'Upload-Offset and Content-Length headers are required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        # Read the raw body stream; request.data would buffer the chunk
+        append_chunk(upload, offset, request.stream, content_length)
+    except UploadConflict as e:
+        response = _upload_response(request, upload, status.HTTP_409_CONFLICT)
+        response.data['error'] = str(e)
+        return response
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return _upload_response(request, upload)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def import_projects(request):
+    """Import projects, todolists and tasks from an uploaded JSONL or CSV file
+
+    Re-uploading the same file after a failure is safe: ids are derived from
+    the source ids, so rows that were already imported are left alone and
+    counted under "existing".
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'Upload the records as "file".'}, status=status.HTTP_400_BAD_REQUEST)
+
+    import_format = request.data.get('format') or guess_format(upload.name)
+    try:
+        result = ProjectImporter(request.user).run(read_records(open_text(upload.file), import_format))
+    except ImportFormatError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(result)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """Hit, miss and eviction counters of this process's project cache"""
+    return Response(get_project_cache().stats())
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def start_export(request, project_id):
+    """Queue an export of the project tree ({"format": "jsonl" | "csv" | "zip"})
+
+    Returns 202 with the job's status url; once it is done the job result
+    carries a download_url. Asking again while one is queued returns it.
+    """
+    project = get_object_or_404(Project, id=project_id)
+    if project.created_by != request.user:
+        return Response(
+            {'error': 'You do not have permission to export this project.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    export_format = request.data.get('format', 'jsonl')
+    if export_format not in EXPORT_FORMATS:
+        return Response(
+            {'error': f'format must be one of {", ".join(sorted(EXPORT_FORMATS))}.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    job = export_project.enqueue(
+        {'project_id': str(project.pk), 'format': export_format},
+        owner=request.user,
+        dedupe_key=f'export:{project.pk}:{export_format}',
+    )
+    url = request.build_absolute_uri(reverse('api-job-detail', args=[job.pk]))
+    response = Response({'job': job.pk, 'status': job.status, 'url': url}, status=status.HTTP_202_ACCEPTED)
+    response['Location'] = url
+    return response
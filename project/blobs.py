@@ -0,0 +1,165 @@
+"""Reference counts and garbage collection for content-addressed attachments
+
+ContentAddressedStorage stores each distinct attachment once. A Blob row
+counts the ProjectFiles using it: the count moves when a ProjectFile is
+created, gets a different attachment or is deleted (project.signals). Nothing deletes a
+blob file inline; `manage.py gc_blobs` removes blobs whose count has been
+zero for longer than the grace period, so an upload that dedupes against a
+blob while it is being released keeps its bytes.
+"""
+import logging
+import os
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import Blob, FilePreview, ProjectFile
+from .storage import CAS_PREFIX, attachment_storage, blob_hash, blob_name
+from .uploads import hash_file
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRACE_PERIOD = timedelta(hours=1)
+# Orphaned files checked against ProjectFile per query
+ORPHAN_BATCH_SIZE = 500
+
+
+def retain_blob(content_hash, size, count=1):
+    # Deduplicated content already has a row, so try the update first
+    if Blob.objects.filter(pk=content_hash).update(refcount=F('refcount') + count, updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            Blob.objects.create(content_hash=content_hash, size=size or 0, refcount=count)
+    except IntegrityError:
+        Blob.objects.filter(pk=content_hash).update(refcount=F('refcount') + count, updated_at=timezone.now())
+
+
+def release_blob(content_hash, count=1):
+    Blob.objects.filter(pk=content_hash).update(refcount=F('refcount') - count, updated_at=timezone.now())
+
+
+def collect_garbage(grace_period=DEFAULT_GRACE_PERIOD, dry_run=False):
+    """Delete unreferenced blobs older than grace_period; return (count, bytes)
+
+    Also removes stale files under cas/ that have no Blob row, which is
+    what an interrupted upload or a crash between storage and commit
+    leaves behind. A file any ProjectFile still points at is never
+    deleted, whatever its Blob row says.
+    """
+    storage = attachment_storage()
+    cutoff = timezone.now() - grace_period
+    deleted, reclaimed = 0, 0
+
+    def file_is_stale(name):
+        try:
+            return os.path.getmtime(storage.path(name)) < cutoff.timestamp()
+        except FileNotFoundError:
+            return True
+
+    for blob in Blob.objects.filter(refcount__lte=0, updated_at__lt=cutoff).iterator():
+        name = blob_name(blob.pk)
+        # A dedupe hit touches the file before its new reference is counted
+        if not file_is_stale(name):
+            continue
+        if ProjectFile.objects.filter(attachment=name).exists():
+            logger.warning('Blob %s has refcount %d but is still referenced; keeping it', blob.pk, blob.refcount)
+            continue
+        if dry_run:
+            deleted, reclaimed = deleted + 1, reclaimed + blob.size
+            continue
+        with transaction.atomic():
+            if not Blob.objects.filter(pk=blob.pk, refcount__lte=0).delete()[0]:
+                continue
+            FilePreview.objects.filter(pk=blob.pk).delete()
+        if file_is_stale(name) and storage.exists(name):
+            storage.delete(name)
+        deleted, reclaimed = deleted + 1, reclaimed + blob.size
+
+    known = set(Blob.objects.values_list('pk', flat=True).iterator())
+    orphans = [
+        (name, size) for name, size in _walk_blobs(storage)
+        if blob_hash(name) not in known and file_is_stale(name)
+    ]
+    for start in range(0, len(orphans), ORPHAN_BATCH_SIZE):
+        batch = dict(orphans[start:start + ORPHAN_BATCH_SIZE])
+        referenced = set(ProjectFile.objects.filter(attachment__in=batch).values_list('attachment', flat=True))
+        for name, size in batch.items():
+            if name in referenced:
+                logger.warning('%s is referenced but has no Blob row; keeping it', name)
+                continue
+            if not dry_run:
+                storage.delete(name)
+            deleted, reclaimed = deleted + 1, reclaimed + size
+    return deleted, reclaimed
+
+
+def _walk_blobs(storage):
+    root = storage.path(CAS_PREFIX)
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+            yield name, os.path.getsize(path)
+
+
+def migrate_legacy_files(batch_size=500, stdout=None):
+    """Move attachments saved before deduplication into content-addressed storage
+
+    Each file is hashed, stored under its digest, counted and repointed;
+    the legacy file is removed once no ProjectFile refers to it.
+    Returns the number of files migrated.
+    """
+    storage = attachment_storage()
+    migrated = 0
+    legacy = ProjectFile.objects.exclude(attachment__startswith=CAS_PREFIX + '/').exclude(attachment='')
+    for projectfile in legacy.order_by('pk').iterator(chunk_size=batch_size):
+        old_name = projectfile.attachment.name
+        if not storage.exists(old_name):
+            if stdout:
+                stdout.write(f'Missing file for {projectfile.pk}: {old_name}')
+            continue
+        with storage.open(old_name, 'rb') as source:
+            content_hash = hash_file(source).hexdigest()
+            source.seek(0)
+            source.content_hash = content_hash
+            new_name = storage.save(old_name, source)
+        size = storage.size(new_name)
+        with transaction.atomic():
+            ProjectFile.objects.filter(pk=projectfile.pk).update(
+                attachment=new_name,
+                content_hash=content_hash,
+                size=size,
+                filename=projectfile.filename or os.path.basename(old_name),
+            )
+            retain_blob(content_hash, size)
+        if not ProjectFile.objects.filter(attachment=old_name).exists():
+            storage.delete(old_name)
+        migrated += 1
+    return migrated
+
+
+def savings_report():
+    """Bytes the ProjectFiles refer to versus bytes stored for them"""
+    logical = ProjectFile.objects.filter(attachment__startswith=CAS_PREFIX + '/').aggregate(
+        files=Count('*'), bytes=Sum('size')
+    )
+    physical = Blob.objects.filter(refcount__gt=0).aggregate(blobs=Count('*'), bytes=Sum('size'))
+    legacy = ProjectFile.objects.exclude(attachment__startswith=CAS_PREFIX + '/').aggregate(
+        files=Count('*'), bytes=Sum('size')
+    )
+    logical_bytes = logical['bytes'] or 0
+    physical_bytes = physical['bytes'] or 0
+    return {
+        'files': logical['files'],
+        'blobs': physical['blobs'],
+        'logical_bytes': logical_bytes,
+        'stored_bytes': physical_bytes,
+        'saved_bytes': logical_bytes - physical_bytes,
+        'saved_ratio': round(1 - physical_bytes / logical_bytes, 4) if logical_bytes else 0.0,
+        'legacy_files': legacy['files'],
+        'legacy_bytes': legacy['bytes'] or 0,
+    }
@@ -0,0 +1,75 @@
+"""Helpers shared by the bulk task and todolist endpoints"""
+import uuid
+
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
+
+from .models import Project
+
+
+MAX_BULK_ITEMS = 10000
+BULK_BATCH_SIZE = 1000
+
+
+def get_owned_project(request, project_id):
+    project = get_object_or_404(Project, id=project_id)
+    if project.created_by_id != request.user.id:
+        raise PermissionDenied("You don't have permission to modify this project.")
+    return project
+
+
+def get_item_list(request):
+    """The request body must be a JSON list of at most MAX_BULK_ITEMS items"""
+    items = request.data
+    if not isinstance(items, list):
+        raise ValidationError({'detail': 'Expected a list of items.'})
+    if len(items) > MAX_BULK_ITEMS:
+        raise ValidationError({'detail': f'At most {MAX_BULK_ITEMS} items per request.'})
+    return items
+
+
+def validate_items(serializer_class, items, partial=False):
+    """Validate every item; return (validated data, per-item errors)"""
+    validated = []
+    errors = []
+    for index, item in enumerate(items):
+        serializer = serializer_class(data=item, partial=partial)
+        if serializer.is_valid():
+            validated.append(serializer.validated_data)
+        else:
+            errors.append({'index': index, 'errors': serializer.errors})
+    return validated, errors
+
+
+def parse_ids(items):
+    """Turn a list of ids into UUIDs; return (ids, per-item errors)"""
+    ids = []
+    errors = []
+    for index, item in enumerate(items):
+        try:
+            ids.append(uuid.UUID(str(item)))
+        except ValueError:
+            errors.append({'index': index, 'errors': {'id': ['Must be a valid UUID.']}})
+    return ids, errors
+
+
+def bulk_update_rows(model, objs, fields):
+    """bulk_update() in batches, also setting auto_now fields as save() would
+
+    bulk_update() writes only the listed fields and never calls pre_save(),
+    so an updated_at would otherwise keep its old value.
+    """
+    objs = list(objs)
+    fields = set(fields)
+    for field in model._meta.concrete_fields:
+        if getattr(field, 'auto_now', False):
+            for obj in objs:
+                field.pre_save(obj, add=False)
+            fields.add(field.name)
+    model.objects.bulk_update(objs, sorted(fields), batch_size=BULK_BATCH_SIZE)
+
+
+def error_response(errors):
+    return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,184 @@
+"""Per-project response cache with version-stamp invalidation
+
+Cached values are keyed on (project_id, resource, version). Each project
+has a version token, and signal receivers replace it whenever a row
+belonging to the project is saved or deleted (see project.signals). Entries
+under the old version can then never be read again, and the LRU/TTL
+eviction reclaims them.
+
+The version is read before a value is loaded and replaced only after the
+write commits. A value loaded before a write is therefore always filed
+under a version the write retires, which rules out stale reads.
+
+Versions are random tokens rather than counters. If a version entry is
+evicted, the regenerated token cannot collide with an older one, and no
+backend needs an atomic increment.
+
+The backend comes from settings.PROJECT_CACHE. LocalMemoryBackend only
+sees invalidations made in its own process. Multi-process deployments
+should use DjangoCacheBackend over a shared cache.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.response import Response
+
+
+DEFAULT_PROJECT_CACHE = {
+    'BACKEND': 'project.cache.LocalMemoryBackend',
+    'OPTIONS': {'max_entries': 1024},
+    'TIMEOUT': 300,
+}
+
+_MISSING = object()
+
+
+class LocalMemoryBackend:
+    """LRU cache with per-entry expiry, private to this process"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DjangoCacheBackend:
+    """Shared backend on top of one of settings.CACHES"""
+
+    evictions = None
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key, default=None):
+        return self.cache.get(key, default)
+
+    def set(self, key, value, timeout=None):
+        self.cache.set(key, value, timeout)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def __len__(self):
+        return 0
+
+
+class ProjectCache:
+    def __init__(self, backend, timeout=300):
+        self.backend = backend
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+
+    def _version_key(self, project_id):
+        return f'project-version:{project_id}'
+
+    def version(self, project_id):
+        version = self.backend.get(self._version_key(project_id))
+        if version is None:
+            version = self.bump(project_id)
+        return version
+
+    def bump(self, project_id):
+        """Retire everything cached for a project"""
+        version = uuid.uuid4().hex
+        self.backend.set(self._version_key(project_id), version, None)
+        return version
+
+    def get_or_set(self, project_id, resource, loader):
+        key = f'project:{project_id}:{resource}:{self.version(project_id)}'
+        value = self.backend.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = loader()
+        self.backend.set(key, value, self.timeout)
+        return value
+
+    def stats(self):
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.backend.evictions,
+            'entries': len(self.backend),
+        }
+
+
+_project_cache = None
+_project_cache_lock = threading.Lock()
+
+
+def get_project_cache():
+    """Return the process-wide cache configured by settings.PROJECT_CACHE"""
+    global _project_cache
+    if _project_cache is None:
+        with _project_cache_lock:
+            if _project_cache is None:
+                config = getattr(settings, 'PROJECT_CACHE', DEFAULT_PROJECT_CACHE)
+                backend = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+                _project_cache = ProjectCache(backend, config.get('TIMEOUT', 300))
+    return _project_cache
+
+
+class CachedListMixin:
+    """Serve project-scoped list pages from the project cache
+
+    Only requests filtered by ?project_id= are cached, keyed on the full
+    request URL so every page and filter is stored separately.
+    """
+    cache_resource = None
+
+    def list(self, request, *args, **kwargs):
+        project_id = request.query_params.get('project_id')
+        try:
+            project_id = uuid.UUID(project_id)
+        except (TypeError, ValueError):
+            return super().list(request, *args, **kwargs)
+
+        data = get_project_cache().get_or_set(
+            project_id,
+            f'{self.cache_resource}:{request.build_absolute_uri()}',
+            lambda: super(CachedListMixin, self).list(request, *args, **kwargs).data,
+        )
+        return Response(data)
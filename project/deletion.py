@@ -0,0 +1,34 @@
+"""Delete signal receivers that work once per delete() call, not once per row
+
+QuerySet.delete() sends pre_delete and post_delete for every row it
+removes. Receivers that would issue a statement per row instead keep
+state on the delete's scope, the queryset delete() was called on or the
+single instance, and flush it in one go. The Collector sends every
+pre_delete of a delete before the first post_delete, so pre_delete can
+gather and the first post_delete can flush.
+"""
+from django.db.models import QuerySet
+
+
+def origin_label(origin):
+    """Model label of the instance or queryset a delete() started from"""
+    model = origin.model if isinstance(origin, QuerySet) else origin
+    meta = getattr(model, '_meta', None)
+    return meta.label if meta is not None else None
+
+
+def delete_scope(sender, instance, origin):
+    """The queryset being deleted when instance is one of its own rows, else instance"""
+    if isinstance(origin, QuerySet) and origin.model is sender:
+        return origin
+    return instance
+
+
+def gather(scope, name, value):
+    """Add value to a list kept on scope until take() returns it"""
+    scope.__dict__.setdefault(name, []).append(value)
+
+
+def take(scope, name):
+    """What was stored under name on scope, once; None afterwards"""
+    return scope.__dict__.pop(name, None)
@@ -0,0 +1,206 @@
+"""Authenticated attachment downloads
+
+The view checks ownership, then either streams the file itself (Range,
+If-None-Match and If-Range included) or, behind nginx or Apache, hands
+the transfer to the web server with X-Accel-Redirect / X-Sendfile.
+Streamed responses keep the real file descriptor, so a WSGI server with
+wsgi.file_wrapper (gunicorn) sends the bytes with sendfile() instead of
+copying them through Python. Under ASGI they are read one buffer at a
+time on the request's thread (see stream_over_asgi).
+"""
+import io
+import mimetypes
+import os
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, parse_etags
+
+from .uploads import READ_BUFFER_SIZE
+
+
+DEFAULT_DOWNLOADS = {
+    # 'stream', 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache, lighttpd)
+    'MODE': 'stream',
+    # nginx `internal` location aliasing the attachment storage root
+    'X_ACCEL_PREFIX': '/protected-media/',
+}
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def get_download_config():
+    return {**DEFAULT_DOWNLOADS, **getattr(settings, 'DOWNLOADS', {})}
+
+
+def attachment_etag(projectfile):
+    """Strong ETag from the content hash; files saved before hashing have none"""
+    return f'"{projectfile.content_hash}"' if projectfile.content_hash else None
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single `bytes=` range, None to send the whole file
+
+    Raises ValueError when the range cannot be satisfied. Multiple ranges
+    are answered with the whole file, which RFC 9110 allows.
+    """
+    match = _RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+class _FileRange:
+    """Part of an open file that looks like a whole file to FileResponse
+
+    read() stops at the end of the range and fileno() is the real file's,
+    so sendfile() can still be used for the requested bytes.
+    """
+
+    def __init__(self, file, start, end):
+        self.file = file
+        self.start = start
+        self.stop = end + 1
+        file.seek(start)
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.file.tell()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_END:
+            return self.file.seek(self.stop + offset)
+        return self.file.seek(offset, whence)
+
+    def read(self, size=-1):
+        remaining = self.stop - self.file.tell()
+        if remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        return self.file.read(size)
+
+    def close(self):
+        self.file.close()
+
+
+def serve_attachment(request, projectfile, as_attachment=True):
+    """Response for one ProjectFile the user is allowed to read"""
+    etag = attachment_etag(projectfile)
+    filename = projectfile.filename or os.path.basename(projectfile.attachment.name)
+
+    # 304 (If-None-Match) and 412 (If-Match) before touching the file
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        config = get_download_config()
+        if config['MODE'] == 'stream':
+            response = _stream(request, projectfile, etag, filename, as_attachment)
+        else:
+            response = _offload(config, projectfile, filename, as_attachment)
+
+    if etag:
+        response.headers['ETag'] = etag
+    # Only the owner may see it, but it can be revalidated cheaply by ETag
+    patch_cache_control(response, private=True, no_cache=True)
+    return stream_over_asgi(request, response)
+
+
+def stream_over_asgi(request, response):
+    """Give a streaming response an async iterator when served over ASGI
+
+    Django's ASGI handler reads a sync iterator to the end before sending
+    the first byte, which would hold a whole attachment or export in
+    memory. WSGI responses are left alone so wsgi.file_wrapper still applies.
+    """
+    if isinstance(request, ASGIRequest) and response.streaming and not response.is_async:
+        response.streaming_content = _read_in_buffers(response.streaming_content)
+    return response
+
+
+async def _read_in_buffers(iterator):
+    # The request's own sync thread, where an export's cursor lives
+    read = sync_to_async(_next_buffer)
+    while buffer := await read(iterator):
+        yield buffer
+
+
+def _next_buffer(iterator):
+    parts = []
+    size = 0
+    for part in iterator:
+        parts.append(part)
+        size += len(part)
+        if size >= READ_BUFFER_SIZE:
+            break
+    return b''.join(parts)
+
+
+def _stream(request, projectfile, etag, filename, as_attachment):
+    storage = projectfile.attachment.storage
+    file = storage.open(projectfile.attachment.name, 'rb')
+    size = projectfile.size if projectfile.size is not None else storage.size(projectfile.attachment.name)
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if range_header and request.method in ('GET', 'HEAD') and _if_range_matches(request, etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            file.close()
+            response = HttpResponse(status=416)
+            response.headers['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range:
+        start, end = byte_range
+        response = FileResponse(_FileRange(file, start, end), as_attachment=as_attachment, filename=filename)
+        response.status_code = 206
+        response.headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+    else:
+        response = FileResponse(file, as_attachment=as_attachment, filename=filename)
+    response.block_size = READ_BUFFER_SIZE
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _if_range_matches(request, etag):
+    """Honour Range only if If-Range is absent or names the current (strong) ETag"""
+    if_range = request.headers.get('If-Range')
+    if if_range is None:
+        return True
+    return bool(etag) and not if_range.startswith('W/') and etag in parse_etags(if_range)
+
+
+def _offload(config, projectfile, filename, as_attachment):
+    # The web server handles Range and the transfer itself
+    response = HttpResponse()
+    if config['MODE'] == 'x-accel-redirect':
+        response.headers['X-Accel-Redirect'] = config['X_ACCEL_PREFIX'] + projectfile.attachment.name
+    elif config['MODE'] == 'x-sendfile':
+        response.headers['X-Sendfile'] = projectfile.attachment.path
+    else:
+        raise ValueError(f"Unknown DOWNLOADS['MODE'] {config['MODE']!r}")
+    # Stored names are hashes without an extension, so the server cannot guess the type
+    response.headers['Content-Type'] = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response.headers['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    return response
@@ -0,0 +1,119 @@
+"""ASGI endpoint for the project live event stream
+
+Django handles every ASGI request inside its own thread-sensitive
+context, and the first sync call there (the request_started signal,
+session and auth middleware) gives the request a dedicated thread that
+lives until the response ends. An event stream stays open as long as
+the page does, so polysia_projects.asgi routes it here, in front of
+Django. The session and ownership check run once on asgiref's shared
+sync thread; after that a connection holds only its bus subscription.
+"""
+import asyncio
+import json
+import re
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections
+from django.http import HttpRequest
+from django.http.cookie import parse_cookie
+
+from .live import get_bus, project_channel
+from .models import Project
+
+
+EVENTS_PATH_RE = re.compile(
+    r'^/projects/(?P<pk>[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})/events/$'
+)
+
+STREAM_HEADERS = [
+    (b'content-type', b'text/event-stream'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+]
+
+
+def route_project_events(application, heartbeat=15):
+    """Wrap the Django ASGI application, serving event streams itself"""
+
+    async def router(scope, receive, send):
+        if scope['type'] == 'http':
+            path = scope['path']
+            root_path = scope.get('root_path', '')
+            if root_path and path.startswith(root_path):
+                path = path[len(root_path):]
+            match = EVENTS_PATH_RE.match(path)
+            if match:
+                return await project_events(scope, receive, send, match['pk'], heartbeat)
+        return await application(scope, receive, send)
+
+    return router
+
+
+def _check_access(cookie_header, pk):
+    """HTTP status for the event stream: 200, 403 without a session, 404 if not the owner"""
+    close_old_connections()
+    try:
+        session_key = parse_cookie(cookie_header).get(settings.SESSION_COOKIE_NAME)
+        if not session_key:
+            return 403
+        request = HttpRequest()
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+        user = get_user(request)
+        if not user.is_authenticated:
+            return 403
+        if not Project.objects.filter(created_by=user, pk=pk).exists():
+            return 404
+        return 200
+    finally:
+        close_old_connections()
+
+
+async def project_events(scope, receive, send, pk, heartbeat=15):
+    """Server-sent events for comment and note changes on a project"""
+    cookie_header = '; '.join(
+        value.decode('latin-1') for name, value in scope['headers'] if name == b'cookie'
+    )
+    status = await sync_to_async(_check_access)(cookie_header, pk)
+    if status != 200:
+        await send({'type': 'http.response.start', 'status': status, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    subscription = get_bus().subscribe(project_channel(pk))
+    stream = asyncio.ensure_future(_stream(subscription, send, heartbeat))
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await asyncio.wait((stream, disconnected), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        stream.cancel()
+        disconnected.cancel()
+        subscription.close()
+    if stream.done() and not stream.cancelled():
+        error = stream.exception()
+        # Sending to a client that has just gone away raises OSError
+        if error is not None and not isinstance(error, OSError):
+            raise error
+
+
+async def _stream(subscription, send, heartbeat):
+    await send({'type': 'http.response.start', 'status': 200, 'headers': STREAM_HEADERS})
+    await _send_chunk(send, 'retry: 5000\n\n')
+    while True:
+        try:
+            event = await asyncio.wait_for(subscription.get(), heartbeat)
+        except asyncio.TimeoutError:
+            await _send_chunk(send, ': keep-alive\n\n')
+            continue
+        await _send_chunk(send, f"event: {event['type']}\ndata: {json.dumps(event)}\n\n")
+
+
+async def _send_chunk(send, text):
+    await send({'type': 'http.response.body', 'body': text.encode(), 'more_body': True})
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
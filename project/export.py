@@ -0,0 +1,194 @@
+"""Streaming export of a project tree as JSONL, CSV or a zip with attachments
+
+Every section is read with .values().iterator(), and output is produced
+one record at a time, so memory use does not grow with the project. Parents
+always come before their children (project, todolists, tasks, ...), which is
+the order the importer expects.
+
+Exports requested through the API run as jobs (project.jobs) and are
+written to exports/ in default storage with save_export.
+"""
+import csv
+import json
+import uuid
+import zipfile
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Comment, ProjectFile, ProjectNote, Reminder
+
+
+CHUNK_SIZE = 2000
+
+EXPORT_DIR = 'exports'
+
+CSV_COLUMNS = [
+    'type', 'id', 'project', 'todolist', 'name', 'description', 'is_done', 'content', 'message',
+    'title', 'user', 'status', 'reminder_datetime', 'start_date', 'end_date', 'attachment',
+    'created_at', 'updated_at',
+]
+
+
+def _section(record_type, queryset, **renames):
+    fields = list(renames.values())
+    for row in queryset.order_by().values(*fields).iterator(chunk_size=CHUNK_SIZE):
+        record = {'type': record_type}
+        for name, field in renames.items():
+            record[name] = row[field]
+        yield record
+
+
+def export_records(project):
+    """Yield every record of a project tree as a flat dict, parents first"""
+    from task.models import Task
+    from todolist.models import Todolist
+
+    yield {
+        'type': 'project',
+        'id': project.pk,
+        'name': project.name,
+        'description': project.description,
+        'start_date': project.start_date,
+        'end_date': project.end_date,
+        'created_at': project.created_at,
+        'updated_at': project.updated_at,
+    }
+    yield from _section(
+        'todolist', Todolist.objects.filter(project=project),
+        id='id', project='project_id', name='name', description='description',
+    )
+    yield from _section(
+        'task', Task.objects.filter(project=project),
+        id='id', project='project_id', todolist='todolist_id', name='name',
+        description='description', is_done='is_done',
+    )
+    yield from _section(
+        'note', ProjectNote.objects.filter(project=project),
+        id='id', project='project_id', content='content', created_at='created_at', updated_at='updated_at',
+    )
+    yield from _section(
+        'comment', Comment.objects.filter(project=project),
+        id='id', project='project_id', user='user__email', message='message',
+        created_at='timestamp', updated_at='updated_at',
+    )
+    yield from _section(
+        'reminder', Reminder.objects.filter(project=project),
+        id='id', project='project_id', title='title', reminder_datetime='reminder_datetime',
+        status='status', created_at='created_at', updated_at='updated_at',
+    )
+    yield from _section(
+        'file', ProjectFile.objects.filter(project=project),
+        id='id', project='project_id', name='name', attachment='attachment',
+    )
+
+
+def export_jsonl(project):
+    for record in export_records(project):
+        yield json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+
+
+class _Echo:
+    """File-like object that hands back whatever is written to it"""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(project):
+    writer = csv.DictWriter(_Echo(), fieldnames=CSV_COLUMNS, restval='')
+    yield writer.writeheader()
+    for record in export_records(project):
+        yield writer.writerow(record)
+
+
+class _ZipStream:
+    """Write-only, unseekable sink that zipfile writes into
+
+    zipfile falls back to data descriptors when it cannot seek, so entries
+    are emitted as they are written and drained between chunks.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return b''.join(chunks)
+
+
+def export_zip(project):
+    """project.jsonl plus every attachment under files/<id>/<name>"""
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open('project.jsonl', mode='w', force_zip64=True) as entry:
+            for line in export_jsonl(project):
+                entry.write(line.encode())
+                if len(stream._chunks) > 64:
+                    yield stream.drain()
+        yield stream.drain()
+
+        for projectfile in ProjectFile.objects.filter(project=project).iterator(chunk_size=CHUNK_SIZE):
+            if not projectfile.attachment or not projectfile.attachment.storage.exists(projectfile.attachment.name):
+                continue
+            filename = projectfile.filename or projectfile.attachment.name.rsplit('/', 1)[-1]
+            arcname = f'files/{projectfile.pk}/{filename}'
+            # Attachments are usually compressed already; store them as-is
+            info = zipfile.ZipInfo(arcname)
+            info.compress_type = zipfile.ZIP_STORED
+            with projectfile.attachment.open('rb') as source, archive.open(info, mode='w', force_zip64=True) as entry:
+                for chunk in source.chunks():
+                    entry.write(chunk)
+                    yield stream.drain()
+            yield stream.drain()
+    yield stream.drain()
+
+
+class _ExportFile(File):
+    """Hands an export generator to Storage.save without buffering it"""
+
+    def __init__(self, chunks, name):
+        super().__init__(None, name)
+        self._chunks = chunks
+
+    def chunks(self, chunk_size=None):
+        for chunk in self._chunks:
+            yield chunk.encode() if isinstance(chunk, str) else chunk
+
+
+def save_export(project, export_format):
+    """Write an export to exports/<project_id>/<random>.<ext> in default storage; returns the name"""
+    generate, _, extension = EXPORT_FORMATS[export_format]
+    name = f'{EXPORT_DIR}/{project.pk}/{uuid.uuid4().hex}.{extension}'
+    return default_storage.save(name, _ExportFile(generate(project), name))
+
+
+def prune_exports(max_age):
+    """Delete saved exports older than max_age; returns how many"""
+    if not default_storage.exists(EXPORT_DIR):
+        return 0
+    cutoff = timezone.now() - max_age
+    deleted = 0
+    for project_dir in default_storage.listdir(EXPORT_DIR)[0]:
+        for filename in default_storage.listdir(f'{EXPORT_DIR}/{project_dir}')[1]:
+            name = f'{EXPORT_DIR}/{project_dir}/{filename}'
+            if default_storage.get_modified_time(name) < cutoff:
+                default_storage.delete(name)
+                deleted += 1
+    return deleted
+
+
+EXPORT_FORMATS = {
+    'jsonl': (export_jsonl, 'application/x-ndjson', 'jsonl'),
+    'csv': (export_csv, 'text/csv', 'csv'),
+    'zip': (export_zip, 'application/zip', 'zip'),
+}
@@ -0,0 +1,277 @@
+"""Streaming import of projects, todolists and tasks from JSONL or CSV
+
+Input uses the record layout written by project.export: one record per
+line, with a `type` column and parents before children. Source ids are
+mapped to deterministic UUIDs (uuid5 of the importing user and the source
+id), so parent references resolve without a lookup table in the database
+and re-running an import is idempotent: rows that already exist are
+left alone and counted as existing, not imported.
+
+Progress is recorded in an optional checkpoint file after every committed
+transaction; an interrupted import picks up from the last committed line.
+"""
+import csv
+import io
+import json
+import os
+import uuid
+
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from search.indexing import index_instances
+
+from .cache import get_project_cache
+from .models import Project
+
+
+IMPORT_BATCH_SIZE = 5000
+IMPORT_BATCHES_PER_TRANSACTION = 10
+MAX_REPORTED_ERRORS = 100
+
+IMPORTED_TYPES = ('project', 'todolist', 'task')
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def read_records(stream, import_format):
+    """Yield (line number, record) from a text stream, one line at a time"""
+    if import_format == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ImportFormatError(f'Line {line_number}: invalid JSON ({e})') from e
+            yield line_number, record
+    elif import_format == 'csv':
+        # Line 1 is the header, so data rows start at 2
+        for line_number, record in enumerate(csv.DictReader(stream), start=2):
+            yield line_number, record
+    else:
+        raise ImportFormatError(f'Unknown import format: {import_format}')
+
+
+def guess_format(filename):
+    return 'csv' if filename.lower().endswith('.csv') else 'jsonl'
+
+
+def open_text(binary_file):
+    return io.TextIOWrapper(binary_file, encoding='utf-8', newline='')
+
+
+def _blank(value):
+    return value is None or value == ''
+
+
+def _text(value):
+    return None if _blank(value) else str(value)
+
+
+def _date(value):
+    if _blank(value):
+        return None
+    return value if not isinstance(value, str) else parse_date(value[:10])
+
+
+def _bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes')
+
+
+class Checkpoint:
+    """Last committed line number, written atomically to a small JSON file"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        with open(self.path) as f:
+            return json.load(f)
+
+    def save(self, line_number, stats):
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'line': line_number, **stats}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class ProjectImporter:
+    """Resolve parent references and write records in batched bulk_create calls"""
+
+    def __init__(self, user, batch_size=IMPORT_BATCH_SIZE,
+                 batches_per_transaction=IMPORT_BATCHES_PER_TRANSACTION, checkpoint=None):
+        self.user = user
+        self.batch_size = batch_size
+        self.batches_per_transaction = batches_per_transaction
+        self.checkpoint = checkpoint or Checkpoint(None)
+        self.namespace = uuid.uuid5(uuid.NAMESPACE_URL, f'project-import:{user.pk}')
+
+        # Only projects and todolists are remembered; tasks are never referenced
+        self.projects = set()
+        self.todolist_projects = {}
+
+        self.buffers = {record_type: [] for record_type in IMPORTED_TYPES}
+        self.touched_projects = set()
+        # Rows written per type; rows an earlier import already wrote are 'existing'
+        self.stats = {'project': 0, 'todolist': 0, 'task': 0, 'existing': 0, 'skipped': 0, 'errors': 0}
+        self.errors = []
+
+    def map_id(self, record_type, source_id):
+        return uuid.uuid5(self.namespace, f'{record_type}:{source_id}')
+
+    def run(self, records):
+        from task.counters import recount_task_counters
+        from task.models import Task
+        from todolist.models import Todolist
+
+        self.models = {'project': Project, 'todolist': Todolist, 'task': Task}
+        state = self.checkpoint.load()
+        self.resume_after = state.pop('line', 0)
+        self.stats.update(state)
+        self.line_number = self.resume_after
+        records = iter(records)
+
+        finished = False
+        while not finished:
+            with transaction.atomic():
+                finished = self.import_segment(records)
+                touched, self.touched_projects = self.touched_projects, set()
+                # bulk_create sends no signals, so counters and cached project
+                # pages are brought up to date here
+                recount_task_counters(touched)
+                transaction.on_commit(lambda touched=touched: _bump_projects(touched))
+            self.checkpoint.save(self.line_number, self.stats)
+
+        self.checkpoint.clear()
+        return {**self.stats, 'error_list': self.errors}
+
+    def import_segment(self, records):
+        """Import until a transaction's worth of batches is written; True once input runs out"""
+        batches = 0
+        for self.line_number, record in records:
+            if self.line_number <= self.resume_after:
+                # Already committed by an earlier run; only rebuild the parent maps
+                self.remember(self.line_number, record)
+                continue
+            instance = self.build(self.line_number, record)
+            if instance is None:
+                continue
+            buffer = self.buffers[record['type']]
+            buffer.append(instance)
+            if len(buffer) >= self.batch_size:
+                self.flush()
+                batches += 1
+                if batches >= self.batches_per_transaction:
+                    return False
+        self.flush()
+        return True
+
+    def remember(self, line_number, record):
+        record_type = record.get('type')
+        if record_type == 'project':
+            self.projects.add(self.map_id('project', record.get('id') or f'line:{line_number}'))
+        elif record_type == 'todolist':
+            project_id = self.map_id('project', record.get('project'))
+            if project_id in self.projects:
+                self.todolist_projects[self.map_id('todolist', record.get('id') or f'line:{line_number}')] = project_id
+
+    def error(self, line_number, message):
+        self.stats['errors'] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'error': message})
+
+    def build(self, line_number, record):
+        record_type = record.get('type')
+        if record_type not in IMPORTED_TYPES:
+            self.stats['skipped'] += 1
+            return None
+
+        name = _text(record.get('name'))
+        if not name:
+            self.error(line_number, f'{record_type} without a name')
+            return None
+        source_id = record.get('id') or f'line:{line_number}'
+        object_id = self.map_id(record_type, source_id)
+
+        if record_type == 'project':
+            self.projects.add(object_id)
+            return Project(
+                id=object_id,
+                name=name[:255],
+                description=_text(record.get('description')),
+                start_date=_date(record.get('start_date')),
+                end_date=_date(record.get('end_date')),
+                created_by=self.user,
+            )
+
+        if record_type == 'todolist':
+            project_id = self.map_id('project', record.get('project'))
+            if project_id not in self.projects:
+                self.error(line_number, f'todolist refers to unknown project {record.get("project")!r}')
+                return None
+            self.todolist_projects[object_id] = project_id
+            return self.models['todolist'](
+                id=object_id,
+                project_id=project_id,
+                name=name[:255],
+                description=_text(record.get('description')),
+                created_by=self.user,
+            )
+
+        todolist_id = self.map_id('todolist', record.get('todolist'))
+        project_id = self.todolist_projects.get(todolist_id)
+        if project_id is None:
+            self.error(line_number, f'task refers to unknown todolist {record.get("todolist")!r}')
+            return None
+        return self.models['task'](
+            id=object_id,
+            project_id=project_id,
+            todolist_id=todolist_id,
+            name=name[:255],
+            description=_text(record.get('description')),
+            is_done=_bool(record.get('is_done', False)),
+            created_by=self.user,
+        )
+
+    def flush(self):
+        """Write every buffer, parents first"""
+        for record_type in IMPORTED_TYPES:
+            rows = self.buffers[record_type]
+            if not rows:
+                continue
+            model = self.models[record_type]
+            # bulk_create(ignore_conflicts=True) does not report which rows it
+            # skipped, so look them up first. Only rows this import writes are
+            # counted and indexed; the conflict guard stays for concurrent imports.
+            ids = [row.id for row in rows]
+            existing = set(model._base_manager.filter(pk__in=ids).values_list('pk', flat=True))
+            rows = [row for row in rows if row.id not in existing]
+            model.objects.bulk_create(rows, ignore_conflicts=True)
+            index_instances(rows)
+            self.stats[record_type] += len(rows)
+            self.stats['existing'] += len(existing)
+            if record_type == 'project':
+                self.touched_projects.update(row.id for row in rows)
+            else:
+                self.touched_projects.update(row.project_id for row in rows)
+            self.buffers[record_type] = []
+
+
+def _bump_projects(project_ids):
+    cache = get_project_cache()
+    for project_id in project_ids:
+        cache.bump(project_id)
@@ -0,0 +1,41 @@
+"""Deferred work for the project app, run by `manage.py run_workers`
+
+Reminder status transitions are not a job: `manage.py
+run_reminder_scheduler` fires them, and a second driver would race it.
+"""
+from datetime import timedelta
+
+from django.urls import reverse
+
+from jobs.queue import job
+
+from .export import prune_exports, save_export
+from .models import Project
+from .previews import render_and_store
+
+
+EXPORT_RETENTION = timedelta(days=1)
+
+
+@job('project.export', max_attempts=3)
+def export_project(project_id, format):
+    project = Project.objects.filter(pk=project_id).first()
+    if project is None:
+        return {'error': 'Project no longer exists.'}
+    name = save_export(project, format)
+    filename = name.rsplit('/', 1)[-1]
+    return {
+        'format': format,
+        'download_url': reverse('project:download_export', args=[project.pk, filename]),
+    }
+
+
+@job('project.prune_exports', every=timedelta(hours=1), max_attempts=1)
+def remove_old_exports():
+    return {'deleted': prune_exports(EXPORT_RETENTION)}
+
+
+@job('project.render_previews', queue='previews', max_attempts=3)
+def render_previews(items):
+    """items: [content_hash, attachment name, filename] lists"""
+    return render_and_store(items)
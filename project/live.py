@@ -0,0 +1,174 @@
+"""In-process pub/sub bus feeding the project live event stream
+
+Model signals publish small events ("comment 123 was created") on a
+per-project channel. project.events subscribes to a channel and streams
+the events to the browser, which then pulls the actual rows through the
+changes feed.
+
+The backend is chosen with settings.LIVE_FEED['BACKEND']:
+
+* InMemoryBackend delivers within one process (development, tests).
+* BrokerBackend relays through the tiny TCP broker started with
+  `manage.py run_live_broker`, so events published by one worker reach
+  subscribers held by another.
+"""
+import asyncio
+import json
+import logging
+import socket
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_LIVE_FEED = {
+    'BACKEND': 'project.live.InMemoryBackend',
+    'OPTIONS': {},
+}
+
+
+def project_channel(project_id):
+    return f'project:{project_id}'
+
+
+class Subscription:
+    """A bounded queue of events for one connected client
+
+    put() may be called from any thread; get() is awaited on the event loop
+    that created the subscription. Events are dropped for clients that fall
+    too far behind instead of growing the queue without limit.
+    """
+
+    def __init__(self, backend, channel, max_queue=100):
+        self.backend = backend
+        self.channel = channel
+        self.dropped = 0
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=max_queue)
+
+    def put(self, message):
+        self._loop.call_soon_threadsafe(self._put_nowait, message)
+
+    def _put_nowait(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def get(self):
+        return await self._queue.get()
+
+    def close(self):
+        self.backend.unsubscribe(self)
+
+
+class InMemoryBackend:
+    """Deliver events to subscribers living in this process"""
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.max_queue)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+class BrokerBackend(InMemoryBackend):
+    """Relay events between processes through the local broker
+
+    Publishing writes one JSON line to the broker over a persistent
+    connection. Each process keeps a single reader connection, started on
+    its first subscription, and fans incoming events out to its local
+    subscribers.
+    """
+
+    def __init__(self, host='127.0.0.1', port=8765, max_queue=100):
+        super().__init__(max_queue=max_queue)
+        self.host = host
+        self.port = port
+        self._publish_socket = None
+        self._publish_lock = threading.Lock()
+        self._reader_task = None
+
+    def publish(self, channel, message):
+        line = json.dumps({'channel': channel, 'message': message}).encode() + b'\n'
+        with self._publish_lock:
+            for attempt in range(2):
+                try:
+                    if self._publish_socket is None:
+                        self._publish_socket = socket.create_connection((self.host, self.port), timeout=2)
+                        self._publish_socket.sendall(b'publish\n')
+                    self._publish_socket.sendall(line)
+                    return
+                except OSError:
+                    if self._publish_socket is not None:
+                        self._publish_socket.close()
+                    self._publish_socket = None
+            logger.warning('Live broker unreachable, dropped event for %s', channel)
+
+    def subscribe(self, channel):
+        subscription = super().subscribe(channel)
+        if self._reader_task is None or self._reader_task.done():
+            self._reader_task = asyncio.get_running_loop().create_task(self._read_from_broker())
+        return subscription
+
+    async def _read_from_broker(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+                writer.write(b'subscribe\n')
+                await writer.drain()
+                while line := await reader.readline():
+                    event = json.loads(line)
+                    InMemoryBackend.publish(self, event['channel'], event['message'])
+            except (OSError, ValueError):
+                logger.warning('Lost connection to live broker, retrying')
+            await asyncio.sleep(1)
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_bus():
+    """Return the process-wide bus configured by settings.LIVE_FEED"""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                config = getattr(settings, 'LIVE_FEED', DEFAULT_LIVE_FEED)
+                backend_class = import_string(config['BACKEND'])
+                _bus = backend_class(**config.get('OPTIONS', {}))
+    return _bus
+
+
+def publish_project_event(project_id, event):
+    get_bus().publish(project_channel(project_id), event)
+
@@ -0,0 +1,99 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from project.cache import get_project_cache
+from project.models import Comment, Project, ProjectNote, Reminder
+from project.viewsets import CommentViewSet, ProjectNoteViewSet, ReminderViewSet
+
+
+BENCHMARK_EMAIL = 'conditional-benchmark@example.invalid'
+
+RESOURCES = {
+    'comments': (CommentViewSet, Comment),
+    'notes': (ProjectNoteViewSet, ProjectNote),
+    'reminders': (ReminderViewSet, Reminder),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare the throughput of 304 Not Modified answers with full list responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resource', choices=sorted(RESOURCES), default='comments')
+        parser.add_argument('--rows', type=int, default=1000, help='Rows in the benchmark project')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per mode')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the benchmark user and exit')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(email=BENCHMARK_EMAIL).delete()
+            self.stdout.write(f'Deleted {deleted} benchmark row(s)')
+            return
+
+        self.user, _ = User.objects.get_or_create(email=BENCHMARK_EMAIL, defaults={'name': 'Conditional benchmark'})
+        # One project per size, so a smaller run is never measured on a bigger project
+        self.project, _ = Project.objects.get_or_create(
+            name=f"Conditional benchmark ({options['rows']} {options['resource']})", created_by=self.user
+        )
+        viewset, model = RESOURCES[options['resource']]
+        self.populate(model, options['rows'])
+        self.view = viewset.as_view({'get': 'list'})
+        self.factory = APIRequestFactory()
+        self.path = f"/project-features/api/{options['resource']}/"
+
+        etag = self.get()['ETag']
+        modes = [
+            # The project cache would hide serialization, so it is bumped first
+            ('full', {}, True),
+            ('304', {'HTTP_IF_NONE_MATCH': etag}, False),
+        ]
+        if viewset is not ReminderViewSet:
+            modes.insert(1, ('full, cached', {}, False))
+
+        for label, headers, cold in modes:
+            timings = []
+            sizes = set()
+            for _ in range(options['requests']):
+                if cold:
+                    get_project_cache().bump(self.project.pk)
+                started = time.perf_counter()
+                response = self.get(**headers)
+                timings.append(time.perf_counter() - started)
+                sizes.add(len(response.content))
+            timings.sort()
+            self.stdout.write(
+                f"{label:<12} {options['resource']}, {options['rows']} rows: "
+                f'{len(timings) / sum(timings):.0f} requests/s, '
+                f'p50 {statistics.median(timings) * 1000:.2f}ms, '
+                f'{max(sizes)} byte body, status {response.status_code}'
+            )
+
+    def get(self, **headers):
+        request = self.factory.get(self.path, {'project_id': str(self.project.pk)}, **headers)
+        force_authenticate(request, self.user)
+        response = self.view(request)
+        response.render()
+        return response
+
+    def populate(self, model, rows):
+        existing = model.objects.filter(project=self.project).count()
+        now = timezone.now()
+        new_rows = []
+        for index in range(existing, rows):
+            if model is Comment:
+                new_rows.append(Comment(project=self.project, user=self.user, message=f'Comment {index}'))
+            elif model is ProjectNote:
+                new_rows.append(ProjectNote(project=self.project, content=f'Note {index}'))
+            else:
+                new_rows.append(Reminder(
+                    project=self.project, created_by=self.user, title=f'Reminder {index}',
+                    reminder_datetime=now + timedelta(minutes=index),
+                ))
+        model.objects.bulk_create(new_rows, batch_size=1000)
@@ -0,0 +1,106 @@
+import http.client
+import os
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from project.models import Project, ProjectFile
+from project.uploads import READ_BUFFER_SIZE
+
+
+BENCHMARK_EMAIL = 'download-benchmark@example.invalid'
+
+MIB = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Download an attachment, a range of it and a small file from a running server, '
+        'reporting throughput and the server process\'s CPU time and memory'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server')
+        parser.add_argument('--size', type=int, default=1024, help='Large file size in MiB')
+        parser.add_argument('--requests', type=int, default=3, help='Downloads per case')
+        parser.add_argument('--server-pid', type=int,
+                            help='Process serving the requests, e.g. the gunicorn worker (Linux)')
+        parser.add_argument('--cleanup', action='store_true',
+                            help='Delete the benchmark user and exit; `gc_blobs` then removes the files')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(email=BENCHMARK_EMAIL).delete()
+            self.stdout.write(f'Deleted {deleted} benchmark row(s)')
+            return
+
+        user, _ = User.objects.get_or_create(email=BENCHMARK_EMAIL, defaults={'name': 'Download benchmark'})
+        project, _ = Project.objects.get_or_create(name='Download benchmark', created_by=user)
+        large = self.attachment(project, options['size'] * MIB)
+        small = self.attachment(project, MIB)
+        client = Client()
+        client.force_login(user)
+        self.cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        url = urlsplit(options['url'])
+        self.connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=300)
+        self.buffer = bytearray(READ_BUFFER_SIZE)
+
+        half = large.size // 2
+        for label, projectfile, headers in (
+            (f'{options["size"]} MiB', large, {}),
+            (f'{half // MIB} MiB range', large, {'Range': f'bytes={half}-{large.size - 1}'}),
+            ('1 MiB', small, {}),
+        ):
+            path = f'/projects/{project.pk}/files/{projectfile.pk}/'
+            cpu_before = self.server_cpu(options['server_pid'])
+            started = time.perf_counter()
+            for _ in range(options['requests']):
+                received = self.download(path, headers)
+            elapsed = (time.perf_counter() - started) / options['requests']
+            line = f'{label:<16} {received / elapsed / 1e9:.2f} GB/s, {elapsed * 1000:.1f}ms per download'
+            if options['server_pid']:
+                cpu = (self.server_cpu(options['server_pid']) - cpu_before) / options['requests']
+                line += f', server CPU {cpu * 1000:.0f}ms, RSS {self.server_rss(options["server_pid"])}'
+            self.stdout.write(line)
+
+    def attachment(self, project, size):
+        name = f'benchmark-{size // MIB}MiB.bin'
+        existing = ProjectFile.objects.filter(project=project, name=name).first()
+        if existing is not None:
+            return existing
+        block = os.urandom(MIB)
+        with tempfile.TemporaryFile() as content:
+            for _ in range(size // MIB):
+                content.write(block)
+            content.seek(0)
+            return ProjectFile.objects.create(project=project, name=name, attachment=File(content, name))
+
+    def download(self, path, headers):
+        self.connection.request('GET', path, headers={'Cookie': self.cookie, **headers})
+        response = self.connection.getresponse()
+        if response.status not in (200, 206):
+            raise CommandError(f'{path} answered {response.status}')
+        received = 0
+        while count := response.readinto(self.buffer):
+            received += count
+        return received
+
+    def server_cpu(self, pid):
+        """User plus system CPU seconds of the server process"""
+        if pid is None:
+            return 0
+        with open(f'/proc/{pid}/stat') as stat:
+            fields = stat.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+    def server_rss(self, pid):
+        with open(f'/proc/{pid}/status') as status:
+            fields = dict(line.split(':', 1) for line in status)
+        return fields['VmRSS'].strip()
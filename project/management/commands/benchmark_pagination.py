@@ -0,0 +1,101 @@
+import statistics
+import time
+from datetime import timedelta
+from urllib.parse import parse_qsl, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from project.cache import get_project_cache
+from project.models import Comment, Project, ProjectNote, Reminder
+from project.viewsets import CommentViewSet, ProjectNoteViewSet, ReminderViewSet
+
+
+BENCHMARK_EMAIL = 'pagination-benchmark@example.invalid'
+
+RESOURCES = {
+    'comments': (CommentViewSet, Comment),
+    'notes': (ProjectNoteViewSet, ProjectNote),
+    'reminders': (ReminderViewSet, Reminder),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare deep-page latency of page-number and cursor pagination on a list endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resource', choices=sorted(RESOURCES), default='comments')
+        parser.add_argument('--rows', type=int, default=100000, help='Rows in the benchmark project')
+        parser.add_argument('--page', type=int, default=1000, help='Page to measure (20 rows per page)')
+        parser.add_argument('--requests', type=int, default=20, help='Timed requests per paginator')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the benchmark user and exit')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(email=BENCHMARK_EMAIL).delete()
+            self.stdout.write(f'Deleted {deleted} benchmark row(s)')
+            return
+
+        self.user, _ = User.objects.get_or_create(email=BENCHMARK_EMAIL, defaults={'name': 'Pagination benchmark'})
+        # One project per size, so a smaller run is never measured on a bigger project
+        self.project, _ = Project.objects.get_or_create(
+            name=f"Pagination benchmark ({options['rows']} {options['resource']})", created_by=self.user
+        )
+        viewset, model = RESOURCES[options['resource']]
+        self.populate(model, options['rows'])
+        self.view = viewset.as_view({'get': 'list'})
+        self.factory = APIRequestFactory()
+        self.path = f"/project-features/api/{options['resource']}/"
+        page = options['page']
+        params = {'project_id': str(self.project.pk)}
+
+        response = self.get({**params, 'page': page})
+        if response.status_code != 200:
+            raise CommandError(f'Page {page} does not exist, use more --rows')
+
+        # Cursors are opaque, so walk the next links to reach the same page
+        cursor_params = {**params, 'pagination': 'cursor'}
+        for _ in range(page - 1):
+            cursor_params = dict(parse_qsl(urlsplit(self.get(cursor_params).data['next']).query))
+
+        for label, page_params in (('page-number', {**params, 'page': page}), ('cursor', cursor_params)):
+            first_page = {key: value for key, value in page_params.items() if key not in ('page', 'cursor')}
+            for description, request_params in (('page 1', first_page), (f'page {page}', page_params)):
+                timings = sorted(self.timed_get(request_params) for _ in range(options['requests']))
+                self.stdout.write(
+                    f"{label:<11} {description:<9} {options['resource']}, {options['rows']} rows: "
+                    f'p50 {statistics.median(timings):.1f}ms, max {timings[-1]:.1f}ms'
+                )
+
+    def get(self, params):
+        request = self.factory.get(self.path, params)
+        force_authenticate(request, self.user)
+        response = self.view(request)
+        response.render()
+        return response
+
+    def timed_get(self, params):
+        # Measure the database, not the project cache
+        get_project_cache().bump(self.project.pk)
+        started = time.perf_counter()
+        self.get(params)
+        return (time.perf_counter() - started) * 1000
+
+    def populate(self, model, rows):
+        existing = model.objects.filter(project=self.project).count()
+        now = timezone.now()
+        new_rows = []
+        for index in range(existing, rows):
+            if model is Comment:
+                new_rows.append(Comment(project=self.project, user=self.user, message=f'Comment {index}'))
+            elif model is ProjectNote:
+                new_rows.append(ProjectNote(project=self.project, content=f'Note {index}'))
+            else:
+                new_rows.append(Reminder(
+                    project=self.project, created_by=self.user, title=f'Reminder {index}',
+                    reminder_datetime=now + timedelta(minutes=index),
+                ))
+        model.objects.bulk_create(new_rows, batch_size=1000)
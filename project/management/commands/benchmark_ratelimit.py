@@ -0,0 +1,67 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from project.ratelimit import DEFAULT_SHARE_RATE_LIMITS, check_limits, parse_rate
+
+
+TARGET_MICROSECONDS = 50
+
+
+def client_address(index):
+    # 198.18.0.0/15 is reserved for benchmarks, so no real client shares these buckets
+    return f'198.{18 + (index >> 16 & 1)}.{index >> 8 & 255}.{index & 255}'
+
+
+class Command(BaseCommand):
+    help = 'Measure the per-request cost of the share link rate limiter on the configured backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', help='Backend to measure instead of SHARE_RATE_LIMITS["BACKEND"]')
+        parser.add_argument('--checks', type=int, default=100000, help='Rate limit decisions to time per case')
+        parser.add_argument('--clients', type=int, default=10000, help='Distinct client IPs')
+        parser.add_argument('--tokens', type=int, default=100, help='Distinct share tokens')
+
+    def handle(self, *args, **options):
+        config = getattr(settings, 'SHARE_RATE_LIMITS', DEFAULT_SHARE_RATE_LIMITS)
+        path = options['backend'] or config['BACKEND']
+        backend = import_string(path)(**(config.get('OPTIONS', {}) if path == config['BACKEND'] else {}))
+        name = path.rsplit('.', 1)[-1]
+        # Like a share link request: one bucket per client IP, one per token
+        requests = [
+            (client_address(index % options['clients']), f'benchmark-token-{index % options["tokens"]}')
+            for index in range(options['checks'])
+        ]
+
+        for label, rate in (('allowed', '1000000/s'), ('denied', '1/d')):
+            rate, burst = parse_rate(rate)
+            buckets = [
+                [(f'benchmark_{label}_ip:{ip}', rate, burst), (f'benchmark_{label}_token:{token}', rate, burst)]
+                for ip, token in requests
+            ]
+            self.report(f'{name}.consume_many, {label}', options, [
+                self.time(backend.consume_many, request_buckets) for request_buckets in buckets
+            ])
+
+        if not options['backend']:
+            # The whole per-request path with the configured rates
+            self.report('check_limits, configured rates', options, [
+                self.time(check_limits, [('shared_ip', ip), ('shared_token', token)]) for ip, token in requests
+            ])
+
+    def time(self, function, argument):
+        started = time.perf_counter_ns()
+        function(argument)
+        return (time.perf_counter_ns() - started) / 1000
+
+    def report(self, label, options, timings):
+        timings.sort()
+        self.stdout.write(
+            f'{label}, {options["clients"]} clients: '
+            f'mean {statistics.fmean(timings):.1f}us, p50 {statistics.median(timings):.1f}us, '
+            f'p99 {timings[int(len(timings) * 0.99) - 1]:.1f}us, max {timings[-1]:.0f}us '
+            f'(target < {TARGET_MICROSECONDS}us)'
+        )
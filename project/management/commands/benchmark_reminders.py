@@ -0,0 +1,89 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from project.models import Project, Reminder
+from project.viewsets import ReminderViewSet
+
+
+BENCHMARK_EMAIL = 'reminder-benchmark@example.invalid'
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class Command(BaseCommand):
+    help = 'Measure reminder list latency as a project grows, and check that listing never writes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000,10000,100000',
+                            help='Comma-separated reminder counts to measure at')
+        parser.add_argument('--requests', type=int, default=50, help='List requests per size')
+        parser.add_argument('--pagination', choices=('page', 'cursor'), default='page')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the benchmark user and exit')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(email=BENCHMARK_EMAIL).delete()
+            self.stdout.write(f'Deleted {deleted} benchmark row(s)')
+            return
+
+        user, _ = User.objects.get_or_create(email=BENCHMARK_EMAIL, defaults={'name': 'Reminder benchmark'})
+        view = ReminderViewSet.as_view({'get': 'list'})
+        factory = APIRequestFactory()
+
+        for size in sorted(int(size) for size in options['sizes'].split(',')):
+            # One project per size, so each size is measured on exactly that many
+            project, _ = Project.objects.get_or_create(name=f'Reminder benchmark ({size})', created_by=user)
+            self.populate(project, user, size)
+            params = {'project_id': str(project.pk)}
+            if options['pagination'] == 'cursor':
+                params['pagination'] = 'cursor'
+            timings = []
+            writes = queries = 0
+            for _ in range(options['requests']):
+                request = factory.get('/project-features/api/reminders/', params)
+                force_authenticate(request, user)
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = view(request)
+                    response.render()
+                    timings.append((time.perf_counter() - started) * 1000)
+                queries += len(captured)
+                writes += sum(query['sql'].lstrip().upper().startswith(WRITE_STATEMENTS) for query in captured)
+
+            timings.sort()
+            self.stdout.write(
+                f'{size} reminder(s), {len(timings)} requests: '
+                f'p50 {statistics.median(timings):.1f}ms, '
+                f'p95 {timings[int(len(timings) * 0.95) - 1]:.1f}ms, max {timings[-1]:.1f}ms, '
+                f'{queries / len(timings):.0f} queries/request, {writes} write(s)'
+            )
+
+    def populate(self, project, user, size):
+        """Fill the project up to `size` reminders spread from a day ago to a month ahead
+
+        bulk_create skips Reminder.save(), so every stored status is still
+        'pending' and the list has to work out live statuses for past and
+        imminent ones, which is the case the old per-row saves handled.
+        """
+        existing = Reminder.objects.filter(project=project).count()
+        now = timezone.now()
+        span = timedelta(days=31).total_seconds()
+        Reminder.objects.bulk_create(
+            [
+                Reminder(
+                    project=project, created_by=user, title=f'Reminder {index}',
+                    reminder_datetime=now + timedelta(days=-1, seconds=index * 7919 % span),
+                )
+                for index in range(existing, size)
+            ],
+            batch_size=1000,
+        )
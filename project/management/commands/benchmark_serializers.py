@@ -0,0 +1,104 @@
+import secrets
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from project.models import Comment, Project, Reminder, ShareLink
+from project.serializers import CommentSerializer, ReminderSerializer, ShareLinkSerializer
+
+
+BENCHMARK_EMAIL = 'serializer-benchmark@example.invalid'
+
+
+class PerRowShareLinkSerializer(ShareLinkSerializer):
+    """ShareLinkSerializer building the absolute URL prefix on every call, as before the cached property"""
+
+    @property
+    def share_base_url(self):
+        return self.context['request'].build_absolute_uri('/projects/shared/')
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure list serialization time and queries of share links, comments and reminders, '
+        'with and without select_related and the cached share URL prefix'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Rows serialized per list')
+        parser.add_argument('--requests', type=int, default=50, help='Timed serializations per case')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the benchmark user and exit')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(email=BENCHMARK_EMAIL).delete()
+            self.stdout.write(f'Deleted {deleted} benchmark row(s)')
+            return
+
+        self.user, _ = User.objects.get_or_create(email=BENCHMARK_EMAIL, defaults={'name': 'Serializer benchmark'})
+        # One project per size, so a smaller run is never measured on a bigger project
+        self.project, _ = Project.objects.get_or_create(
+            name=f"Serializer benchmark ({options['rows']} rows)", created_by=self.user
+        )
+        self.populate(options['rows'])
+        self.request = Request(APIRequestFactory().get('/project-features/api/share-links/'))
+
+        share_links = ShareLink.objects.filter(project=self.project)
+        comments = Comment.objects.filter(project=self.project)
+        reminders = Reminder.objects.with_current_status().filter(project=self.project)
+        cases = [
+            ('share links', 'per-row', PerRowShareLinkSerializer, share_links),
+            ('share links', 'select_related + cached prefix', ShareLinkSerializer,
+             share_links.select_related('project', 'created_by')),
+            ('comments', 'per-row', CommentSerializer, comments),
+            ('comments', 'select_related', CommentSerializer, comments.select_related('user')),
+            ('reminders', 'per-row', ReminderSerializer, reminders),
+            ('reminders', 'select_related', ReminderSerializer, reminders.select_related('project', 'created_by')),
+        ]
+        for resource, label, serializer_class, queryset in cases:
+            queries = []
+            with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+                self.serialize(serializer_class, queryset)
+            timings = sorted(self.timed(serializer_class, queryset) for _ in range(options['requests']))
+            self.stdout.write(
+                f"{resource:<11} {label:<32} {options['rows']} rows: {len(queries)} queries, "
+                f'p50 {statistics.median(timings):.1f}ms, max {timings[-1]:.1f}ms'
+            )
+
+    def serialize(self, serializer_class, queryset):
+        # A fresh queryset each time, like a request, so no result cache is reused
+        return serializer_class(queryset.all(), many=True, context={'request': self.request}).data
+
+    def timed(self, serializer_class, queryset):
+        started = time.perf_counter()
+        self.serialize(serializer_class, queryset)
+        return (time.perf_counter() - started) * 1000
+
+    def populate(self, rows):
+        now = timezone.now()
+        existing = ShareLink.objects.filter(project=self.project).count()
+        # bulk_create skips ShareLink.save(), which would fill in the token
+        ShareLink.objects.bulk_create(
+            ShareLink(project=self.project, created_by=self.user, token=secrets.token_urlsafe(48))
+            for _ in range(existing, rows)
+        )
+        existing = Comment.objects.filter(project=self.project).count()
+        Comment.objects.bulk_create(
+            Comment(project=self.project, user=self.user, message=f'Comment {index}') for index in range(existing, rows)
+        )
+        existing = Reminder.objects.filter(project=self.project).count()
+        Reminder.objects.bulk_create(
+            Reminder(
+                project=self.project, created_by=self.user, title=f'Reminder {index}',
+                reminder_datetime=now + timedelta(minutes=index),
+            )
+            for index in range(existing, rows)
+        )
@@ -0,0 +1,93 @@
+import os
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from project.api_views import upload_detail
+from project.models import Project, Upload
+from project.uploads import discard_upload, start_upload
+
+
+BENCHMARK_EMAIL = 'upload-benchmark@example.invalid'
+
+MIB = 1024 * 1024
+
+
+class GeneratedBody:
+    """A request body produced on the fly, so the benchmark itself holds one block"""
+
+    def __init__(self, length, block):
+        self.remaining = length
+        self.block = block
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        size = min(size, len(self.block))
+        self.remaining -= size
+        return self.block[:size]
+
+    # LimitedStream wants it; an upload body is never read by line
+    readline = read
+
+
+class Command(BaseCommand):
+    help = 'Measure throughput and Python heap use of resumable upload PATCHes through the API view'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=1024, help='Upload size in MiB')
+        parser.add_argument('--chunk', type=int, help='MiB per PATCH (default: the whole file in one)')
+        parser.add_argument('--cleanup', action='store_true',
+                            help='Delete the benchmark user and exit; `gc_blobs` then removes the stored file')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['cleanup']:
+            for upload in Upload.objects.filter(created_by__email=BENCHMARK_EMAIL, project_file__isnull=True):
+                discard_upload(upload)
+            deleted, _ = User.objects.filter(email=BENCHMARK_EMAIL).delete()
+            self.stdout.write(f'Deleted {deleted} benchmark row(s)')
+            return
+
+        user, _ = User.objects.get_or_create(email=BENCHMARK_EMAIL, defaults={'name': 'Upload benchmark'})
+        project, _ = Project.objects.get_or_create(name='Upload benchmark', created_by=user)
+        size = options['size'] * MIB
+        chunk = (options['chunk'] or options['size']) * MIB
+        upload = start_upload(project, user, 'benchmark.bin', 'benchmark.bin', size)
+        block = os.urandom(MIB)
+        factory = APIRequestFactory()
+        path = f'/project-features/api/uploads/{upload.pk}/'
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        patches = 0
+        for offset in range(0, size, chunk):
+            length = min(chunk, size - offset)
+            # The factory would build the body in memory; stream it like a socket instead
+            template = factory.generic(
+                'PATCH', path, content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset)
+            )
+            request = WSGIRequest({
+                **template.environ, 'CONTENT_LENGTH': str(length), 'wsgi.input': GeneratedBody(length, block),
+            })
+            force_authenticate(request, user)
+            response = upload_detail(request, upload_id=upload.pk)
+            if response.status_code != 200:
+                raise CommandError(f'PATCH at {offset} answered {response.status_code}: {response.data}')
+            patches += 1
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        upload.refresh_from_db()
+        if not upload.is_complete:
+            raise CommandError('Upload did not complete')
+        self.stdout.write(
+            f'{options["size"]} MiB in {patches} PATCH(es): {elapsed:.2f}s, '
+            f'{size / MIB / elapsed:.0f} MiB/s including hashing and finalizing, '
+            f'Python heap peak {peak / MIB:.1f} MiB'
+        )
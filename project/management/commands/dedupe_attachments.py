@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from project.blobs import migrate_legacy_files, savings_report
+
+
+class Command(BaseCommand):
+    help = 'Move legacy attachments into content-addressed storage and report disk savings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--report', action='store_true', help='Only print the savings report')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not options['report']:
+            migrated = migrate_legacy_files(batch_size=options['batch_size'], stdout=self.stdout)
+            self.stdout.write(f'Migrated {migrated} attachment(s)')
+
+        report = savings_report()
+        self.stdout.write(
+            f"{report['files']} file(s) in {report['blobs']} blob(s): "
+            f"{report['logical_bytes']} bytes referenced, {report['stored_bytes']} stored, "
+            f"{report['saved_bytes']} saved ({report['saved_ratio']:.1%})"
+        )
+        if report['legacy_files']:
+            self.stdout.write(
+                f"{report['legacy_files']} legacy file(s), {report['legacy_bytes']} bytes, not deduplicated yet"
+            )
@@ -0,0 +1,33 @@
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from project.export import EXPORT_FORMATS
+from project.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Stream a project tree to a file (or stdout) as JSONL, CSV or a zip with attachments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_id')
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='jsonl')
+        parser.add_argument('--output', '-o', help='Output path, defaults to stdout')
+
+    def handle(self, *args, **options):
+        try:
+            project = Project.objects.get(pk=options['project_id'])
+        except (Project.DoesNotExist, ValidationError) as e:
+            raise CommandError(f'Project {options["project_id"]} not found') from e
+
+        generate = EXPORT_FORMATS[options['format']][0]
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in generate(project):
+                output.write(chunk.encode() if isinstance(chunk, str) else chunk)
+        finally:
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from project.blobs import DEFAULT_GRACE_PERIOD, collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Delete content-addressed attachment blobs that no ProjectFile refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-seconds', type=int, default=int(DEFAULT_GRACE_PERIOD.total_seconds()),
+            help='Only delete blobs unreferenced and untouched for this long',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted')
+
+    def handle(self, *args, **options):
+        deleted, reclaimed = collect_garbage(
+            grace_period=timedelta(seconds=options['grace_seconds']), dry_run=options['dry_run']
+        )
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(f'{verb} {deleted} blob(s), {reclaimed} bytes')
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from project.previews import PreviewStats, generate_previews, pending_previews, preview_executor
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnails and text previews for attachments that do not have one yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per core)')
+        parser.add_argument('--batch-size', type=int, default=None, help='Files sent to a worker at a time')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many files')
+        parser.add_argument('--retry-failed', action='store_true', help='Also redo previews that failed before')
+        parser.add_argument('--stats-interval', type=float, default=10, help='Seconds between progress reports')
+
+    def handle(self, *args, **options):
+        pending = pending_previews(retry_failed=options['retry_failed'])
+        if options['limit']:
+            pending = pending[:options['limit']]
+        stats = PreviewStats(total=pending.count())
+        if not stats.total:
+            self.stdout.write('No attachments need previews')
+            return
+
+        def report(snapshot):
+            eta = f"{snapshot['eta']:.0f}s" if snapshot['eta'] is not None else '-'
+            self.stdout.write(
+                '{done}/{total} done ({images} images, {texts} texts, {skipped} skipped, {failed} failed) '
+                '{rate:.1f} files/s {mb_per_second:.1f} MB/s eta {eta}'.format(**dict(snapshot, eta=eta))
+            )
+
+        executor, workers = preview_executor(options['workers'])
+        with executor:
+            generate_previews(
+                pending.iterator(chunk_size=2000), executor, workers,
+                batch_size=options['batch_size'], stats=stats, report=report,
+                report_interval=options['stats_interval'],
+            )
@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from project.importer import (
+    IMPORT_BATCH_SIZE, IMPORT_BATCHES_PER_TRANSACTION, Checkpoint, ImportFormatError, ProjectImporter,
+    guess_format, read_records,
+)
+
+
+class Command(BaseCommand):
+    help = 'Stream projects, todolists and tasks from a JSONL or CSV file into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help='Email of the user who will own the imported projects')
+        parser.add_argument('--format', choices=['jsonl', 'csv'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--batches-per-transaction', type=int, default=IMPORT_BATCHES_PER_TRANSACTION)
+        parser.add_argument('--checkpoint', help='Checkpoint file, defaults to <path>.checkpoint')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(email=options['user'])
+        except User.DoesNotExist as e:
+            raise CommandError(f'No user with email {options["user"]}') from e
+
+        checkpoint = Checkpoint(options['checkpoint'] or f'{options["path"]}.checkpoint')
+        importer = ProjectImporter(
+            user,
+            batch_size=options['batch_size'],
+            batches_per_transaction=options['batches_per_transaction'],
+            checkpoint=checkpoint,
+        )
+        import_format = options['format'] or guess_format(options['path'])
+
+        with open(options['path'], encoding='utf-8', newline='') as f:
+            try:
+                result = importer.run(read_records(f, import_format))
+            except ImportFormatError as e:
+                raise CommandError(f'{e} (progress kept in {checkpoint.path})') from e
+
+        for error in result['error_list']:
+            self.stderr.write(f'Line {error["line"]}: {error["error"]}')
+        self.stdout.write(
+            f'Imported {result["project"]} project(s), {result["todolist"]} todolist(s), '
+            f'{result["task"]} task(s); {result["existing"]} already imported, '
+            f'skipped {result["skipped"]} record(s), {result["errors"]} error(s)'
+        )
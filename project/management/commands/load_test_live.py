@@ -0,0 +1,163 @@
+import asyncio
+import json
+import resource
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from project.live import InMemoryBackend, get_bus
+from project.models import Comment, Project
+
+
+BENCHMARK_EMAIL = 'live-load-test@example.invalid'
+
+
+class Command(BaseCommand):
+    help = (
+        'Hold many idle server-sent event connections open against a running ASGI server, '
+        'then publish comments and measure how long each takes to reach every connection'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the ASGI server')
+        parser.add_argument('--connections', type=int, default=10000)
+        parser.add_argument('--concurrency', type=int, default=200, help='Connections opened at a time')
+        parser.add_argument('--events', type=int, default=10, help='Comments published once all are open')
+        parser.add_argument('--timeout', type=float, default=30, help='Seconds to wait for each event')
+        parser.add_argument('--server-pid', type=int, help='Report this process\'s memory and threads (Linux)')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the load test user and exit')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(email=BENCHMARK_EMAIL).delete()
+            self.stdout.write(f'Deleted {deleted} load test row(s)')
+            return
+
+        if type(get_bus()) is InMemoryBackend:
+            # Comments created here must reach the server's subscribers
+            raise CommandError(
+                'Run the server and this command with LIVE_FEED_BACKEND=project.live.BrokerBackend '
+                'and `manage.py run_live_broker`'
+            )
+
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < options['connections'] + 100:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+            if hard < options['connections'] + 100:
+                raise CommandError(f'Open file limit is {hard}; raise it (ulimit -n) for this many connections')
+
+        self.user, _ = User.objects.get_or_create(email=BENCHMARK_EMAIL, defaults={'name': 'Live load test'})
+        self.project, _ = Project.objects.get_or_create(name='Live load test', created_by=self.user)
+        client = Client()
+        client.force_login(self.user)
+        self.cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+        asyncio.run(self.run(options))
+
+    async def run(self, options):
+        url = urlsplit(options['url'])
+        self.host, self.port = url.hostname, url.port or 80
+        self.path = f'/projects/{self.project.pk}/events/'
+        self.arrivals = {}
+        self.open_count = 0
+        self.failures = {}
+
+        limit = asyncio.Semaphore(options['concurrency'])
+        started = time.perf_counter()
+        readers = [asyncio.create_task(self.listen(limit)) for _ in range(options['connections'])]
+        await self.wait_for(lambda: self.open_count + sum(self.failures.values()) >= options['connections'], 300)
+        self.stdout.write(
+            f'{self.open_count} connection(s) open in {time.perf_counter() - started:.1f}s'
+            + (f', failed: {self.failures}' if self.failures else '')
+        )
+        self.report_server(options['server_pid'])
+
+        latencies = []
+        missed = 0
+        for _ in range(options['events']):
+            comment_id, sent = await asyncio.to_thread(self.publish)
+            delivered = await self.wait_for(
+                lambda: len(self.arrivals.get(comment_id, ())) >= self.open_count, options['timeout']
+            )
+            arrivals = self.arrivals.pop(comment_id, [])
+            latencies.extend((arrived - sent) * 1000 for arrived in arrivals)
+            missed += self.open_count - len(arrivals)
+            if not delivered:
+                self.stdout.write(f'Event {comment_id} reached {len(arrivals)}/{self.open_count} in time')
+
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+
+        if latencies:
+            latencies.sort()
+            self.stdout.write(
+                f'{options["events"]} event(s) x {self.open_count} connection(s): '
+                f'p50 {statistics.median(latencies):.0f}ms, '
+                f'p95 {latencies[int(len(latencies) * 0.95) - 1]:.0f}ms, max {latencies[-1]:.0f}ms, '
+                f'{missed} missed'
+            )
+
+    async def listen(self, limit):
+        async with limit:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+                writer.write(
+                    f'GET {self.path} HTTP/1.1\r\nHost: {self.host}\r\nCookie: {self.cookie}\r\n'
+                    'Accept: text/event-stream\r\n\r\n'.encode()
+                )
+                status = (await reader.readline()).decode().split(' ', 2)
+                while (await reader.readline()) not in (b'\r\n', b''):
+                    pass
+            except OSError as e:
+                self.fail(type(e).__name__)
+                return
+            if len(status) < 2 or status[1] != '200':
+                self.fail(f'HTTP {status[1] if len(status) > 1 else "?"}')
+                writer.close()
+                return
+            self.open_count += 1
+
+        try:
+            # Chunked transfer framing lines are skipped along with comments
+            while line := await reader.readline():
+                if line.startswith(b'data: '):
+                    event = json.loads(line[6:])
+                    self.arrivals.setdefault(event['id'], []).append(time.perf_counter())
+        except (OSError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def fail(self, reason):
+        self.failures[reason] = self.failures.get(reason, 0) + 1
+
+    def publish(self):
+        sent = time.perf_counter()
+        comment = Comment.objects.create(project=self.project, user=self.user, message='Load test')
+        return str(comment.pk), sent
+
+    async def wait_for(self, condition, timeout):
+        deadline = time.perf_counter() + timeout
+        while not condition():
+            if time.perf_counter() > deadline:
+                return False
+            await asyncio.sleep(0.01)
+        return True
+
+    def report_server(self, pid):
+        if pid is None:
+            return
+        try:
+            with open(f'/proc/{pid}/status') as status:
+                fields = dict(line.split(':', 1) for line in status)
+        except OSError as e:
+            self.stdout.write(f'Cannot read server process {pid}: {e}')
+            return
+        self.stdout.write(f"Server {pid}: RSS {fields['VmRSS'].strip()}, {fields['Threads'].strip()} thread(s)")
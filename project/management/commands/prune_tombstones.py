@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from project.models import Tombstone
+from project.sync import TOMBSTONE_RETENTION
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones older than the retention window'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - TOMBSTONE_RETENTION
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(f'Deleted {deleted} tombstone(s) older than {cutoff:%Y-%m-%d %H:%M}')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from project.models import Upload
+from project.uploads import discard_upload, get_upload_config
+
+
+class Command(BaseCommand):
+    help = 'Delete resumable uploads that have not received a chunk within UPLOADS["EXPIRY"]'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - get_upload_config()['EXPIRY']
+        count = 0
+        for upload in Upload.objects.filter(project_file__isnull=True, updated_at__lt=cutoff).iterator():
+            discard_upload(upload)
+            count += 1
+        completed, _ = Upload.objects.filter(project_file__isnull=False, updated_at__lt=cutoff).delete()
+        self.stdout.write(f'Discarded {count} stale upload(s), forgot {completed} completed one(s)')
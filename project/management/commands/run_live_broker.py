@@ -0,0 +1,47 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+
+# Subscribers that stop reading are cut off instead of buffering forever
+MAX_SUBSCRIBER_BUFFER = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = 'Run the local broker that relays live project events between worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        asyncio.run(self.serve(options['host'], options['port']))
+
+    async def serve(self, host, port):
+        subscribers = set()
+
+        async def handle_client(reader, writer):
+            role = (await reader.readline()).strip()
+            try:
+                if role == b'subscribe':
+                    subscribers.add(writer)
+                    # Subscribers only listen; wait for them to disconnect
+                    await reader.read()
+                elif role == b'publish':
+                    while line := await reader.readline():
+                        for subscriber in list(subscribers):
+                            if subscriber.transport.get_write_buffer_size() > MAX_SUBSCRIBER_BUFFER:
+                                subscribers.discard(subscriber)
+                                subscriber.close()
+                            else:
+                                subscriber.write(line)
+            except ConnectionError:
+                pass
+            finally:
+                subscribers.discard(writer)
+                writer.close()
+
+        server = await asyncio.start_server(handle_client, host, port)
+        self.stdout.write(f'Live broker listening on {host}:{port}')
+        async with server:
+            await server.serve_forever()
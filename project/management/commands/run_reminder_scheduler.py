@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from project.scheduler import ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the reminder scheduler, firing due_soon/overdue transitions as they happen. '
+        'Replaces periodic sweep_reminders runs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window', type=int, default=600, help='Seconds of upcoming transitions to keep loaded')
+        parser.add_argument('--max-entries', type=int, default=100000, help='Upper bound on scheduled transitions held in memory')
+        parser.add_argument('--refresh-interval', type=float, default=5, help='Seconds between checks for created/edited reminders')
+        parser.add_argument('--tick', type=float, default=1, help='Longest sleep between ticks, in seconds')
+        parser.add_argument('--stats-interval', type=float, default=60, help='Seconds between firing lag reports')
+
+    def handle(self, *args, **options):
+        scheduler = ReminderScheduler(
+            window=timedelta(seconds=options['window']),
+            refresh_interval=options['refresh_interval'],
+            max_entries=options['max_entries'],
+        )
+
+        def report(snapshot):
+            self.stdout.write(
+                'fired={fired} skipped={skipped} queued={queued} '
+                'lag mean={mean_lag:.3f}s p95={p95_lag:.3f}s max={max_lag:.3f}s'.format(**snapshot)
+            )
+
+        try:
+            scheduler.run(tick_interval=options['tick'], stats_interval=options['stats_interval'], report=report)
+        except KeyboardInterrupt:
+            report(dict(scheduler.stats.snapshot(), queued=len(scheduler)))
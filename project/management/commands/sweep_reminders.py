@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from project.models import Reminder
+
+
+class Command(BaseCommand):
+    help = 'Move pending/due_soon reminders to due_soon/overdue with bulk updates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep running and sweep every INTERVAL seconds (default: sweep once and exit)',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+
+        while True:
+            due_soon, overdue = Reminder.objects.sweep_statuses()
+            self.stdout.write(f'Marked {due_soon} reminder(s) due soon and {overdue} overdue')
+
+            if interval <= 0:
+                break
+            time.sleep(interval)
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:06
+
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0005_projectnote_project_pro_project_346e0a_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('project_id', models.UUIDField()),
+                ('model', models.CharField(max_length=50)),
+                ('object_id', models.UUIDField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['deleted_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['project', 'updated_at'], name='project_com_project_ba871e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectnote',
+            index=models.Index(fields=['project', 'updated_at'], name='project_pro_project_1d9a41_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(fields=['project', 'updated_at'], name='project_rem_project_1b7095_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['project_id', 'deleted_at'], name='project_tom_project_e62a29_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0006_tombstone_comment_project_com_project_ba871e_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='sharelink',
+            name='project_sha_token_3cf1ef_idx',
+        ),
+        migrations.AlterField(
+            model_name='sharelink',
+            name='token',
+            field=models.CharField(max_length=64, unique=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0007_remove_sharelink_project_sha_token_3cf1ef_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='done_task_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='task_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
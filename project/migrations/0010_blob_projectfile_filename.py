@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:10
+
+import posixpath
+
+import project.storage
+from django.db import migrations, models
+
+
+def populate_filenames(apps, schema_editor):
+    """Keep the uploaded name of existing attachments before they move to cas/"""
+    ProjectFile = apps.get_model('project', 'ProjectFile')
+    changed = []
+    for projectfile in ProjectFile.objects.filter(filename='').exclude(attachment='').iterator():
+        projectfile.filename = posixpath.basename(projectfile.attachment.name)
+        changed.append(projectfile)
+    ProjectFile.objects.bulk_update(changed, ['filename'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0009_projectfile_content_hash_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectfile',
+            name='filename',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.RunPython(populate_filenames, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='projectfile',
+            name='attachment',
+            field=models.FileField(storage=project.storage.attachment_storage, upload_to='projectfiles'),
+        ),
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('content_hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size', models.BigIntegerField()),
+                ('refcount', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['refcount', 'updated_at'], name='project_blo_refcoun_70cb94_idx')],
+            },
+        ),
+    ]
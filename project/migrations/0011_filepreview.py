@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0010_blob_projectfile_filename'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FilePreview',
+            fields=[
+                ('content_hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('image', 'Image'), ('text', 'Text'), ('none', 'None')], max_length=10)),
+                ('content_type', models.CharField(blank=True, max_length=50)),
+                ('thumbnail', models.BinaryField(blank=True, null=True)),
+                ('width', models.PositiveIntegerField(blank=True, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, null=True)),
+                ('text', models.TextField(blank=True)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
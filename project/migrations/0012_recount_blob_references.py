@@ -0,0 +1,44 @@
+import posixpath
+
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+CAS_PREFIX = 'cas/'
+
+
+def recount_blob_references(apps, schema_editor):
+    """Set content_hash and Blob.refcount from the attachments rows actually point at
+
+    Before 0012 only files created with a content_hash were counted, and a
+    replaced attachment kept the old count, so stored counts can be low.
+    """
+    ProjectFile = apps.get_model('project', 'ProjectFile')
+    Blob = apps.get_model('project', 'Blob')
+
+    stored = ProjectFile.objects.filter(attachment__startswith=CAS_PREFIX)
+    changed = []
+    for projectfile in stored.only('attachment', 'content_hash').iterator():
+        content_hash = posixpath.basename(projectfile.attachment.name)
+        if projectfile.content_hash != content_hash:
+            projectfile.content_hash = content_hash
+            changed.append(projectfile)
+    ProjectFile.objects.bulk_update(changed, ['content_hash'], batch_size=1000)
+
+    references = stored.values('content_hash').annotate(count=Count('*'), size=Max('size')).order_by()
+    for row in references.iterator():
+        updated = Blob.objects.filter(pk=row['content_hash']).update(refcount=row['count'])
+        if not updated:
+            Blob.objects.create(content_hash=row['content_hash'], size=row['size'] or 0, refcount=row['count'])
+    Blob.objects.filter(refcount__gt=0).exclude(pk__in=stored.values('content_hash')).update(refcount=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0011_filepreview'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_blob_references, migrations.RunPython.noop),
+    ]
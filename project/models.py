@@ -1,11 +1,16 @@
+import os
 import uuid
 import secrets
+from datetime import timedelta
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
 from django.utils import timezone
 
 from account.models import User
 
+from .storage import attachment_storage, blob_hash
+
 
 class Project(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -16,6 +21,9 @@ class Project(models.Model):
     created_by = models.ForeignKey(User, related_name='projects', on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
+    # Maintained by task.signals; `manage.py repair_task_counters` recomputes them
+    task_count = models.PositiveIntegerField(default=0)
+    done_task_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ['-created_at']
@@ -32,11 +40,58 @@ class ProjectFile(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     project = models.ForeignKey(Project, related_name='files', on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
-    attachment = models.FileField(upload_to='projectfiles')
+    attachment = models.FileField(upload_to='projectfiles', storage=attachment_storage)
+    filename = models.CharField(max_length=255, blank=True)
+    # SHA-256 hex digest and byte size of the attachment
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    size = models.BigIntegerField(blank=True, null=True)
 
     def __str__(self):
         return self.name
-    
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The blob this row holds a reference to (see project.signals);
+        # never read a deferred field here
+        if 'attachment' not in instance.get_deferred_fields():
+            instance._stored_blob = blob_hash(instance.attachment.name)
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        # The blob reference count in project.signals commits or rolls back with the row
+        with transaction.atomic():
+            if update_fields is None or 'attachment' in update_fields:
+                self._store_attachment()
+                if update_fields is not None:
+                    kwargs['update_fields'] = {*update_fields, 'filename', 'content_hash', 'size'}
+            super().save(*args, **kwargs)
+
+    def _store_attachment(self):
+        """Store a newly assigned attachment before the row is written
+
+        FileField would store it during save() anyway; doing it here lets
+        content_hash, size and filename describe the stored file however
+        the ProjectFile was created (upload view, form, admin or ORM).
+        """
+        attachment = self.attachment
+        if not attachment:
+            return
+        if not attachment._committed:
+            if not self.filename:
+                self.filename = os.path.basename(attachment.name)
+            attachment.save(attachment.name, attachment.file, save=False)
+            self.size = attachment.size
+        content_hash = blob_hash(attachment.name)
+        if content_hash:
+            self.content_hash = content_hash
+        if self.size is None:
+            try:
+                self.size = attachment.size
+            except OSError:
+                pass
+
 
 class ProjectNote(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -49,6 +104,7 @@ class ProjectNote(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['project', '-created_at']),
+            models.Index(fields=['project', 'updated_at']),
         ]
 
     def __str__(self):
@@ -58,7 +114,7 @@ class ProjectNote(models.Model):
 class ShareLink(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     project = models.ForeignKey(Project, related_name='share_links', on_delete=models.CASCADE)
-    token = models.CharField(max_length=64, unique=True, db_index=True)
+    token = models.CharField(max_length=64, unique=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     is_active = models.BooleanField(default=True)
     created_by = models.ForeignKey(User, related_name='share_links', on_delete=models.CASCADE, null=True, blank=True)
@@ -66,7 +122,6 @@ class ShareLink(models.Model):
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['token']),
             models.Index(fields=['project', 'is_active']),
         ]
 
@@ -91,6 +146,7 @@ class Comment(models.Model):
         ordering = ['-timestamp']
         indexes = [
             models.Index(fields=['project', '-timestamp']),
+            models.Index(fields=['project', 'updated_at']),
             models.Index(fields=['user']),
         ]
 
@@ -98,6 +154,41 @@ class Comment(models.Model):
         return f"Comment by {self.user.name or self.user.email} on {self.project.name}"
 
 
+REMINDER_DUE_SOON_WINDOW = timedelta(hours=24)
+
+
+class ReminderQuerySet(models.QuerySet):
+    ACTIVE_STATUSES = ['pending', 'due_soon']
+
+    def with_current_status(self, now=None):
+        """Annotate each reminder with its live status without writing to the database"""
+        now = now or timezone.now()
+        return self.annotate(
+            current_status=Case(
+                When(status__in=self.ACTIVE_STATUSES, reminder_datetime__lt=now, then=Value('overdue')),
+                When(status='pending', reminder_datetime__lte=now + REMINDER_DUE_SOON_WINDOW, then=Value('due_soon')),
+                default=F('status'),
+                output_field=models.CharField(max_length=20),
+            )
+        )
+
+    def sweep_statuses(self, now=None):
+        """Move pending/due_soon reminders forward with set-based updates
+
+        Both updates filter on (status, reminder_datetime) so they are served by
+        the index on those columns. Returns (due_soon, overdue) row counts.
+        """
+        now = now or timezone.now()
+        overdue = self.filter(
+            status__in=self.ACTIVE_STATUSES, reminder_datetime__lt=now
+        ).update(status='overdue')
+        due_soon = self.filter(
+            status='pending', reminder_datetime__gte=now,
+            reminder_datetime__lte=now + REMINDER_DUE_SOON_WINDOW,
+        ).update(status='due_soon')
+        return due_soon, overdue
+
+
 class Reminder(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -115,10 +206,13 @@ class Reminder(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, related_name='reminders', on_delete=models.CASCADE)
 
+    objects = ReminderQuerySet.as_manager()
+
     class Meta:
         ordering = ['reminder_datetime']
         indexes = [
             models.Index(fields=['project', 'reminder_datetime']),
+            models.Index(fields=['project', 'updated_at']),
             models.Index(fields=['status', 'reminder_datetime']),
         ]
 
@@ -127,15 +221,121 @@ class Reminder(models.Model):
         now = timezone.now()
         if self.reminder_datetime < now:
             return 'overdue'
-        elif (self.reminder_datetime - now).total_seconds() <= 86400:  # 24 hours
+        elif self.reminder_datetime - now <= REMINDER_DUE_SOON_WINDOW:
             return 'due_soon'
         else:
             return 'pending'
 
+    def get_current_status(self):
+        """Live status, using the with_current_status() annotation when present"""
+        if hasattr(self, 'current_status'):
+            return self.current_status
+        if self.status in ReminderQuerySet.ACTIVE_STATUSES:
+            live_status = self.compute_status()
+            if live_status != 'pending':
+                return live_status
+        return self.status
+
+    def get_current_status_display(self):
+        return dict(self.STATUS_CHOICES).get(self.get_current_status())
+
     def save(self, *args, **kwargs):
         if self.status == 'pending':  # Only auto-compute if status is pending
             self.status = self.compute_status()
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.title} - {self.project.name}"
\ No newline at end of file
+        return f"{self.title} - {self.project.name}"
+
+
+class Tombstone(models.Model):
+    """Marker left behind when a synced row is hard-deleted
+
+    project_id is a plain column rather than a foreign key so tombstones can
+    be written while a project's children are being cascade-deleted.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project_id = models.UUIDField()
+    model = models.CharField(max_length=50)
+    object_id = models.UUIDField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['project_id', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"Deleted {self.model} {self.object_id}"
+
+
+class Blob(models.Model):
+    """One stored attachment blob and how many ProjectFiles point at it"""
+    content_hash = models.CharField(max_length=64, primary_key=True)
+    size = models.BigIntegerField()
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['refcount', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} x{self.refcount}"
+
+
+class FilePreview(models.Model):
+    """Thumbnail or text excerpt of an attachment, shared by every file with the same content"""
+    KIND_CHOICES = [
+        ('image', 'Image'),
+        ('text', 'Text'),
+        ('none', 'None'),
+    ]
+
+    content_hash = models.CharField(max_length=64, primary_key=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    content_type = models.CharField(max_length=50, blank=True)
+    thumbnail = models.BinaryField(blank=True, null=True)
+    width = models.PositiveIntegerField(blank=True, null=True)
+    height = models.PositiveIntegerField(blank=True, null=True)
+    text = models.TextField(blank=True)
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} preview of {self.content_hash[:12]}"
+
+
+class Upload(models.Model):
+    """A resumable upload in progress; becomes a ProjectFile once complete
+
+    The bytes received so far live in a staging file (see project.uploads);
+    offset is how many of them are durable.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(Project, related_name='uploads', on_delete=models.CASCADE)
+    created_by = models.ForeignKey(User, related_name='uploads', on_delete=models.CASCADE)
+    name = models.CharField(max_length=255)
+    filename = models.CharField(max_length=255)
+    length = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    project_file = models.OneToOneField(
+        ProjectFile, related_name='upload', on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.length})"
+
+    @property
+    def is_complete(self):
+        return self.project_file_id is not None
@@ -0,0 +1,97 @@
+"""Preview rendering, run inside preview worker processes
+
+Nothing here imports Django, so worker processes start quickly and never
+touch the database; the parent process stores the results. Pillow is in
+requirements.txt; where it is missing, images get an error preview and
+no thumbnail.
+"""
+import io
+import mimetypes
+import os
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+
+IMAGE = 'image'
+TEXT = 'text'
+NONE = 'none'
+
+TEXT_TYPES = {
+    'application/json', 'application/xml', 'application/javascript', 'application/x-sh',
+    'application/x-python-code', 'application/sql', 'application/x-yaml', 'application/yaml',
+}
+TEXT_EXTENSIONS = {'.md', '.rst', '.log', '.yml', '.yaml', '.toml', '.ini', '.cfg', '.sql', '.py', '.ts'}
+# Bytes of a text file read to build its excerpt
+TEXT_READ_SIZE = 64 * 1024
+
+
+def render_batch(items, options):
+    """Render (content_hash, path, filename) items; one result dict each
+
+    Batches amortise the inter-process round trip over many small files.
+    A failing file produces an error result instead of failing the batch.
+    """
+    results = []
+    for content_hash, path, filename in items:
+        try:
+            result = render_preview(path, filename, options)
+        except Exception as exc:
+            result = {'kind': NONE, 'error': f'{type(exc).__name__}: {exc}'[:255]}
+        result['content_hash'] = content_hash
+        try:
+            result['source_size'] = os.path.getsize(path)
+        except OSError:
+            result['source_size'] = 0
+        results.append(result)
+    return results
+
+
+def render_preview(path, filename, options):
+    content_type = mimetypes.guess_type(filename)[0] or ''
+    extension = os.path.splitext(filename)[1].lower()
+    if content_type.startswith('image/'):
+        return render_thumbnail(path, options)
+    if content_type.startswith('text/') or content_type in TEXT_TYPES or extension in TEXT_EXTENSIONS:
+        return render_text(path, options)
+    return {'kind': NONE}
+
+
+def render_thumbnail(path, options):
+    if Image is None:
+        return {'kind': NONE, 'error': 'Pillow is not installed'}
+    size = options['THUMBNAIL_SIZE']
+    with Image.open(path) as image:
+        # Lets JPEG decode at a fraction of full resolution
+        image.draft('RGB', (size, size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        if image.mode not in ('RGB', 'RGBA'):
+            has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, format='WEBP', quality=options['THUMBNAIL_QUALITY'], method=4)
+    return {
+        'kind': IMAGE,
+        'content_type': 'image/webp',
+        'thumbnail': buffer.getvalue(),
+        'width': image.width,
+        'height': image.height,
+    }
+
+
+def render_text(path, options):
+    with open(path, 'rb') as f:
+        head = f.read(TEXT_READ_SIZE)
+    if b'\0' in head:
+        return {'kind': NONE}
+    text = head.decode('utf-8', errors='replace')
+    # Keep whole lines up to the limit
+    limit = options['TEXT_CHARS']
+    if len(text) > limit:
+        text = text[:limit]
+        if '\n' in text:
+            text = text[:text.rindex('\n')]
+    return {'kind': TEXT, 'text': text}
@@ -0,0 +1,289 @@
+"""Background thumbnail and text-preview generation for attachments
+
+Previews are rendered by project.preview_render in a pool of worker
+processes and stored as FilePreview rows keyed by content hash, so a file
+uploaded many times is rendered once. Saving a ProjectFile only enqueues
+its hash after commit; the upload request never waits for rendering.
+
+The queue comes from settings.PREVIEWS['QUEUE']. JobPreviewQueue hands
+each file to the job queue (jobs app), where `manage.py run_workers`
+renders it; LocalPreviewQueue keeps a process pool inside the web
+process instead. With QUEUE set to None nothing is queued, and
+`manage.py generate_previews` works through the backlog instead, which is
+also how existing files get their previews.
+"""
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Max
+from django.utils.module_loading import import_string
+
+from jobs.queue import enqueue
+
+from .cache import get_project_cache
+from .models import FilePreview, ProjectFile
+from .preview_render import render_batch
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PREVIEWS = {
+    'QUEUE': 'project.previews.LocalPreviewQueue',
+    'QUEUE_OPTIONS': {},
+    # Worker processes; None means one per core
+    'WORKERS': None,
+    'BATCH_SIZE': 32,
+    'THUMBNAIL_SIZE': 256,
+    'THUMBNAIL_QUALITY': 70,
+    'TEXT_CHARS': 2000,
+}
+
+
+def get_preview_config():
+    return {**DEFAULT_PREVIEWS, **getattr(settings, 'PREVIEWS', {})}
+
+
+def _render_options(config):
+    return {key: config[key] for key in ('THUMBNAIL_SIZE', 'THUMBNAIL_QUALITY', 'TEXT_CHARS')}
+
+
+class PreviewStats:
+    """Progress counters for a preview run"""
+
+    def __init__(self, total=None):
+        self.total = total
+        self.started = time.monotonic()
+        self.done = 0
+        self.failed = 0
+        self.source_bytes = 0
+        self.kinds = Counter()
+
+    def record(self, results):
+        for result in results:
+            self.done += 1
+            self.source_bytes += result.get('source_size', 0)
+            self.kinds[result['kind']] += 1
+            if result.get('error'):
+                self.failed += 1
+
+    def snapshot(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed if elapsed else 0.0
+        remaining = self.total - self.done if self.total is not None else None
+        return {
+            'done': self.done,
+            'total': self.total,
+            'failed': self.failed,
+            'images': self.kinds['image'],
+            'texts': self.kinds['text'],
+            'skipped': self.kinds['none'] - self.failed,
+            'rate': rate,
+            'mb_per_second': self.source_bytes / elapsed / 1e6 if elapsed else 0.0,
+            'eta': remaining / rate if remaining is not None and rate else None,
+            'elapsed': elapsed,
+        }
+
+
+def preview_executor(workers=None):
+    """Process pool for render_batch; workers defaults to PREVIEWS['WORKERS'] or one per core"""
+    workers = workers or get_preview_config()['WORKERS'] or multiprocessing.cpu_count()
+    # spawn: children import only preview_render, never a forked copy of
+    # the parent's threads and database connections
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')), workers
+
+
+def store_previews(results):
+    """Save rendered results and retire cached pages of projects showing them"""
+    previews = [
+        FilePreview(
+            content_hash=result['content_hash'],
+            kind=result['kind'],
+            content_type=result.get('content_type', ''),
+            thumbnail=result.get('thumbnail'),
+            width=result.get('width'),
+            height=result.get('height'),
+            text=result.get('text', ''),
+            error=result.get('error', ''),
+        )
+        for result in results
+    ]
+    hashes = [preview.content_hash for preview in previews]
+    with transaction.atomic():
+        FilePreview.objects.bulk_create(
+            previews,
+            update_conflicts=True,
+            unique_fields=['content_hash'],
+            update_fields=['kind', 'content_type', 'thumbnail', 'width', 'height', 'text', 'error'],
+        )
+        project_ids = set(
+            ProjectFile.objects.filter(content_hash__in=hashes).values_list('project_id', flat=True)
+        )
+        transaction.on_commit(lambda: _bump_projects(project_ids))
+
+
+def _bump_projects(project_ids):
+    cache = get_project_cache()
+    for project_id in project_ids:
+        cache.bump(project_id)
+
+
+def pending_previews(retry_failed=False):
+    """(content_hash, attachment name, filename) for each hash without a preview, one row per hash"""
+    done = FilePreview.objects.all()
+    if retry_failed:
+        done = done.filter(error='')
+    return (
+        ProjectFile.objects.exclude(content_hash='')
+        .exclude(content_hash__in=done.values('content_hash'))
+        .values('content_hash')
+        .annotate(name=Max('attachment'), filename=Max('filename'))
+        .order_by('content_hash')
+        .values_list('content_hash', 'name', 'filename')
+    )
+
+
+def _work_item(storage, content_hash, name, filename):
+    return content_hash, storage.path(name), filename or name
+
+
+def generate_previews(items, executor, workers, batch_size=None, stats=None, report=None, report_interval=10):
+    """Render items (see pending_previews) on executor's workers and store the results
+
+    At most two batches per worker are in flight, so memory stays flat no
+    matter how long the backlog is. report(snapshot) is called every
+    report_interval seconds and once at the end.
+    """
+    config = get_preview_config()
+    batch_size = batch_size or config['BATCH_SIZE']
+    options = _render_options(config)
+    stats = stats or PreviewStats()
+    storage = ProjectFile._meta.get_field('attachment').storage
+
+    def batches():
+        batch = []
+        for content_hash, name, filename in items:
+            batch.append(_work_item(storage, content_hash, name, filename))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def collect(futures):
+        for future in futures:
+            results = future.result()
+            store_previews(results)
+            stats.record(results)
+
+    last_report = time.monotonic()
+    in_flight = set()
+    for batch in batches():
+        in_flight.add(executor.submit(render_batch, batch, options))
+        if len(in_flight) >= workers * 2:
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(finished)
+        if report and time.monotonic() - last_report >= report_interval:
+            report(stats.snapshot())
+            last_report = time.monotonic()
+    collect(in_flight)
+    if report:
+        report(stats.snapshot())
+    return stats
+
+
+def render_and_store(items):
+    """Render (content_hash, attachment name, filename) items in this process; for job workers"""
+    storage = ProjectFile._meta.get_field('attachment').storage
+    options = _render_options(get_preview_config())
+    results = render_batch([_work_item(storage, *item) for item in items], options)
+    store_previews(results)
+    return {'rendered': len(results), 'failed': sum(1 for result in results if result.get('error'))}
+
+
+class JobPreviewQueue:
+    """Queue each file as a `project.render_previews` job for `manage.py run_workers`"""
+
+    def enqueue(self, content_hash, name, filename):
+        enqueue(
+            'project.render_previews', {'items': [[content_hash, name, filename]]},
+            dedupe_key=f'preview:{content_hash}',
+        )
+
+
+class LocalPreviewQueue:
+    """In-process queue feeding a small process pool from a background thread"""
+
+    def __init__(self, workers=2):
+        self.workers = workers
+        self.stats = PreviewStats()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, content_hash, name, filename):
+        self._queue.put((content_hash, name, filename))
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='preview-queue', daemon=True)
+                    self._thread.start()
+
+    def _drain(self):
+        # Block for the first item, then take whatever else is waiting
+        items = [self._queue.get()]
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _run(self):
+        executor, workers = preview_executor(self.workers)
+        while True:
+            items = self._drain()
+            try:
+                generate_previews(items, executor, workers, stats=self.stats)
+            except BrokenProcessPool:
+                # A worker died (killed, out of memory); the files are left
+                # for generate_previews and later uploads get a new pool
+                logger.exception('Preview worker died; restarting the pool')
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor, workers = preview_executor(self.workers)
+            except Exception:
+                logger.exception('Preview generation failed for %d file(s)', len(items))
+            finally:
+                close_old_connections()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_preview_queue():
+    """Queue configured by settings.PREVIEWS['QUEUE'], or None to leave files to the backlog"""
+    global _queue
+    config = get_preview_config()
+    if not config['QUEUE']:
+        return None
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = import_string(config['QUEUE'])(**config['QUEUE_OPTIONS'])
+    return _queue
+
+
+def enqueue_preview(projectfile):
+    preview_queue = get_preview_queue()
+    if preview_queue is None or not projectfile.content_hash:
+        return
+    if FilePreview.objects.filter(pk=projectfile.content_hash).exists():
+        return
+    preview_queue.enqueue(projectfile.content_hash, projectfile.attachment.name, projectfile.filename)
@@ -0,0 +1,203 @@
+"""Token bucket rate limiting for anonymous share link traffic
+
+Each key (a client IP, a share token, a user) has a bucket that refills at
+`rate` tokens per second up to `burst`. A request takes one token from each
+of its buckets, or none if any of them is empty. A decision is a few dict
+lookups plus a little arithmetic: O(1), and no database queries.
+
+settings.SHARE_RATE_LIMITS selects the backend and the limits. Limits use
+the DRF notation 'N/s', 'N/m', 'N/h' or 'N/d', and N is also the burst size.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+
+DEFAULT_SHARE_RATE_LIMITS = {
+    'BACKEND': 'project.ratelimit.InMemoryBackend',
+    'OPTIONS': {},
+    # Reverse proxies in front of the app; 0 trusts REMOTE_ADDR only
+    'NUM_PROXIES': 0,
+    'RATES': {
+        'shared_ip': '120/m',
+        'shared_token': '600/m',
+        'share_create': '20/m',
+    },
+}
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'120/m' -> (2.0 tokens per second, burst of 120)"""
+    count, period = rate.split('/')
+    count = int(count)
+    return count / _PERIODS[period[0]], count
+
+
+def _refill(tokens, updated_at, now, rate, burst):
+    """Tokens in a bucket at `now`"""
+    return min(burst, tokens + (now - updated_at) * rate)
+
+
+def _decide(levels, buckets):
+    """Seconds until every bucket has a token, 0 if they all have one now"""
+    return max(
+        ((1 - level) / rate for level, (_, rate, _) in zip(levels, buckets) if level < 1),
+        default=0.0,
+    )
+
+
+class InMemoryBackend:
+    """Buckets held in this process, least recently used keys dropped first"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume_many(self, buckets):
+        """Take a token from every (key, rate, burst) bucket, or from none
+
+        Returns 0 when allowed, otherwise the seconds to wait.
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = [
+                _refill(*self._buckets.pop(key, (burst, now)), now, rate, burst)
+                for key, rate, burst in buckets
+            ]
+            wait = _decide(levels, buckets)
+            spent = 0 if wait else 1
+            for level, (key, _, _) in zip(levels, buckets):
+                self._buckets[key] = (level - spent, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class CacheBackend:
+    """Buckets in a shared Django cache, so limits hold across workers
+
+    The read-modify-write is not atomic. Under a race, two workers can both
+    spend the same token, which at worst lets a burst through slightly early.
+    """
+
+    def __init__(self, alias='default', prefix='ratelimit'):
+        self.alias = alias
+        self.prefix = prefix
+
+    def consume_many(self, buckets):
+        cache = caches[self.alias]
+        now = time.time()
+        keys = [f'{self.prefix}:{key}' for key, _, _ in buckets]
+        stored = cache.get_many(keys)
+        levels = [
+            _refill(*stored.get(cache_key, (burst, now)), now, rate, burst)
+            for cache_key, (_, rate, burst) in zip(keys, buckets)
+        ]
+        wait = _decide(levels, buckets)
+        if not wait:
+            for level, cache_key, (_, rate, burst) in zip(levels, keys, buckets):
+                # Idle buckets refill completely, so they can expire once full
+                cache.set(cache_key, (level - 1, now), math.ceil(burst / rate) + 1)
+        return wait
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def _config():
+    return getattr(settings, 'SHARE_RATE_LIMITS', DEFAULT_SHARE_RATE_LIMITS)
+
+
+def get_limiter():
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                config = _config()
+                _limiter = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    return _limiter
+
+
+def check_limits(checks):
+    """Consume from every (scope, key) bucket if all allow it; return seconds to wait or 0
+
+    A request denied by one bucket takes nothing from the others, so a
+    client over its per-IP limit does not drain a share token's bucket
+    for everybody else.
+    """
+    rates = _config()['RATES']
+    buckets = [(f'{scope}:{key}', *parse_rate(rates[scope])) for scope, key in checks]
+    return get_limiter().consume_many(buckets)
+
+
+def client_ip(request):
+    """Client address, read from X-Forwarded-For behind NUM_PROXIES trusted proxies
+
+    Like DRF's NUM_PROXIES: each proxy appends the address it received the
+    request from, so the client is the entry NUM_PROXIES from the end.
+    Entries further left are whatever the client sent and are ignored.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    num_proxies = _config().get('NUM_PROXIES', 0)
+    forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if not num_proxies or not forwarded_for:
+        return remote_addr
+    addresses = [address.strip() for address in forwarded_for.split(',')]
+    return addresses[-min(num_proxies, len(addresses))] or remote_addr
+
+
+def shared_link_checks(request, token):
+    return [('shared_ip', client_ip(request)), ('shared_token', token)]
+
+
+def rate_limit_shared(view):
+    """Limit a share-link view per client IP and per token"""
+    @wraps(view)
+    def wrapper(request, token, *args, **kwargs):
+        wait = check_limits(shared_link_checks(request, token))
+        if wait:
+            response = HttpResponse('Too many requests.', status=429)
+            response['Retry-After'] = str(math.ceil(wait))
+            return response
+        return view(request, token, *args, **kwargs)
+    return wrapper
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """DRF throttle on top of the share link token buckets
+
+    By default each user (or client IP, when anonymous) gets one bucket of
+    the `scope` rate; override get_checks() to use other buckets.
+    """
+    scope = None
+
+    def get_checks(self, request, view):
+        return [(self.scope, request.user.pk or client_ip(request))]
+
+    def allow_request(self, request, view):
+        self._wait = check_limits(self.get_checks(request, view))
+        return not self._wait
+
+    def wait(self):
+        return self._wait
+
+
+class SharedLinkThrottle(TokenBucketThrottle):
+    def get_checks(self, request, view):
+        return shared_link_checks(request, view.kwargs.get('token', ''))
+
+
+class ShareCreateThrottle(TokenBucketThrottle):
+    scope = 'share_create'
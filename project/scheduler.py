@@ -0,0 +1,194 @@
+import heapq
+import logging
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import REMINDER_DUE_SOON_WINDOW, Reminder, ReminderQuerySet
+from .signals import reminder_status_changed
+
+
+logger = logging.getLogger(__name__)
+
+
+class FiringStats:
+    """Counters and lag figures for fired reminder transitions"""
+
+    def __init__(self, sample_size=1000):
+        self.fired = 0
+        self.skipped = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.recent_lags = deque(maxlen=sample_size)
+
+    def record(self, lag):
+        self.fired += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        self.recent_lags.append(lag)
+
+    def snapshot(self):
+        recent = sorted(self.recent_lags)
+        return {
+            'fired': self.fired,
+            'skipped': self.skipped,
+            'mean_lag': self.total_lag / self.fired if self.fired else 0.0,
+            'max_lag': self.max_lag,
+            'p95_lag': recent[int(len(recent) * 0.95) - 1] if recent else 0.0,
+        }
+
+
+class ReminderScheduler:
+    """Fire due_soon/overdue reminder transitions at the moment they happen
+
+    Upcoming transitions are kept in a heap that only holds one window of
+    time (and at most max_entries items), so memory stays bounded no matter
+    how many reminders exist. Each window is loaded with a range query on
+    reminder_datetime, and rows changed since the last refresh are picked up
+    through updated_at instead of rescanning the table.
+
+    Firing is a conditional UPDATE on (id, status, reminder_datetime), so an
+    entry that went stale (edited, deleted or already moved on) updates no
+    rows and is skipped. Each transition is delivered exactly once, even
+    across restarts.
+    """
+
+    def __init__(self, window=timedelta(minutes=10), refresh_interval=5,
+                 max_entries=100000, chunk_size=2000, clock=timezone.now):
+        self.window = window
+        self.refresh_interval = refresh_interval
+        self.max_entries = max_entries
+        self.chunk_size = chunk_size
+        self.clock = clock
+        self.stats = FiringStats()
+        self._heap = []
+        self._loaded_until = {'due_soon': None, 'overdue': None}
+        self._last_refresh = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _candidates(self, transition):
+        if transition == 'due_soon':
+            return Reminder.objects.filter(status='pending')
+        return Reminder.objects.filter(status__in=ReminderQuerySet.ACTIVE_STATUSES)
+
+    def _offset(self, transition):
+        # A reminder becomes due soon 24h before its datetime
+        return REMINDER_DUE_SOON_WINDOW if transition == 'due_soon' else timedelta(0)
+
+    def _push(self, transition, reminder_id, reminder_datetime):
+        fire_at = reminder_datetime - self._offset(transition)
+        heapq.heappush(self._heap, (fire_at, transition, reminder_id, reminder_datetime))
+
+    def load_window(self, now):
+        """Load transitions that fire before now + window"""
+        end = now + self.window
+
+        for transition, loaded_until in self._loaded_until.items():
+            # Only top up once half of the loaded window has been used
+            if loaded_until is not None and loaded_until >= now + self.window / 2:
+                continue
+
+            room = max(0, self.max_entries - len(self._heap))
+            if not room:
+                # Full: try again once entries have fired
+                continue
+
+            offset = self._offset(transition)
+            queryset = self._candidates(transition).filter(reminder_datetime__lt=end + offset)
+            if loaded_until is not None:
+                queryset = queryset.filter(reminder_datetime__gte=loaded_until + offset)
+
+            rows = queryset.order_by('reminder_datetime').values_list('id', 'reminder_datetime')
+            loaded = 0
+            last_datetime = None
+            for reminder_id, reminder_datetime in rows[:room].iterator(chunk_size=self.chunk_size):
+                self._push(transition, reminder_id, reminder_datetime)
+                loaded += 1
+                last_datetime = reminder_datetime
+
+            if loaded == room:
+                # Heap is full: resume from the last loaded position next time
+                self._loaded_until[transition] = last_datetime - offset
+            else:
+                self._loaded_until[transition] = end
+
+    def refresh(self, now):
+        """Schedule reminders created or edited since the last refresh"""
+        since, self._last_refresh = self._last_refresh, now
+        if since is None:
+            return
+
+        for transition, loaded_until in self._loaded_until.items():
+            if loaded_until is None:
+                continue
+            # Rows beyond the loaded window are picked up by load_window()
+            rows = self._candidates(transition).filter(
+                updated_at__gte=since,
+                reminder_datetime__lt=loaded_until + self._offset(transition),
+            ).values_list('id', 'reminder_datetime')
+            for reminder_id, reminder_datetime in rows.iterator(chunk_size=self.chunk_size):
+                self._push(transition, reminder_id, reminder_datetime)
+        self._trim()
+
+    def _trim(self):
+        """Drop the farthest entries beyond max_entries; load_window loads them again later"""
+        if len(self._heap) <= self.max_entries:
+            return
+        # A sorted list is still a valid heap
+        self._heap.sort()
+        dropped = self._heap[self.max_entries:]
+        del self._heap[self.max_entries:]
+        for fire_at, transition, _, _ in dropped:
+            loaded_until = self._loaded_until[transition]
+            if loaded_until is None or fire_at < loaded_until:
+                self._loaded_until[transition] = fire_at
+
+    def fire_due(self, now):
+        """Fire every transition whose time has come"""
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, transition, reminder_id, reminder_datetime = heapq.heappop(self._heap)
+            updated = self._candidates(transition).filter(
+                pk=reminder_id, reminder_datetime=reminder_datetime
+            ).update(status=transition)
+
+            if not updated:
+                self.stats.skipped += 1
+                continue
+
+            lag = (now - fire_at).total_seconds()
+            self.stats.record(lag)
+            reminder_status_changed.send(
+                sender=Reminder, reminder_id=reminder_id, status=transition,
+                scheduled_at=fire_at, lag=lag,
+            )
+
+    def tick(self):
+        now = self.clock()
+        if self._last_refresh is None or (now - self._last_refresh).total_seconds() >= self.refresh_interval:
+            self.refresh(now)
+        self.load_window(now)
+        self.fire_due(now)
+        return now
+
+    def seconds_until_next(self, now):
+        if not self._heap:
+            return None
+        return max((self._heap[0][0] - now).total_seconds(), 0)
+
+    def run(self, tick_interval=1.0, stats_interval=60.0, report=None):
+        last_stats = time.monotonic()
+        while True:
+            now = self.tick()
+            if time.monotonic() - last_stats >= stats_interval:
+                snapshot = dict(self.stats.snapshot(), queued=len(self))
+                if report is not None:
+                    report(snapshot)
+                logger.info('Reminder scheduler: %s', snapshot)
+                last_stats = time.monotonic()
+
+            wait = self.seconds_until_next(now)
+            time.sleep(tick_interval if wait is None else min(wait, tick_interval))
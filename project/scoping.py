@@ -0,0 +1,39 @@
+"""Ownership-scoped lookups for the project -> todolist -> task pages
+
+Each helper authorizes and fetches in a single joined query and raises
+Http404 when the object does not exist or belongs to another user.
+"""
+from django.shortcuts import get_object_or_404
+
+from .models import Project
+
+
+def get_project_or_404(user, project_id):
+    return get_object_or_404(Project, pk=project_id, created_by=user)
+
+
+def get_project_child_or_404(user, model, project_id, pk):
+    """A todolist, file or note of one of the user's projects, with .project loaded"""
+    return get_object_or_404(
+        model.objects.select_related('project'), pk=pk, project_id=project_id, project__created_by=user
+    )
+
+
+def get_todolist_or_404(user, project_id, todolist_id):
+    from todolist.models import Todolist
+
+    return get_project_child_or_404(user, Todolist, project_id, todolist_id)
+
+
+def get_task_or_404(user, project_id, todolist_id, task_id):
+    """A task with .project and .todolist loaded"""
+    from task.models import Task
+
+    return get_object_or_404(
+        Task.objects.select_related('project', 'todolist'),
+        pk=task_id,
+        todolist_id=todolist_id,
+        todolist__project_id=project_id,
+        project_id=project_id,
+        project__created_by=user,
+    )
@@ -1,16 +1,20 @@
+from urllib.parse import quote
+
+from django.utils.functional import cached_property
 from rest_framework import serializers
+from core.profiling import ProfiledSerializerMixin
 from .models import ShareLink, Comment, Reminder, ProjectNote, Project
 from account.models import User
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     """Serializer for User model"""
     class Meta:
         model = User
         fields = ['id', 'name', 'email']
 
 
-class ProjectNoteSerializer(serializers.ModelSerializer):
+class ProjectNoteSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     """Serializer for ProjectNote model"""
     class Meta:
         model = ProjectNote
@@ -18,7 +22,7 @@ class ProjectNoteSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class ShareLinkSerializer(serializers.ModelSerializer):
+class ShareLinkSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     """Serializer for ShareLink model"""
     share_url = serializers.SerializerMethodField()
     whatsapp_url = serializers.SerializerMethodField()
@@ -32,39 +36,33 @@ class ShareLinkSerializer(serializers.ModelSerializer):
                   'mailto_url', 'created_at', 'is_active', 'created_by', 'created_by_name']
         read_only_fields = ['id', 'token', 'created_at', 'created_by']
 
-    def get_share_url(self, obj):
-        """Generate shareable URL"""
+    @cached_property
+    def share_base_url(self):
+        """Absolute URL prefix for shared projects, built once per response"""
         request = self.context.get('request')
         if request:
-            base_url = request.build_absolute_uri('/')
-            return f"{base_url}projects/shared/{obj.token}/"
-        return f"/projects/shared/{obj.token}/"
+            return request.build_absolute_uri('/projects/shared/')
+        return "/projects/shared/"
+
+    def get_share_url(self, obj):
+        """Generate shareable URL"""
+        return f"{self.share_base_url}{obj.token}/"
 
     def get_whatsapp_url(self, obj):
         """Generate WhatsApp share URL"""
-        from urllib.parse import quote
-        request = self.context.get('request')
-        if request:
-            share_url = request.build_absolute_uri(f'/projects/shared/{obj.token}/')
-        else:
-            share_url = f"/projects/shared/{obj.token}/"
+        share_url = self.get_share_url(obj)
         message = f"Check out this project: {obj.project.name}\n{share_url}"
         return f"https://wa.me/?text={quote(message)}"
 
     def get_mailto_url(self, obj):
         """Generate mailto URL"""
-        from urllib.parse import quote
-        request = self.context.get('request')
-        if request:
-            share_url = request.build_absolute_uri(f'/projects/shared/{obj.token}/')
-        else:
-            share_url = f"/projects/shared/{obj.token}/"
+        share_url = self.get_share_url(obj)
         subject = f"Shared Project: {obj.project.name}"
         body = f"I'd like to share this project with you:\n\n{obj.project.name}\n\nView it here: {share_url}"
         return f"mailto:?subject={quote(subject)}&body={quote(body)}"
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     """Serializer for Comment model"""
     user_name = serializers.CharField(source='user.name', read_only=True)
     user_email = serializers.CharField(source='user.email', read_only=True)
@@ -76,9 +74,10 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'timestamp', 'updated_at', 'user']
 
 
-class ReminderSerializer(serializers.ModelSerializer):
+class ReminderSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     """Serializer for Reminder model"""
-    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    status = serializers.CharField(source='get_current_status', read_only=True)
+    status_display = serializers.CharField(source='get_current_status_display', read_only=True)
     created_by_name = serializers.CharField(source='created_by.name', read_only=True)
     project_name = serializers.CharField(source='project.name', read_only=True)
 
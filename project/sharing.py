@@ -0,0 +1,94 @@
+"""Public read-only access to projects through share link tokens
+
+Share links get posted to chat groups, so a burst of anonymous requests for
+the same token is the normal case. Token lookups go through an in-process
+LRU that also remembers bad tokens and is invalidated whenever a share
+link changes. The read-only snapshot is stored in the project cache, so a
+warm request costs no queries at all.
+"""
+from django.db.models import Prefetch
+from django.template.loader import render_to_string
+
+from .cache import LocalMemoryBackend, get_project_cache
+from .models import Project, ShareLink
+
+
+# Every entry is stamped with the share-links version, which any change to
+# a ShareLink replaces (project.signals). With a shared PROJECT_CACHE
+# backend this retires the entry in every process at once; the TTL only
+# bounds staleness with a process-local backend.
+TOKEN_CACHE_TIMEOUT = 30
+TOKEN_MAX_LENGTH = 64
+# Version key in the project cache shared by all share links
+SHARE_LINKS_VERSION = 'share-links'
+
+_INVALID = ''
+_token_cache = LocalMemoryBackend(max_entries=10000)
+
+
+def resolve_share_token(token):
+    """Return the project id an active share token points to, or None"""
+    if not token or len(token) > TOKEN_MAX_LENGTH:
+        return None
+
+    # Read the version first: a lookup racing a change is filed under the
+    # version that change retires
+    version = get_project_cache().version(SHARE_LINKS_VERSION)
+    entry = _token_cache.get(token)
+    if entry is not None and entry[1] == version:
+        project_id = entry[0]
+    else:
+        project_id = ShareLink.objects.filter(
+            token=token, is_active=True
+        ).values_list('project_id', flat=True).first() or _INVALID
+        _token_cache.set(token, (project_id, version), TOKEN_CACHE_TIMEOUT)
+    return project_id or None
+
+
+def forget_share_token(token):
+    """Stop resolving a changed token here, and everywhere the project cache is shared"""
+    _token_cache.delete(token)
+    get_project_cache().bump(SHARE_LINKS_VERSION)
+
+
+def _build_snapshot(project_id):
+    from task.models import Task
+
+    project = Project.objects.prefetch_related(
+        'todolists', Prefetch('tasks', queryset=Task.objects.only('todolist_id', 'name', 'description', 'is_done')),
+    ).get(pk=project_id)
+
+    tasks_by_list = {}
+    for task in project.tasks.all():
+        tasks_by_list.setdefault(task.todolist_id, []).append({
+            'name': task.name,
+            'description': task.description,
+            'is_done': task.is_done,
+        })
+
+    return {
+        'name': project.name,
+        'description': project.description,
+        'start_date': project.start_date,
+        'end_date': project.end_date,
+        'todolists': [
+            {
+                'name': todolist.name,
+                'description': todolist.description,
+                'tasks': tasks_by_list.get(todolist.pk, []),
+            }
+            for todolist in project.todolists.all()
+        ],
+    }
+
+
+def shared_snapshot(project_id):
+    """Read-only view of a project, cached until the project changes"""
+    return get_project_cache().get_or_set(project_id, 'shared-snapshot', lambda: _build_snapshot(project_id))
+
+
+def shared_snapshot_html(project_id):
+    """Rendered snapshot fragment, cached alongside the snapshot data"""
+    return get_project_cache().get_or_set(project_id, 'shared-snapshot-html', lambda: render_to_string(
+        'project/shared_snapshot.html', {'snapshot': shared_snapshot(project_id)}
+    ))
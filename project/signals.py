@@ -0,0 +1,151 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from .blobs import release_blob, retain_blob
+from .cache import get_project_cache
+from .deletion import delete_scope, gather, take
+from .live import publish_project_event
+from .previews import enqueue_preview
+from .sharing import forget_share_token
+from .storage import blob_hash
+from .models import Comment, Project, ProjectFile, ProjectNote, Reminder, ShareLink, Tombstone
+
+
+# Sent by the reminder scheduler after it moves a reminder to a new status.
+# Receivers get reminder_id, status, scheduled_at and lag (seconds).
+reminder_status_changed = Signal()
+
+
+@receiver(post_delete, sender=ProjectNote)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Reminder)
+def record_tombstone(sender, instance, **kwargs):
+    """Remember hard-deleted rows so sync clients can drop them"""
+    Tombstone.objects.create(
+        project_id=instance.project_id, model=sender._meta.model_name, object_id=instance.pk
+    )
+
+
+@receiver(post_delete, sender=Project)
+def clear_tombstones(sender, instance, **kwargs):
+    """A deleted project has nobody left to sync with"""
+    Tombstone.objects.filter(project_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=ProjectNote)
+@receiver(post_save, sender=Comment)
+def publish_saved(sender, instance, created, **kwargs):
+    """Tell live subscribers a note or comment was created or edited"""
+    event = {
+        'type': 'created' if created else 'updated',
+        'model': sender._meta.model_name,
+        'id': str(instance.pk),
+    }
+    transaction.on_commit(lambda: publish_project_event(instance.project_id, event))
+
+
+@receiver(post_delete, sender=ProjectNote)
+@receiver(post_delete, sender=Comment)
+def publish_deleted(sender, instance, **kwargs):
+    """Tell live subscribers a note or comment was deleted"""
+    event = {'type': 'deleted', 'model': sender._meta.model_name, 'id': str(instance.pk)}
+    transaction.on_commit(lambda: publish_project_event(instance.project_id, event))
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def bump_project_version(sender, instance, **kwargs):
+    """Retire cached data for an edited or deleted project"""
+    transaction.on_commit(lambda: get_project_cache().bump(instance.pk))
+
+
+@receiver(post_save, sender='todolist.Todolist')
+@receiver(post_save, sender='task.Task')
+@receiver(post_save, sender=ProjectFile)
+@receiver(post_save, sender=ProjectNote)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Reminder)
+def bump_parent_project_version(sender, instance, **kwargs):
+    """Retire cached data for the project a changed row belongs to"""
+    transaction.on_commit(lambda: get_project_cache().bump(instance.project_id))
+
+
+@receiver(pre_delete, sender='todolist.Todolist')
+@receiver(pre_delete, sender='task.Task')
+@receiver(pre_delete, sender=ProjectFile)
+@receiver(pre_delete, sender=ProjectNote)
+@receiver(pre_delete, sender=Comment)
+@receiver(pre_delete, sender=Reminder)
+def gather_deleted_rows_project(sender, instance, origin=None, **kwargs):
+    # Read now: a row loaded without project_id cannot load it after the delete
+    gather(delete_scope(sender, instance, origin), '_deleted_rows_projects', instance.project_id)
+
+
+@receiver(post_delete, sender='todolist.Todolist')
+@receiver(post_delete, sender='task.Task')
+@receiver(post_delete, sender=ProjectFile)
+@receiver(post_delete, sender=ProjectNote)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Reminder)
+def bump_deleted_rows_project_version(sender, instance, origin=None, **kwargs):
+    """Retire cached data for the projects of deleted rows, once per project and delete() call"""
+    for project_id in set(take(delete_scope(sender, instance, origin), '_deleted_rows_projects') or ()):
+        transaction.on_commit(lambda project_id=project_id: get_project_cache().bump(project_id))
+
+
+def _stored_blob(projectfile):
+    name = ProjectFile._base_manager.filter(pk=projectfile.pk).values_list('attachment', flat=True).first()
+    return blob_hash(name)
+
+
+@receiver(pre_save, sender=ProjectFile)
+def snapshot_attachment_blob(sender, instance, raw=False, **kwargs):
+    """Read the stored attachment of a file loaded without it"""
+    if raw or instance._state.adding or hasattr(instance, '_stored_blob'):
+        return
+    if 'attachment' not in instance.get_deferred_fields():
+        instance._stored_blob = _stored_blob(instance)
+
+
+@receiver(post_save, sender=ProjectFile)
+def retain_attachment_blob(sender, instance, created, raw=False, **kwargs):
+    """Move the file's blob reference when it gets a new or replaced attachment"""
+    if raw or 'attachment' in instance.get_deferred_fields():
+        return
+    old = '' if created else getattr(instance, '_stored_blob', '')
+    new = blob_hash(instance.attachment.name)
+    if old != new:
+        if new:
+            retain_blob(new, instance.size)
+        if old:
+            release_blob(old)
+    instance._stored_blob = new
+
+
+@receiver(post_save, sender=ProjectFile)
+def queue_attachment_preview(sender, instance, created, raw=False, **kwargs):
+    """Render a thumbnail or text preview once the upload has committed"""
+    if created and not raw:
+        transaction.on_commit(lambda: enqueue_preview(instance))
+
+
+@receiver(pre_delete, sender=ProjectFile)
+def snapshot_deleted_attachment_blob(sender, instance, **kwargs):
+    # After the delete the row can no longer be read
+    if not hasattr(instance, '_stored_blob'):
+        instance._stored_blob = _stored_blob(instance)
+
+
+@receiver(post_delete, sender=ProjectFile)
+def release_attachment_blob(sender, instance, **kwargs):
+    """Drop a reference; gc_blobs deletes the file once nothing refers to it"""
+    if instance._stored_blob:
+        release_blob(instance._stored_blob)
+
+
+@receiver(post_save, sender=ShareLink)
+@receiver(post_delete, sender=ShareLink)
+def forget_cached_share_token(sender, instance, **kwargs):
+    """Make a deactivated or deleted share link stop resolving right away"""
+    transaction.on_commit(lambda: forget_share_token(instance.token))
@@ -68,6 +68,29 @@ async function apiFetch(url, options = {}) {
     }
 }
 
+// Dashboard API: first page of notes, comments, reminders and share links
+const DashboardAPI = {
+    async getDashboard(projectId) {
+        const url = `${API_BASE_URL}/projects/${projectId}/dashboard/`;
+        return await apiFetch(url, {
+            method: 'GET',
+        });
+    },
+};
+
+// Sync API: only what changed since the last sync token
+const SyncAPI = {
+    async getChanges(projectId, syncToken) {
+        let url = `${API_BASE_URL}/projects/${projectId}/changes/`;
+        if (syncToken) {
+            url += `?since=${encodeURIComponent(syncToken)}`;
+        }
+        return await apiFetch(url, {
+            method: 'GET',
+        });
+    },
+};
+
 // Share Link API
 const ShareAPI = {
     async shareProject(projectId) {
@@ -227,6 +250,6 @@ function formatDateForInput(dateString) {
 
 // Export for use in other scripts
 if (typeof module !== 'undefined' && module.exports) {
-    module.exports = { ShareAPI, NotesAPI, CommentsAPI, RemindersAPI, formatDateTime, formatDateForInput };
+    module.exports = { DashboardAPI, SyncAPI, ShareAPI, NotesAPI, CommentsAPI, RemindersAPI, formatDateTime, formatDateForInput };
 }
 
@@ -0,0 +1,78 @@
+"""Content-addressed storage for project attachments
+
+Files are stored once per SHA-256 digest under sharded directories
+(cas/ab/cd/abcd...), so identical uploads share a blob. Blob rows count
+the ProjectFiles pointing at each digest; `manage.py gc_blobs` deletes
+blobs nobody references any more.
+"""
+import hashlib
+import os
+import posixpath
+import uuid
+
+from django.core.files.storage import FileSystemStorage, storages
+
+
+CAS_PREFIX = 'cas'
+
+
+def blob_name(content_hash):
+    return posixpath.join(CAS_PREFIX, content_hash[:2], content_hash[2:4], content_hash)
+
+
+def blob_hash(name):
+    """Digest a content-addressed name stands for, '' for any other name"""
+    if name and name.startswith(CAS_PREFIX + '/'):
+        return posixpath.basename(name)
+    return ''
+
+
+def attachment_storage():
+    """Storage for ProjectFile.attachment, settings.STORAGES['attachments']"""
+    return storages['attachments']
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by their SHA-256 and never stores a digest twice
+
+    Pass content with a `content_hash` attribute to skip hashing it again.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Names are digests: the same name always means the same bytes
+        return name
+
+    def _save(self, name, content):
+        content_hash = getattr(content, 'content_hash', None) or self._hash(content)
+        name = blob_name(content_hash)
+        if self._reuse(name):
+            return name
+        # Write under a private name and link it into place, so a blob is
+        # never visible half-written and concurrent writers of the same
+        # content cannot collide
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        try:
+            os.link(self.path(temporary), self.path(name))
+        except FileExistsError:
+            self._reuse(name)
+        finally:
+            os.remove(self.path(temporary))
+        return name
+
+    def _reuse(self, name):
+        try:
+            # Refresh the mtime so gc_blobs' grace period covers this new reference
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    @staticmethod
+    def _hash(content):
+        hasher = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            hasher.update(chunk)
+        content.seek(0)
+        content.content_hash = hasher.hexdigest()
+        return content.content_hash
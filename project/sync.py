@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import REMINDER_DUE_SOON_WINDOW, Tombstone
+
+
+# Tombstones older than this are pruned; older sync tokens get a full reset
+TOMBSTONE_RETENTION = timedelta(days=30)
+# updated_at is stamped when a row is saved, not when its transaction
+# commits, so a row can become visible with a timestamp before a token
+# issued in the meantime. Tokens point this far back (the longest write
+# transaction expected) and clients merge the overlap by id.
+SYNC_OVERLAP = timedelta(minutes=1)
+
+
+def new_sync_token(now=None):
+    """Token for a sync taken now, covering rows whose transactions are still open"""
+    return encode_sync_token((now or timezone.now()) - SYNC_OVERLAP)
+
+
+def encode_sync_token(moment):
+    """Opaque token for a point in time (microseconds since the epoch)"""
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def decode_sync_token(token):
+    """Return the datetime a token stands for, or None if it is not valid"""
+    try:
+        return datetime.fromtimestamp(int(token) / 1_000_000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def project_changes(project, since=None):
+    """Notes, comments and reminders of a project changed after `since`
+
+    Returns a dict with the changed querysets, the deleted rows and a new
+    sync token. Rows changed within SYNC_OVERLAP of the last sync come
+    back again. Without `since` (or with one older than the tombstone
+    retention) everything is returned and 'reset' is set, so the client
+    should drop what it has.
+    """
+    now = timezone.now()
+    reset = since is None or since < now - TOMBSTONE_RETENTION
+
+    notes = project.notes.order_by('-created_at')
+    comments = project.comments.select_related('user').order_by('-timestamp')
+    reminders = project.reminders.with_current_status(now).select_related('created_by').order_by('reminder_datetime')
+    deleted = Tombstone.objects.none()
+
+    if not reset:
+        notes = notes.filter(updated_at__gt=since)
+        comments = comments.filter(updated_at__gt=since)
+        # Live reminder status changes with time, so also resend reminders
+        # that crossed the due-soon or overdue boundary since the last sync
+        reminders = reminders.filter(
+            Q(updated_at__gt=since)
+            | Q(reminder_datetime__gt=since, reminder_datetime__lte=now)
+            | Q(reminder_datetime__gt=since + REMINDER_DUE_SOON_WINDOW,
+                reminder_datetime__lte=now + REMINDER_DUE_SOON_WINDOW)
+        )
+        deleted = Tombstone.objects.filter(project_id=project.id, deleted_at__gt=since)
+
+    return {
+        'reset': reset,
+        'notes': notes,
+        'comments': comments,
+        'reminders': reminders,
+        'deleted': deleted,
+        'sync_token': new_sync_token(now),
+    }
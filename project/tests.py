@@ -1,3 +1,1196 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import json
+import os
+import secrets
+import shutil
+import tempfile
+import tracemalloc
+import zipfile
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import quote
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from account.models import User
+from search.models import SearchDocument
+from task.counters import find_drifted_counters
+from task.models import Task
+from todolist.models import Todolist
+
+from . import live, preview_render, sharing, uploads
+from .blobs import collect_garbage
+from .cache import LocalMemoryBackend, ProjectCache, get_project_cache
+from .downloads import parse_range
+from .events import route_project_events
+from .export import export_jsonl
+from .pagination import CommentCursorPagination, ProjectNoteCursorPagination, ReminderCursorPagination
+from .importer import Checkpoint, ProjectImporter, read_records
+from .models import (
+    REMINDER_DUE_SOON_WINDOW, Blob, Comment, FilePreview, Project, ProjectFile, ProjectNote, Reminder, ShareLink
+)
+from .previews import enqueue_preview, pending_previews, store_previews
+from .ratelimit import InMemoryBackend, check_limits, client_ip
+from .scheduler import ReminderScheduler
+from .storage import attachment_storage, blob_name
+from .sync import decode_sync_token, project_changes
+from .uploads import append_chunk, staging_path, start_upload
+
+
+class PageQueryTests(TestCase):
+    """Page and dashboard query budgets hold however much a project contains"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Busy project', created_by=cls.user)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(self.user)
+        self.add_rows(1)
+
+    def add_rows(self, count):
+        for n in range(count):
+            todolist = Todolist.objects.create(project=self.project, name=f'List {n}', created_by=self.user)
+            for done in (False, True):
+                Task.objects.create(
+                    project=self.project, todolist=todolist, name=f'Task {n}', is_done=done, created_by=self.user
+                )
+            ProjectFile.objects.create(
+                project=self.project, name=f'File {n}', attachment=ContentFile(f'File {n}'.encode(), 'file.txt')
+            )
+            ProjectNote.objects.create(project=self.project, content=f'Note {n}')
+            Comment.objects.create(project=self.project, user=self.user, message=f'Comment {n}')
+            Reminder.objects.create(
+                project=self.project, title=f'Reminder {n}', created_by=self.user,
+                reminder_datetime=timezone.now() + timedelta(days=n),
+            )
+            ShareLink.objects.create(project=self.project, token=secrets.token_urlsafe(32), created_by=self.user)
+        # Signals bump the version on commit, which the test transaction never reaches
+        get_project_cache().bump(self.project.pk)
+
+    def assertQueryBudget(self, url, queries):
+        for _ in range(2):
+            with self.assertNumQueries(queries):
+                self.assertEqual(self.client.get(url).status_code, 200)
+            self.add_rows(10)
+
+    def test_projects_page(self):
+        self.assertQueryBudget('/projects/', 3)
+
+    def test_project_page(self):
+        # Session, user, project; todolists, files and their previews
+        self.assertQueryBudget(f'/projects/{self.project.pk}/', 6)
+
+    def test_project_page_from_cache(self):
+        url = f'/projects/{self.project.pk}/'
+        self.client.get(url)
+        with self.assertNumQueries(3):
+            self.assertContains(self.client.get(url), 'List 0')
+
+    def test_dashboard(self):
+        # Session, user, project; one page each of notes, comments, reminders and share links
+        self.assertQueryBudget(f'/project-features/api/projects/{self.project.pk}/dashboard/', 7)
+
+
+class ListQueryTests(TestCase):
+    """20-row list pages cost a fixed number of queries, and cached pages fewer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Lists', created_by=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.add_rows(20)
+
+    def add_rows(self, count):
+        for n in range(count):
+            ProjectNote.objects.create(project=self.project, content=f'Note {n}')
+            Comment.objects.create(project=self.project, user=self.user, message=f'Comment {n}')
+            Reminder.objects.create(
+                project=self.project, title=f'Reminder {n}', created_by=self.user,
+                reminder_datetime=timezone.now() + timedelta(days=n),
+            )
+            ShareLink.objects.create(project=self.project, token=secrets.token_urlsafe(32), created_by=self.user)
+        get_project_cache().bump(self.project.pk)
+
+    def url(self, resource, **params):
+        query = '&'.join(f'{key}={value}' for key, value in {'project_id': self.project.pk, **params}.items())
+        return f'/project-features/api/{resource}/?{query}'
+
+    def test_page_query_counts(self):
+        # Session, user, the version stamp (count and newest change), COUNT(*)
+        # and the page. Reminders add a stamp part per status boundary, share
+        # links one for the active count, and notes check the project in each
+        # of their two get_queryset() calls
+        budgets = {'comments': 6, 'notes': 8, 'reminders': 8, 'share-links': 7}
+        for _ in range(2):
+            for resource, queries in budgets.items():
+                with self.subTest(resource=resource), self.assertNumQueries(queries):
+                    response = self.client.get(self.url(resource))
+                    self.assertEqual(len(response.json()['results']), 20)
+            self.add_rows(40)
+
+    def test_share_link_urls(self):
+        link = self.client.get(self.url('share-links')).json()['results'][0]
+        self.assertEqual(link['share_url'], f"http://testserver/projects/shared/{link['token']}/")
+        self.assertIn(quote(link['share_url']), link['whatsapp_url'])
+        self.assertIn('Lists', link['project_name'])
+
+    def test_cached_list_bookkeeping(self):
+        cache = get_project_cache()
+        hits, misses = cache.hits, cache.misses
+        url = self.url('comments')
+        first = self.client.get(url).json()
+        self.assertEqual((cache.hits - hits, cache.misses - misses), (0, 1))
+
+        # Session, user and the version stamp; the page comes from the cache
+        with self.assertNumQueries(4):
+            self.assertEqual(self.client.get(url).json(), first)
+        self.assertEqual((cache.hits - hits, cache.misses - misses), (1, 1))
+
+        # Every page and filter is its own entry
+        self.client.get(self.url('comments', page=1))
+        self.client.get(self.url('comments', pagination='cursor'))
+        self.assertEqual((cache.hits - hits, cache.misses - misses), (1, 3))
+
+        # Unfiltered lists are never cached
+        self.client.get('/project-features/api/comments/')
+        self.assertEqual((cache.hits - hits, cache.misses - misses), (1, 3))
+
+
+class CursorPaginationTests(TestCase):
+    # resource: (model, sort key, paginator)
+    resources = {
+        'comments': (Comment, 'timestamp', CommentCursorPagination),
+        'notes': (ProjectNote, 'created_at', ProjectNoteCursorPagination),
+        'reminders': (Reminder, 'reminder_datetime', ReminderCursorPagination),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Cursors', created_by=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def add_rows(self, count, start=0):
+        with self.captureOnCommitCallbacks(execute=True):
+            for n in range(start, start + count):
+                ProjectNote.objects.create(project=self.project, content=f'Note {n}')
+                Comment.objects.create(project=self.project, user=self.user, message=f'Comment {n}')
+                Reminder.objects.create(
+                    project=self.project, title=f'Reminder {n}', created_by=self.user,
+                    reminder_datetime=timezone.now() + timedelta(days=n + 1),
+                )
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def first_page_url(self, resource):
+        return f'/project-features/api/{resource}/?project_id={self.project.pk}&pagination=cursor'
+
+    def walk(self, resource, between_pages=None):
+        """Ids of every row, following next links from the first page"""
+        ids = []
+        url = self.first_page_url(resource)
+        while url:
+            page = self.get(url)
+            self.assertLessEqual(len(page['results']), 20)
+            ids += [row['id'] for row in page['results']]
+            url = page['next']
+            if url and between_pages:
+                between_pages()
+                between_pages = None
+        return ids
+
+    def expected_ids(self, resource, ids=None):
+        """Row ids in the paginator's order"""
+        model, _, pagination_class = self.resources[resource]
+        ordering = pagination_class.ordering
+        rows = model.objects.filter(project=self.project)
+        if ids is not None:
+            rows = rows.filter(pk__in=ids)
+        rows = rows.order_by(*([ordering] if isinstance(ordering, str) else ordering))
+        return [str(pk) for pk in rows.values_list('pk', flat=True)]
+
+    def test_walking_every_page_returns_every_row_once(self):
+        self.add_rows(45)
+        for resource in self.resources:
+            with self.subTest(resource=resource):
+                ids = self.walk(resource)
+                self.assertEqual(len(ids), 45)
+                self.assertEqual(ids, self.expected_ids(resource))
+
+    def test_tied_sort_keys_keep_a_stable_order(self):
+        self.add_rows(45)
+        moment = timezone.now() + timedelta(days=1)
+        for model, field, _ in self.resources.values():
+            model.objects.filter(project=self.project).update(**{field: moment})
+        get_project_cache().bump(self.project.pk)
+
+        for resource in self.resources:
+            with self.subTest(resource=resource):
+                first, second = self.walk(resource), self.walk(resource)
+                self.assertEqual(len(set(first)), 45)
+                # Ties fall back to the id, in the sort key's direction, not to
+                # whatever order the database picks
+                descending = self.resources[resource][2].ordering[0].startswith('-')
+                self.assertEqual(first, sorted(first, reverse=descending))
+                self.assertEqual(first, second)
+
+    def test_inserts_between_pages_cause_no_skips_or_repeats(self):
+        self.add_rows(45)
+        for resource in self.resources:
+            with self.subTest(resource=resource):
+                before = self.expected_ids(resource)
+                ids = self.walk(resource, between_pages=lambda: self.add_rows(5, start=100))
+                self.assertEqual(len(ids), len(set(ids)))
+                # Every row that existed when the walk began, in order; new
+                # rows may show up only where the order puts them
+                self.assertEqual([pk for pk in ids if pk in before], before)
+                self.assertEqual(ids, self.expected_ids(resource, ids))
+
+    def test_invalid_cursor(self):
+        self.add_rows(1)
+        for resource in self.resources:
+            with self.subTest(resource=resource):
+                response = self.client.get(self.first_page_url(resource) + '&cursor=not-a-cursor')
+                self.assertIn(response.status_code, (400, 404))
+
+
+class ConditionalListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Polled', created_by=cls.user)
+        cls.url = f'/project-features/api/reminders/?project_id={cls.project.pk}'
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.reminder = Reminder.objects.create(
+            project=self.project, title='Later', created_by=self.user,
+            reminder_datetime=timezone.now() + REMINDER_DUE_SOON_WINDOW + timedelta(hours=1),
+        )
+
+    def test_unchanged_poll_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        # Session, user and the four parts of the version stamp; no rows
+        with self.assertNumQueries(6):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_status_change_and_delete_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        # Nothing is written when the reminder becomes due soon
+        later = timezone.now() + timedelta(hours=2)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['status'], 'due_soon')
+
+        etag = self.client.get(self.url)['ETag']
+        self.reminder.delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ProjectCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Cached', created_by=cls.user)
+        cls.todolist = Todolist.objects.create(project=cls.project, name='List', created_by=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def finish_new_task(self):
+        task = Task.objects.get(name='New task')
+        task.is_done = True
+        task.save()
+
+    def test_no_stale_read_after_write(self):
+        page = f'/projects/{self.project.pk}/'
+        todolist_page = f'/projects/{self.project.pk}/{self.todolist.pk}/'
+        comments = f'/project-features/api/comments/?project_id={self.project.pk}'
+        writes = [
+            (page, lambda: Todolist.objects.create(project=self.project, name='Second list', created_by=self.user),
+             'Second list'),
+            (todolist_page, lambda: Task.objects.create(
+                project=self.project, todolist=self.todolist, name='New task', created_by=self.user), 'New task'),
+            (page, self.finish_new_task, '1/1 done'),
+            (todolist_page, lambda: Task.objects.filter(name='New task').update(name='Renamed task'), None),
+            (comments, lambda: Comment.objects.create(project=self.project, user=self.user, message='Hello'),
+             'Hello'),
+        ]
+        for url, write, expected in writes:
+            self.client.get(url)
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+            if expected is None:
+                # Queryset updates send no signals: the old page is still served
+                self.assertNotContains(self.client.get(url), 'Renamed task')
+            else:
+                self.assertContains(self.client.get(url), expected)
+
+    def test_write_during_load(self):
+        cache = ProjectCache(LocalMemoryBackend())
+
+        def load_then_commit_write():
+            # A write commits after this value was read but before it is stored
+            cache.bump(self.project.pk)
+            return 'before the write'
+
+        self.assertEqual(cache.get_or_set(self.project.pk, 'detail', load_then_commit_write), 'before the write')
+        self.assertEqual(cache.get_or_set(self.project.pk, 'detail', lambda: 'after the write'), 'after the write')
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_lru_and_ttl_eviction(self):
+        cache = ProjectCache(LocalMemoryBackend(max_entries=3), timeout=60)
+        now = [1000.0]
+        with mock.patch('project.cache.time.monotonic', lambda: now[0]):
+            cache.get_or_set(self.project.pk, 'a', lambda: 'a')
+            cache.get_or_set(self.project.pk, 'b', lambda: 'b')
+            cache.get_or_set(self.project.pk, 'a', lambda: 'stale')
+            # The version entry and 'a' were used last, so 'b' goes first
+            cache.get_or_set(self.project.pk, 'c', lambda: 'c')
+            self.assertEqual(cache.get_or_set(self.project.pk, 'b', lambda: 'b again'), 'b again')
+            self.assertEqual(cache.stats()['evictions'], 2)
+
+            now[0] += 61
+            self.assertEqual(cache.get_or_set(self.project.pk, 'b', lambda: 'expired'), 'expired')
+        self.assertEqual(cache.stats(), {
+            'backend': 'LocalMemoryBackend', 'hits': 1, 'misses': 5, 'evictions': 2, 'entries': 3,
+        })
+
+
+class ExportImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Exported', created_by=cls.user)
+        for n in range(3):
+            todolist = Todolist.objects.create(project=cls.project, name=f'List {n}', created_by=cls.user)
+            for m in range(4):
+                Task.objects.create(
+                    project=cls.project, todolist=todolist, name=f'Task {n}.{m}', is_done=m % 2 == 0,
+                    created_by=cls.user,
+                )
+        ProjectNote.objects.create(project=cls.project, content='A note')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def export(self, export_format):
+        response = self.client.get(f'/projects/{self.project.pk}/export/?format={export_format}')
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def upload(self, content, filename):
+        response = self.client.post('/project-features/api/projects/import/', {
+            'file': SimpleUploadedFile(filename, content),
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def imported_counts(self):
+        projects = Project.objects.filter(created_by=self.user).exclude(pk=self.project.pk)
+        return (
+            projects.count(),
+            Todolist.objects.filter(project__in=projects).count(),
+            Task.objects.filter(project__in=projects).count(),
+        )
+
+    def test_export_is_parents_first(self):
+        records = [json.loads(line) for line in self.export('jsonl').splitlines()]
+        types = [record['type'] for record in records]
+        self.assertEqual(types, ['project'] + ['todolist'] * 3 + ['task'] * 12 + ['note'])
+        self.assertEqual(self.export('csv').decode().splitlines()[0].split(',')[:3], ['type', 'id', 'project'])
+
+    def test_reupload_is_idempotent(self):
+        jsonl = self.export('jsonl')
+        first = self.upload(jsonl, 'project.jsonl')
+        self.assertEqual(
+            (first['project'], first['todolist'], first['task'], first['existing'], first['errors']), (1, 3, 12, 0, 0)
+        )
+        counts = self.imported_counts()
+
+        # The same file again, as after a failed upload, and the CSV export,
+        # which carries the same source ids: nothing new
+        for content, filename in ((jsonl, 'project.jsonl'), (self.export('csv'), 'project.csv')):
+            with self.subTest(filename=filename):
+                again = self.upload(content, filename)
+                self.assertEqual((again['project'], again['todolist'], again['task'], again['existing']), (0, 0, 0, 16))
+                self.assertEqual(self.imported_counts(), counts)
+                self.assertEqual(find_drifted_counters(), (0, 0))
+        self.assertEqual(self.imported_counts(), (1, 3, 12))
+
+    def test_interrupted_import_resumes_from_the_checkpoint(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        checkpoint = Checkpoint(os.path.join(directory, 'project.jsonl.checkpoint'))
+        lines = ''.join(export_jsonl(self.project))
+
+        def interrupted(records, after):
+            for count, record in enumerate(records):
+                if count == after:
+                    raise ConnectionError('Lost the database')
+                yield record
+
+        # Two-row batches committed one at a time; the crash lands mid-transaction
+        importer = ProjectImporter(self.user, batch_size=2, batches_per_transaction=1, checkpoint=checkpoint)
+        with self.assertRaises(ConnectionError):
+            importer.run(interrupted(read_records(io.StringIO(lines), 'jsonl'), after=9))
+        committed = checkpoint.load()
+        self.assertTrue(0 < committed['line'] < 9)
+        self.assertEqual(sum(self.imported_counts()), committed['project'] + committed['todolist'] + committed['task'])
+
+        importer = ProjectImporter(self.user, batch_size=2, batches_per_transaction=1, checkpoint=checkpoint)
+        result = importer.run(read_records(io.StringIO(lines), 'jsonl'))
+        self.assertEqual(
+            {key: result[key] for key in ('project', 'todolist', 'task', 'existing', 'skipped', 'errors')},
+            {'project': 1, 'todolist': 3, 'task': 12, 'existing': 0, 'skipped': 1, 'errors': 0},
+        )
+        self.assertEqual(self.imported_counts(), (1, 3, 12))
+        self.assertEqual(find_drifted_counters(), (0, 0))
+        imported = Project.objects.filter(created_by=self.user).exclude(pk=self.project.pk).get()
+        self.assertEqual(SearchDocument.objects.filter(project=imported).count(), 16)
+        self.assertEqual(checkpoint.load(), {})
+
+    def test_zip_bundles_attachments(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        with override_settings(MEDIA_ROOT=media_root):
+            projectfile = ProjectFile.objects.create(
+                project=self.project, name='Readme', attachment=ContentFile(b'read me', 'readme.txt')
+            )
+            with zipfile.ZipFile(io.BytesIO(self.export('zip'))) as archive:
+                self.assertEqual(archive.read(f'files/{projectfile.pk}/readme.txt'), b'read me')
+                self.assertIn(b'"type": "file"', archive.read('project.jsonl'))
+
+    def test_export_memory_does_not_grow_with_tasks(self):
+        todolist = Todolist.objects.filter(project=self.project).first()
+
+        def peak_memory(task_count):
+            Task.objects.bulk_create(
+                Task(project=self.project, todolist=todolist, name=f'Bulk {n}', created_by=self.user)
+                for n in range(task_count - Task.objects.filter(project=self.project).count())
+            )
+            tracemalloc.start()
+            try:
+                for _ in export_jsonl(self.project):
+                    pass
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        # Both sizes are past one iterator chunk, so the peaks should match
+        small, large = peak_memory(5000), peak_memory(20000)
+        self.assertLess(large, small * 1.5)
+
+
+class ScopingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.other = User.objects.create_user('Other', 'other@example.com', 'pw')
+        cls.project = Project.objects.create(name='Private', created_by=cls.owner)
+        cls.note = ProjectNote.objects.create(project=cls.project, content='Secret')
+
+    def test_other_users_project_is_404(self):
+        self.client.force_login(self.other)
+        base = f'/projects/{self.project.pk}/'
+        urls = [base, base + 'edit/', base + 'delete/', base + 'export/', f'{base}notes/{self.note.pk}/',
+                f'{base}notes/{self.note.pk}/edit/', f'{base}notes/{self.note.pk}/delete/']
+        for url in urls:
+            # Session, user and the one scoped lookup
+            with self.subTest(url=url), self.assertNumQueries(3):
+                self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertTrue(ProjectNote.objects.filter(pk=self.note.pk).exists())
+        self.assertTrue(Project.objects.filter(pk=self.project.pk).exists())
+
+    def test_note_of_another_project_is_404(self):
+        self.client.force_login(self.owner)
+        project = Project.objects.create(name='Second', created_by=self.owner)
+        self.assertEqual(self.client.get(f'/projects/{project.pk}/notes/{self.note.pk}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/projects/{self.project.pk}/notes/{self.note.pk}/').status_code, 200)
+
+
+class SharedProjectTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Shared project', created_by=cls.user)
+        todolist = Todolist.objects.create(project=cls.project, name='Groceries', created_by=cls.user)
+        Task.objects.create(
+            project=cls.project, todolist=todolist, name='Buy milk', is_done=True, created_by=cls.user
+        )
+
+    def setUp(self):
+        self.link = ShareLink.objects.create(
+            project=self.project, token=secrets.token_urlsafe(32), created_by=self.user
+        )
+
+    def urls(self, token):
+        return [f'/projects/shared/{token}/', f'/project-features/api/shared/{token}/']
+
+    def revoke(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.link.is_active = False
+            self.link.save()
+
+    def test_shared_views(self):
+        page, api = self.urls(self.link.token)
+        response = self.client.get(page)
+        self.assertContains(response, 'Buy milk')
+
+        response = self.client.get(api)
+        self.assertEqual(response.status_code, 200)
+        todolist = response.json()['todolists'][0]
+        self.assertEqual(todolist['name'], 'Groceries')
+        self.assertEqual(todolist['tasks'], [{'name': 'Buy milk', 'description': None, 'is_done': True}])
+
+    def test_unknown_token(self):
+        for url in self.urls('no-such-token'):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_revoked_token(self):
+        for url in self.urls(self.link.token):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.revoke()
+        for url in self.urls(self.link.token):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_revoke_retires_token_cache_everywhere(self):
+        token = self.link.token
+        self.assertEqual(sharing.resolve_share_token(token), self.project.pk)
+        # Another process's token cache is not told about the change
+        entry = sharing._token_cache.get(token)
+        self.revoke()
+        sharing._token_cache.set(token, entry, sharing.TOKEN_CACHE_TIMEOUT)
+        self.assertIsNone(sharing.resolve_share_token(token))
+
+    def test_negative_entry_cleared_on_activation(self):
+        self.revoke()
+        self.assertIsNone(sharing.resolve_share_token(self.link.token))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.link.is_active = True
+            self.link.save()
+        self.assertEqual(sharing.resolve_share_token(self.link.token), self.project.pk)
+
+
+class AttachmentBlobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Files', created_by=cls.user)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def add_file(self, content, name='notes.txt'):
+        # The ORM/admin path: no content_hash or size given
+        return ProjectFile.objects.create(project=self.project, name=name, attachment=ContentFile(content, name))
+
+    def refcount(self, content):
+        blob = Blob.objects.filter(pk=hashlib.sha256(content).hexdigest()).first()
+        return blob.refcount if blob else None
+
+    def test_unhashed_file_is_counted(self):
+        projectfile = self.add_file(b'hello')
+        content_hash = hashlib.sha256(b'hello').hexdigest()
+        self.assertEqual(projectfile.attachment.name, blob_name(content_hash))
+        self.assertEqual((projectfile.content_hash, projectfile.size, projectfile.filename),
+                         (content_hash, 5, 'notes.txt'))
+        self.add_file(b'hello', name='copy.txt')
+        self.assertEqual(self.refcount(b'hello'), 2)
+
+    def test_replaced_attachment_moves_reference(self):
+        projectfile = self.add_file(b'first')
+        projectfile.attachment = ContentFile(b'second', 'notes.txt')
+        projectfile.save()
+        self.assertEqual((self.refcount(b'first'), self.refcount(b'second')), (0, 1))
+        self.assertEqual(projectfile.content_hash, hashlib.sha256(b'second').hexdigest())
+
+        # Loaded without the attachment: the reference is read from the row
+        deferred = ProjectFile.objects.only('name').get(pk=projectfile.pk)
+        deferred.delete()
+        self.assertEqual(self.refcount(b'second'), 0)
+
+    def test_gc_keeps_referenced_files(self):
+        kept = self.add_file(b'kept')
+        released = self.add_file(b'released')
+        released.delete()
+        # A reference that was never counted, as left by older code
+        Blob.objects.filter(pk=kept.content_hash).delete()
+        orphan = attachment_storage().save('orphan', ContentFile(b'orphan'))
+        old = (timezone.now() - timedelta(days=1)).timestamp()
+        for name in (kept.attachment.name, released.attachment.name, orphan):
+            os.utime(attachment_storage().path(name), (old, old))
+        Blob.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+        deleted, _ = collect_garbage(grace_period=timedelta(hours=1))
+        self.assertEqual(deleted, 2)
+        storage = attachment_storage()
+        self.assertTrue(storage.exists(kept.attachment.name))
+        self.assertFalse(storage.exists(released.attachment.name))
+        self.assertFalse(storage.exists(orphan))
+
+
+class UploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Files', created_by=cls.user)
+        cls.content = os.urandom(3 * 1024 * 1024 + 17)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root,
+            UPLOADS={'STAGING_DIR': os.path.join(media_root, 'staging'), 'MAX_SIZE': 8 * 1024 * 1024},
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(self.user)
+
+    def create(self, length=None):
+        response = self.client.post(
+            f'/project-features/api/projects/{self.project.pk}/uploads/',
+            {'filename': 'data.bin', 'length': len(self.content) if length is None else length},
+            content_type='application/json',
+        )
+        return response
+
+    def patch(self, url, offset, data):
+        return self.client.patch(url, data, content_type='application/offset+octet-stream',
+                                 headers={'Upload-Offset': str(offset)})
+
+    def test_chunks_finalize_into_a_project_file(self):
+        response = self.create()
+        self.assertEqual(response.status_code, 201)
+        url = response['Location']
+
+        middle = len(self.content) // 2
+        response = self.patch(url, 0, self.content[:middle])
+        self.assertEqual((response.json()['offset'], response.json()['complete']), (middle, False))
+        self.assertEqual(self.client.head(url)['Upload-Offset'], str(middle))
+
+        response = self.patch(url, middle, self.content[middle:])
+        self.assertTrue(response.json()['complete'])
+        projectfile = ProjectFile.objects.get(pk=response.json()['file_id'])
+        self.assertEqual(projectfile.content_hash, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual((projectfile.size, projectfile.filename), (len(self.content), 'data.bin'))
+        with projectfile.attachment.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertEqual(os.listdir(uploads.get_upload_config()['STAGING_DIR']), [])
+
+        # A late retry of a chunk that already landed
+        self.assertEqual(self.patch(url, middle, self.content[middle:]).status_code, 409)
+
+    def test_offset_mismatch_is_a_conflict(self):
+        url = self.create()['Location']
+        self.patch(url, 0, self.content[:100])
+        for offset in (0, 200):
+            response = self.patch(url, offset, self.content[offset:offset + 100])
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response['Upload-Offset'], '100')
+        self.assertEqual(self.patch(url, 100, self.content[100:200]).json()['offset'], 200)
+
+    def test_resume_after_a_partial_chunk(self):
+        upload = start_upload(self.project, self.user, 'data.bin', 'data.bin', len(self.content))
+        # The connection drops after 1000 of the promised bytes
+        self.assertEqual(append_chunk(upload, 0, io.BytesIO(self.content[:1000]), len(self.content)), 1000)
+        # ...and leaves bytes past the durable offset behind
+        with open(staging_path(upload), 'ab') as staged:
+            staged.write(b'garbage')
+
+        # Another process, without this one's running hash, takes the next chunk
+        with mock.patch.object(uploads, '_hashers', uploads._HasherCache()):
+            self.assertEqual(append_chunk(upload, 1000, io.BytesIO(self.content[1000:5000]), 4000), 5000)
+        rest = self.content[5000:]
+        self.assertEqual(append_chunk(upload, 5000, io.BytesIO(rest), len(rest)), len(self.content))
+
+        upload.refresh_from_db()
+        self.assertEqual(upload.project_file.content_hash, hashlib.sha256(self.content).hexdigest())
+        with upload.project_file.attachment.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+
+    def test_running_hash_matches_a_rehash(self):
+        upload = start_upload(self.project, self.user, 'data.bin', 'data.bin', len(self.content))
+        chunk = 1024 * 1024 + 1
+        for offset in range(0, len(self.content), chunk):
+            data = self.content[offset:offset + chunk]
+            append_chunk(upload, offset, io.BytesIO(data), len(data))
+        projectfile = ProjectFile.objects.get(upload=upload)
+        with projectfile.attachment.open('rb') as stored:
+            self.assertEqual(projectfile.content_hash, uploads.hash_file(stored).hexdigest())
+
+    def test_size_limits(self):
+        self.assertEqual(self.create(length=8 * 1024 * 1024 + 1).status_code, 413)
+        self.assertEqual(self.create(length=-1).status_code, 400)
+        url = self.create(length=10)['Location']
+        self.assertEqual(self.patch(url, 0, b'x' * 11).status_code, 400)
+        self.assertEqual(self.patch(url, 0, b'x' * 10).json()['complete'], True)
+
+    def test_empty_file_completes_at_once(self):
+        response = self.create(length=0)
+        self.assertTrue(response.json()['complete'])
+        self.assertEqual(ProjectFile.objects.get(pk=response.json()['file_id']).size, 0)
+
+    def test_other_users_and_bad_requests(self):
+        url = self.create()['Location']
+        self.assertEqual(self.client.patch(url, b'x', content_type='application/octet-stream').status_code, 415)
+        self.assertEqual(self.client.patch(url, b'x', content_type='application/offset+octet-stream').status_code, 400)
+
+        other = User.objects.create_user('Other', 'other@example.com', 'pw')
+        self.client.force_login(other)
+        self.assertEqual(self.patch(url, 0, b'x').status_code, 404)
+        self.assertEqual(self.create().status_code, 403)
+        self.assertEqual(self.client.delete(url).status_code, 404)
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_satisfiable_ranges(self):
+        for header, expected in (
+            ('bytes=0-99', (0, 99)),
+            ('bytes=900-', (900, 999)),
+            ('bytes=-100', (900, 999)),
+            ('bytes=-2000', (0, 999)),
+            ('bytes=990-5000', (990, 999)),
+            ('bytes = 5 - 5', (5, 5)),
+        ):
+            with self.subTest(header=header):
+                self.assertEqual(parse_range(header, 1000), expected)
+
+    def test_whole_file_answers(self):
+        for header in ('bytes=0-1,5-6', 'items=0-1', 'bytes=-', 'bytes=a-b'):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 1000))
+
+    def test_unsatisfiable_ranges(self):
+        for header in ('bytes=1000-', 'bytes=-0', 'bytes=5-4'):
+            with self.subTest(header=header), self.assertRaises(ValueError):
+                parse_range(header, 1000)
+
+
+class DownloadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Files', created_by=cls.user)
+        cls.content = bytes(range(256)) * 4
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.projectfile = ProjectFile.objects.create(
+            project=self.project, name='Data', attachment=ContentFile(self.content, 'data.bin')
+        )
+        self.url = f'/projects/{self.project.pk}/files/{self.projectfile.pk}/'
+        self.etag = f'"{self.projectfile.content_hash}"'
+        self.client.force_login(self.user)
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        self.addCleanup(response.close)
+        return response
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_whole_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="data.bin"')
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_ranges(self):
+        for header, start, end in (('bytes=10-19', 10, 19), ('bytes=1000-', 1000, 1023), ('bytes=-24', 1000, 1023)):
+            with self.subTest(header=header):
+                response = self.get(Range=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response['Content-Range'], f'bytes {start}-{end}/1024')
+                self.assertEqual(response['Content-Length'], str(end - start + 1))
+                self.assertEqual(self.body(response), self.content[start:end + 1])
+
+    def test_unsatisfiable_range(self):
+        response = self.get(Range='bytes=2000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+    def test_if_none_match(self):
+        response = self.get(If_None_Match=self.etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(self.get(If_None_Match='"other"').status_code, 200)
+
+    def test_if_range(self):
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range=self.etag).status_code, 206)
+        for if_range in ('"stale"', f'W/{self.etag}'):
+            with self.subTest(if_range=if_range):
+                response = self.get(Range='bytes=0-9', If_Range=if_range)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.body(response), self.content)
+
+    def test_offloaded_to_the_web_server(self):
+        name = self.projectfile.attachment.name
+        with override_settings(DOWNLOADS={'MODE': 'x-accel-redirect', 'X_ACCEL_PREFIX': '/protected/'}):
+            response = self.get(Range='bytes=0-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/{name}')
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(response.content, b'')
+
+        with override_settings(DOWNLOADS={'MODE': 'x-sendfile'}):
+            response = self.client.get(self.url + '?inline')
+        self.assertEqual(response['X-Sendfile'], self.projectfile.attachment.path)
+        self.assertEqual(response['Content-Disposition'], 'inline; filename="data.bin"')
+
+    def test_other_users_get_404(self):
+        other = User.objects.create_user('Other', 'other@example.com', 'pw')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    async def test_asgi_streams_without_reading_everything_first(self):
+        await self.async_client.aforce_login(self.user)
+        for url, headers, expected in (
+            (self.url, {'Range': 'bytes=10-19'}, self.content[10:20]),
+            (self.url, {}, self.content),
+            (f'/projects/{self.project.pk}/export/', {}, None),
+        ):
+            with self.subTest(url=url, headers=headers):
+                response = await self.async_client.get(url, headers=headers)
+                self.assertTrue(response.is_async)
+                content = b''.join([part async for part in response.streaming_content])
+                if expected is not None:
+                    self.assertEqual(content, expected)
+                else:
+                    self.assertIn(b'"Files"', content)
+
+
+class PreviewTests(TestCase):
+    options = {'THUMBNAIL_SIZE': 64, 'THUMBNAIL_QUALITY': 70, 'TEXT_CHARS': 20}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Files', created_by=cls.user)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.directory = media_root
+
+    def write(self, filename, content):
+        path = os.path.join(self.directory, filename)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def add_file(self, content, name='notes.txt'):
+        return ProjectFile.objects.create(project=self.project, name=name, attachment=ContentFile(content, name))
+
+    def test_render_batch(self):
+        items = [
+            ('text', self.write('notes.txt', b'first line\nsecond line\nthird line\n'), 'notes.txt'),
+            ('corrupt', self.write('broken.png', b'not a png'), 'broken.png'),
+            ('binary', self.write('data.txt', b'abc\0def'), 'data.txt'),
+            ('other', self.write('archive.zip', b'PK'), 'archive.zip'),
+            ('missing', os.path.join(self.directory, 'gone.txt'), 'gone.txt'),
+        ]
+        results = {result['content_hash']: result for result in preview_render.render_batch(items, self.options)}
+
+        # Whole lines up to TEXT_CHARS
+        self.assertEqual((results['text']['kind'], results['text']['text']), ('text', 'first line'))
+        self.assertEqual(results['text']['source_size'], 34)
+        self.assertEqual(results['corrupt']['kind'], 'none')
+        self.assertTrue(results['corrupt']['error'])
+        self.assertEqual((results['binary']['kind'], results['other']['kind']), ('none', 'none'))
+        self.assertNotIn('error', results['other'])
+        self.assertIn('FileNotFoundError', results['missing']['error'])
+        self.assertEqual(results['missing']['source_size'], 0)
+
+    def test_render_image(self):
+        if preview_render.Image is None:
+            self.skipTest('Pillow is not installed')
+        buffer = io.BytesIO()
+        preview_render.Image.new('P', (640, 320)).save(buffer, format='PNG')
+        path = self.write('picture.png', buffer.getvalue())
+        [result] = preview_render.render_batch([('image', path, 'picture.png')], self.options)
+        self.assertEqual((result['kind'], result['content_type']), ('image', 'image/webp'))
+        self.assertEqual((result['width'], result['height']), (64, 32))
+        with preview_render.Image.open(io.BytesIO(result['thumbnail'])) as thumbnail:
+            self.assertEqual((thumbnail.format, thumbnail.size), ('WEBP', (64, 32)))
+
+        with mock.patch.object(preview_render, 'Image', None):
+            [result] = preview_render.render_batch([('image', path, 'picture.png')], self.options)
+        self.assertEqual(result, {'kind': 'none', 'error': 'Pillow is not installed', 'content_hash': 'image',
+                                  'source_size': len(buffer.getvalue())})
+
+    def test_store_previews_upserts_and_bumps_the_cache(self):
+        projectfile = self.add_file(b'hello')
+        cache = get_project_cache()
+        version = cache.version(self.project.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            store_previews([{'content_hash': projectfile.content_hash, 'kind': 'none', 'error': 'Boom'}])
+        self.assertNotEqual(cache.version(self.project.pk), version)
+
+        version = cache.version(self.project.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            store_previews([{'content_hash': projectfile.content_hash, 'kind': 'text', 'text': 'hello'}])
+        preview = FilePreview.objects.get()
+        self.assertEqual((preview.pk, preview.kind, preview.text, preview.error),
+                         (projectfile.content_hash, 'text', 'hello', ''))
+        self.assertNotEqual(cache.version(self.project.pk), version)
+
+    def test_pending_previews(self):
+        done = self.add_file(b'done')
+        failed = self.add_file(b'failed')
+        pending = self.add_file(b'pending', name='pending.txt')
+        self.add_file(b'pending', name='copy.txt')
+        FilePreview.objects.create(content_hash=done.content_hash, kind='text', text='done')
+        FilePreview.objects.create(content_hash=failed.content_hash, kind='none', error='Boom')
+
+        # One row per hash however many files share it
+        self.assertEqual([row[0] for row in pending_previews()], [pending.content_hash])
+        self.assertEqual(
+            sorted(row[0] for row in pending_previews(retry_failed=True)),
+            sorted([failed.content_hash, pending.content_hash]),
+        )
+
+    def test_enqueue_skips_hashes_with_a_preview(self):
+        queued = mock.Mock()
+        projectfile = self.add_file(b'hello')
+        with mock.patch('project.previews.get_preview_queue', return_value=queued):
+            enqueue_preview(projectfile)
+            queued.enqueue.assert_called_once_with(
+                projectfile.content_hash, projectfile.attachment.name, projectfile.filename
+            )
+            FilePreview.objects.create(content_hash=projectfile.content_hash, kind='text')
+            enqueue_preview(projectfile)
+            self.assertEqual(queued.enqueue.call_count, 1)
+
+
+class ReminderSchedulerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Reminders', created_by=cls.user)
+
+    def test_heap_stays_bounded_when_edits_arrive(self):
+        start = timezone.now()
+        clock = [start]
+        reminders = [
+            Reminder.objects.create(
+                project=self.project, title=f'Reminder {n}', status='due_soon', created_by=self.user,
+                reminder_datetime=start + timedelta(minutes=5, seconds=n),
+            )
+            for n in range(12)
+        ]
+        scheduler = ReminderScheduler(max_entries=10, refresh_interval=1, clock=lambda: clock[0])
+        scheduler.tick()
+        self.assertEqual(len(scheduler), 10)
+
+        for reminder in reminders[:3]:
+            reminder.title += ' (edited)'
+            reminder.save()
+        clock[0] += timedelta(seconds=2)
+        scheduler.tick()
+        self.assertEqual(len(scheduler), 10)
+
+        clock[0] += timedelta(minutes=10)
+        for _ in range(5):
+            scheduler.tick()
+            self.assertLessEqual(len(scheduler), 10)
+        self.assertEqual(Reminder.objects.filter(status='overdue').count(), 12)
+        self.assertEqual(scheduler.stats.fired, 12)
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        patcher = mock.patch('project.ratelimit.get_limiter', return_value=self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(SHARE_RATE_LIMITS={
+        'BACKEND': 'project.ratelimit.InMemoryBackend',
+        'RATES': {'shared_ip': '2/m', 'shared_token': '5/m', 'share_create': '20/m'},
+    })
+    def test_denied_request_takes_no_tokens(self):
+        abuser = [('shared_ip', '10.0.0.1'), ('shared_token', 'abc')]
+        self.assertEqual(check_limits(abuser), 0)
+        self.assertEqual(check_limits(abuser), 0)
+        for _ in range(10):
+            self.assertGreater(check_limits(abuser), 0)
+        # The shared token still has the three tokens the abuser did not get to spend
+        for n in range(3):
+            self.assertEqual(check_limits([('shared_ip', f'10.0.1.{n}'), ('shared_token', 'abc')]), 0)
+        self.assertGreater(check_limits([('shared_ip', '10.0.2.1'), ('shared_token', 'abc')]), 0)
+
+    def test_client_ip_behind_proxies(self):
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.2', HTTP_X_FORWARDED_FOR='6.6.6.6, 203.0.113.7')
+        self.assertEqual(client_ip(request), '10.0.0.2')
+        with override_settings(SHARE_RATE_LIMITS={'NUM_PROXIES': 1}):
+            self.assertEqual(client_ip(request), '203.0.113.7')
+        with override_settings(SHARE_RATE_LIMITS={'NUM_PROXIES': 3}):
+            self.assertEqual(client_ip(request), '6.6.6.6')
+
+
+class SyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Sync', created_by=cls.user)
+
+    def test_late_commit_is_not_missed(self):
+        sync_token = project_changes(self.project)['sync_token']
+        # Saved just before the token was issued, committed just after
+        note = ProjectNote.objects.create(project=self.project, content='Slow transaction')
+        ProjectNote.objects.filter(pk=note.pk).update(updated_at=timezone.now() - timedelta(seconds=5))
+
+        changes = project_changes(self.project, decode_sync_token(sync_token))
+        self.assertFalse(changes['reset'])
+        self.assertEqual([row.pk for row in changes['notes']], [note.pk])
+
+
+class LiveBusTests(SimpleTestCase):
+    async def test_publish_reaches_only_the_channel_subscribers(self):
+        bus = live.InMemoryBackend()
+        subscription = bus.subscribe('project:a')
+        other = bus.subscribe('project:b')
+        # Signals publish from sync threads
+        await asyncio.to_thread(bus.publish, 'project:a', {'type': 'created', 'id': '1'})
+        self.assertEqual(await asyncio.wait_for(subscription.get(), 1), {'type': 'created', 'id': '1'})
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(other.get(), 0.05)
+
+    async def test_close_unsubscribes(self):
+        bus = live.InMemoryBackend()
+        first, second = bus.subscribe('project:a'), bus.subscribe('project:a')
+        self.assertEqual(bus.subscriber_count(), 2)
+        first.close()
+        bus.publish('project:a', {'type': 'deleted', 'id': '1'})
+        self.assertEqual((await asyncio.wait_for(second.get(), 1))['type'], 'deleted')
+        second.close()
+        second.close()
+        self.assertEqual(bus.subscriber_count(), 0)
+
+    async def test_slow_subscriber_drops_events_past_its_queue(self):
+        bus = live.InMemoryBackend(max_queue=2)
+        subscription = bus.subscribe('project:a')
+        for n in range(5):
+            bus.publish('project:a', {'type': 'created', 'id': str(n)})
+        await asyncio.sleep(0)
+        self.assertEqual(subscription.dropped, 3)
+        self.assertEqual([(await subscription.get())['id'] for _ in range(2)], ['0', '1'])
+
+
+class LiveEventStreamTests(TransactionTestCase):
+    """project.events, driven as an ASGI application
+
+    Not a TestCase: the stream closes stale database connections the way
+    Django does around a request, which a wrapping transaction would not survive.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        self.project = Project.objects.create(name='Live', created_by=self.user)
+        self.url = f'/projects/{self.project.pk}/events/'
+        self.passed_through = []
+        self.application = route_project_events(self.django_application, heartbeat=0.2)
+
+    async def django_application(self, scope, receive, send):
+        self.passed_through.append(scope['path'])
+
+    def open_stream(self, user=None, path=None):
+        headers = []
+        if user is not None:
+            client = Client()
+            client.force_login(user)
+            cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+            headers.append((b'cookie', cookie.encode()))
+        scope = {'type': 'http', 'method': 'GET', 'path': path or self.url, 'root_path': '', 'headers': headers}
+        return ApplicationCommunicator(self.application, scope)
+
+    async def test_stream_frames_events(self):
+        stream = await sync_to_async(self.open_stream)(self.user)
+        await stream.send_input({'type': 'http.request', 'body': b''})
+        start = await stream.receive_output(1)
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), start['headers'])
+        self.assertIn((b'cache-control', b'no-cache'), start['headers'])
+        self.assertEqual((await stream.receive_output(1))['body'], b'retry: 5000\n\n')
+
+        comment = await sync_to_async(Comment.objects.create)(project=self.project, user=self.user, message='Hi')
+        chunk = await stream.receive_output(1)
+        self.assertTrue(chunk['more_body'])
+        event = {'type': 'created', 'model': 'comment', 'id': str(comment.pk)}
+        self.assertEqual(chunk['body'].decode(), f'event: created\ndata: {json.dumps(event)}\n\n')
+
+        # Nothing to send for a while
+        self.assertEqual((await stream.receive_output(1))['body'], b': keep-alive\n\n')
+
+    async def test_disconnect_unsubscribes(self):
+        bus = live.get_bus()
+        before = bus.subscriber_count()
+        stream = await sync_to_async(self.open_stream)(self.user)
+        await stream.send_input({'type': 'http.request', 'body': b''})
+        await stream.receive_output(1)
+        self.assertEqual(bus.subscriber_count(), before + 1)
+        await stream.send_input({'type': 'http.disconnect'})
+        await stream.wait(1)
+        self.assertEqual(bus.subscriber_count(), before)
+
+    async def test_anonymous_and_other_users_are_refused(self):
+        other = await sync_to_async(User.objects.create_user)('Other', 'other@example.com', 'pw')
+        for user, status in ((None, 403), (other, 404)):
+            stream = await sync_to_async(self.open_stream)(user)
+            await stream.send_input({'type': 'http.request', 'body': b''})
+            self.assertEqual((await stream.receive_output(1))['status'], status)
+            self.assertEqual((await stream.receive_output(1))['body'], b'')
+            await stream.wait(1)
+
+    async def test_other_paths_reach_django(self):
+        for path in ('/projects/', f'/projects/{self.project.pk}/', f'/projects/{self.project.pk}/events/x/'):
+            stream = self.open_stream(path=path)
+            await stream.wait(1)
+        self.assertEqual(len(self.passed_through), 3)
+
+    def test_django_view_answers_204(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, 204)
@@ -0,0 +1,189 @@
+"""Resumable, chunked uploads (tus-style offsets) for project attachments
+
+Chunks are appended to a staging file, so a worker never holds more than
+one read buffer of a request in memory. The SHA-256 of the content is
+updated as chunks arrive; the hasher lives in the process that received
+the previous chunk, and any other process re-hashes the staged bytes
+before continuing. When the last byte arrives the staging file is moved
+into storage and the ProjectFile row is created in one transaction.
+"""
+import fcntl
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ProjectFile, Upload
+
+
+READ_BUFFER_SIZE = 1024 * 1024
+
+DEFAULT_UPLOADS = {
+    'STAGING_DIR': os.path.join(settings.MEDIA_ROOT, 'staging'),
+    'MAX_SIZE': 10 * 1024 ** 3,
+    'EXPIRY': timedelta(days=1),
+    'HASHER_CACHE_SIZE': 256,
+}
+
+
+class UploadConflict(Exception):
+    """The client's offset is stale, or another request is writing this upload"""
+
+
+def get_upload_config():
+    return {**DEFAULT_UPLOADS, **getattr(settings, 'UPLOADS', {})}
+
+
+def staging_path(upload):
+    return os.path.join(get_upload_config()['STAGING_DIR'], f'{upload.pk}.part')
+
+
+def hash_file(fileobj, limit=None):
+    """SHA-256 of a file object read in buffers, up to limit bytes"""
+    hasher = hashlib.sha256()
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = READ_BUFFER_SIZE if remaining is None else min(READ_BUFFER_SIZE, remaining)
+        data = fileobj.read(size)
+        if not data:
+            break
+        hasher.update(data)
+        if remaining is not None:
+            remaining -= len(data)
+    return hasher
+
+
+class _HasherCache:
+    """upload id -> (offset, running sha256) for uploads this process is receiving"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def pop(self, upload_id):
+        with self._lock:
+            return self._entries.pop(upload_id, (None, None))
+
+    def put(self, upload_id, offset, hasher):
+        with self._lock:
+            self._entries[upload_id] = (offset, hasher)
+            self._entries.move_to_end(upload_id)
+            while len(self._entries) > get_upload_config()['HASHER_CACHE_SIZE']:
+                self._entries.popitem(last=False)
+
+
+_hashers = _HasherCache()
+
+
+def start_upload(project, user, name, filename, length):
+    upload = Upload.objects.create(
+        project=project, created_by=user, name=name, filename=filename, length=length
+    )
+    os.makedirs(get_upload_config()['STAGING_DIR'], exist_ok=True)
+    open(staging_path(upload), 'wb').close()
+    _hashers.put(upload.pk, 0, hashlib.sha256())
+    return upload
+
+
+def append_chunk(upload, offset, stream, content_length):
+    """Append content_length bytes from stream at offset; return the new offset
+
+    The staging file is locked for the duration, so concurrent PATCHes of
+    the same upload are rejected instead of interleaving.
+    """
+    if upload.is_complete:
+        raise UploadConflict('Upload already completed.')
+    if offset != upload.offset:
+        raise UploadConflict(f'Upload-Offset {offset} does not match the server offset {upload.offset}.')
+    if offset + content_length > upload.length:
+        raise ValueError('Chunk extends past Upload-Length.')
+
+    with open(staging_path(upload), 'r+b') as staged:
+        try:
+            fcntl.flock(staged, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadConflict('Another request is writing this upload.') from None
+
+        # The row may have moved on while we waited for the lock
+        upload.refresh_from_db(fields=['offset', 'project_file'])
+        if upload.is_complete or offset != upload.offset:
+            raise UploadConflict(f'Upload-Offset {offset} does not match the server offset {upload.offset}.')
+
+        hashed_offset, hasher = _hashers.pop(upload.pk)
+        if hasher is None or hashed_offset != offset:
+            staged.seek(0)
+            hasher = hash_file(staged, limit=offset)
+
+        # Drop any bytes past the durable offset left by an interrupted request
+        staged.seek(offset)
+        staged.truncate()
+
+        received = 0
+        try:
+            while received < content_length:
+                data = stream.read(min(READ_BUFFER_SIZE, content_length - received))
+                if not data:
+                    break
+                staged.write(data)
+                hasher.update(data)
+                received += len(data)
+        finally:
+            # Keep whatever arrived before a dropped connection; the client
+            # resumes from the offset reported by HEAD
+            staged.flush()
+            os.fsync(staged.fileno())
+            new_offset = offset + received
+            Upload.objects.filter(pk=upload.pk, offset=offset).update(offset=new_offset, updated_at=timezone.now())
+            upload.offset = new_offset
+            _hashers.put(upload.pk, new_offset, hasher)
+
+        if upload.offset == upload.length:
+            finalize_upload(upload, hasher.hexdigest())
+    return upload.offset
+
+
+class _StagedFile(File):
+    """Lets FileSystemStorage move the staging file into place instead of copying it"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def finalize_upload(upload, content_hash):
+    """Move the staged bytes into storage and create the ProjectFile atomically"""
+    path = staging_path(upload)
+    projectfile = ProjectFile(
+        project_id=upload.project_id,
+        name=upload.name,
+        filename=upload.filename,
+        content_hash=content_hash,
+        size=upload.length,
+    )
+    with transaction.atomic():
+        with open(path, 'rb') as staged:
+            content = _StagedFile(staged, name=upload.filename)
+            content.content_hash = content_hash
+            projectfile.attachment.save(upload.filename, content, save=False)
+        # The blob may be shared with other files, so a failure here leaves
+        # it for gc_blobs rather than deleting it
+        projectfile.save()
+        Upload.objects.filter(pk=upload.pk).update(project_file=projectfile)
+    upload.project_file = projectfile
+    _hashers.pop(upload.pk)
+    if os.path.exists(path):
+        os.remove(path)
+    return projectfile
+
+
+def discard_upload(upload):
+    _hashers.pop(upload.pk)
+    path = staging_path(upload)
+    if os.path.exists(path):
+        os.remove(path)
+    upload.delete()
@@ -9,10 +9,16 @@ app_name = 'project'
 urlpatterns = [
     path('', views.projects, name='projects'),
     path('add/', views.add, name='add'),
+    path('shared/<str:token>/', views.shared_project, name='shared_project'),
     path('<uuid:pk>/', views.project, name='project'),
+    path('<uuid:pk>/events/', views.project_events, name='project_events'),
     path('<uuid:pk>/edit/', views.edit, name='edit'),
     path('<uuid:pk>/delete/', views.delete, name='delete'),
+    path('<uuid:pk>/export/', views.export, name='export'),
+    path('<uuid:pk>/exports/<str:filename>/', views.download_export, name='download_export'),
     path('<uuid:project_id>/files/upload/', views.upload_file, name='upload_file'),
+    path('<uuid:project_id>/files/<uuid:pk>/', views.download_file, name='download_file'),
+    path('<uuid:project_id>/files/<uuid:pk>/thumbnail/', views.file_thumbnail, name='file_thumbnail'),
     path('<uuid:project_id>/files/<uuid:pk>/delete/', views.delete_file, name='delete_file'),
     path('<uuid:project_id>/notes/add/', views.add_note, name='add_note'),
     path('<uuid:project_id>/notes/<uuid:pk>/', views.note_detail, name='note_detail'),
@@ -1,8 +1,27 @@
+import logging
+import re
+
 from django.contrib.auth.decorators import login_required
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
+from django.utils.cache import get_conditional_response, patch_cache_control
 
+from .cache import get_project_cache
+from .downloads import serve_attachment, stream_over_asgi
+from .export import EXPORT_DIR, EXPORT_FORMATS
 from .forms import ProjectFileForm
-from .models import Project, ProjectNote
+from .models import FilePreview, Project, ProjectFile, ProjectNote
+from .previews import get_preview_config
+from .ratelimit import rate_limit_shared
+from .scoping import get_project_child_or_404, get_project_or_404
+from .sharing import resolve_share_token, shared_snapshot_html
+from .uploads import hash_file
+
+
+logger = logging.getLogger(__name__)
+
+_EXPORT_FILENAME_RE = re.compile(r'^[0-9a-f]{32}\.(jsonl|csv|zip)$')
 
 
 @login_required
@@ -16,13 +35,40 @@ def projects(request):
 
 @login_required
 def project(request, pk):
-    project = Project.objects.filter(created_by=request.user).get(pk=pk)
+    project = get_project_or_404(request.user, pk)
+    detail = get_project_cache().get_or_set(project.pk, 'detail', lambda: {
+        'todolists': list(project.todolists.all()),
+        'files': _files_with_previews(project),
+    })
 
     return render(request, 'project/project.html', {
-        'project': project
+        'project': project,
+        'todolists': detail['todolists'],
+        'files': detail['files'],
     })
 
 
+def _files_with_previews(project):
+    files = list(project.files.all())
+    hashes = {projectfile.content_hash for projectfile in files if projectfile.content_hash}
+    previews = {preview.pk: preview for preview in FilePreview.objects.filter(pk__in=hashes).defer('thumbnail')}
+    for projectfile in files:
+        projectfile.preview = previews.get(projectfile.content_hash)
+    return files
+
+
+@login_required
+def project_events(request, pk):
+    """Stand-in for the live event stream when it is not being served
+
+    Under ASGI, polysia_projects.asgi answers this path with
+    project.events before the request reaches Django. Under WSGI every
+    open stream would pin a worker thread, so 204 tells EventSource not
+    to reconnect.
+    """
+    return HttpResponse(status=204)
+
+
 @login_required
 def add(request):
     if request.method == 'POST':
@@ -34,14 +80,14 @@ def add(request):
 
             return redirect('/projects/')
         else:
-            print('Not valid')
+            logger.info('Project not created: missing name')
 
     return render(request, 'project/add.html')
 
 
 @login_required
 def edit(request, pk):
-    project = Project.objects.filter(created_by=request.user).get(pk=pk)
+    project = get_project_or_404(request.user, pk)
 
     if request.method == 'POST':
         name = request.POST.get('name', '')
@@ -61,18 +107,61 @@ def edit(request, pk):
 
 @login_required
 def delete(request, pk):
-    project = Project.objects.filter(created_by=request.user).get(pk=pk)
+    project = get_project_or_404(request.user, pk)
     project.delete()
 
     return redirect('/projects/')
 
 
+@login_required
+def export(request, pk):
+    """Stream the whole project tree as ?format=jsonl (default), csv or zip"""
+    project = get_project_or_404(request.user, pk)
+
+    export_format = request.GET.get('format', 'jsonl')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponse(f'Unknown export format: {export_format}', status=400)
+
+    generate, content_type, extension = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(generate(project), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="project-{project.pk}.{extension}"'
+    return stream_over_asgi(request, response)
+
+
+@login_required
+def download_export(request, pk, filename):
+    """A file written by the project.export job"""
+    project = get_project_or_404(request.user, pk)
+    if not _EXPORT_FILENAME_RE.match(filename):
+        raise Http404
+    name = f'{EXPORT_DIR}/{project.pk}/{filename}'
+    if not default_storage.exists(name):
+        raise Http404
+    extension = filename.rsplit('.', 1)[-1]
+    response = FileResponse(
+        default_storage.open(name, 'rb'), as_attachment=True, filename=f'project-{project.pk}.{extension}'
+    )
+    return stream_over_asgi(request, response)
+
+
+@rate_limit_shared
+def shared_project(request, token):
+    """Public read-only page behind a share link"""
+    project_id = resolve_share_token(token)
+    if project_id is None:
+        raise Http404
+
+    return render(request, 'project/shared.html', {
+        'snapshot_html': shared_snapshot_html(project_id)
+    })
+
+
 # Files
 
 
 @login_required
 def upload_file(request, project_id):
-    project = Project.objects.filter(created_by=request.user).get(pk=project_id)
+    project = get_project_or_404(request.user, project_id)
 
     if request.method == 'POST':
         form = ProjectFileForm(request.POST, request.FILES)
@@ -80,6 +169,13 @@ def upload_file(request, project_id):
         if form.is_valid():
             projectfile = form.save(commit=False)
             projectfile.project = project
+            attachment = form.cleaned_data['attachment']
+            projectfile.filename = attachment.name
+            projectfile.size = attachment.size
+            projectfile.content_hash = hash_file(attachment).hexdigest()
+            # Saves the storage from hashing the upload a second time
+            attachment.content_hash = projectfile.content_hash
+            attachment.seek(0)
             projectfile.save()
 
             return redirect(f'/projects/{project_id}/')
@@ -92,10 +188,33 @@ def upload_file(request, project_id):
     })
 
 
+@login_required
+def download_file(request, project_id, pk):
+    projectfile = get_project_child_or_404(request.user, ProjectFile, project_id, pk)
+    return serve_attachment(request, projectfile, as_attachment=request.GET.get('inline') is None)
+
+
+@login_required
+def file_thumbnail(request, project_id, pk):
+    projectfile = get_project_child_or_404(request.user, ProjectFile, project_id, pk)
+    # A thumbnail depends only on the content and the thumbnail size
+    etag = f'"{projectfile.content_hash}-{get_preview_config()["THUMBNAIL_SIZE"]}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        thumbnail = FilePreview.objects.filter(
+            pk=projectfile.content_hash, kind='image'
+        ).values_list('thumbnail', 'content_type').first()
+        if thumbnail is None:
+            raise Http404
+        response = HttpResponse(bytes(thumbnail[0]), content_type=thumbnail[1])
+    response.headers['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=86400)
+    return response
+
+
 @login_required
 def delete_file(request, project_id, pk):
-    project = Project.objects.filter(created_by=request.user).get(pk=project_id)
-    projectfile = project.files.get(pk=pk)
+    projectfile = get_project_child_or_404(request.user, ProjectFile, project_id, pk)
     projectfile.delete()
 
     return redirect(f'/projects/{project_id}/')
@@ -106,7 +225,7 @@ def delete_file(request, project_id, pk):
 
 @login_required
 def add_note(request, project_id):
-    project = Project.objects.filter(created_by=request.user).get(pk=project_id)
+    project = get_project_or_404(request.user, project_id)
 
     if request.method == 'POST':
         name = request.POST.get('name', '')
@@ -128,8 +247,8 @@ def add_note(request, project_id):
 
 @login_required
 def note_detail(request, project_id, pk):
-    project = Project.objects.filter(created_by=request.user).get(pk=project_id)
-    note = project.notes.get(pk=pk)
+    note = get_project_child_or_404(request.user, ProjectNote, project_id, pk)
+    project = note.project
 
     return render(request, 'project/note_detail.html', {
         'project': project,
@@ -139,8 +258,8 @@ def note_detail(request, project_id, pk):
 
 @login_required
 def note_edit(request, project_id, pk):
-    project = Project.objects.filter(created_by=request.user).get(pk=project_id)
-    note = project.notes.get(pk=pk)
+    note = get_project_child_or_404(request.user, ProjectNote, project_id, pk)
+    project = note.project
 
     if request.method == 'POST':
         name = request.POST.get('name', '')
@@ -161,8 +280,7 @@ def note_edit(request, project_id, pk):
 
 @login_required
 def note_delete(request, project_id, pk):
-    project = Project.objects.filter(created_by=request.user).get(pk=project_id)
-    note = project.notes.get(pk=pk)
+    note = get_project_child_or_404(request.user, ProjectNote, project_id, pk)
     note.delete()
 
     return redirect(f'/projects/{project_id}/')
\ No newline at end of file
@@ -3,20 +3,28 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
+from django.db.models import Count, Max, Q
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
-from .models import ShareLink, Comment, Reminder, ProjectNote, Project
+from .cache import CachedListMixin
+from .conditional import ConditionalListMixin
+from .models import REMINDER_DUE_SOON_WINDOW, ShareLink, Comment, Reminder, ProjectNote, Project
+from .pagination import (
+    CursorPaginationMixin, CommentCursorPagination, ProjectNoteCursorPagination, ReminderCursorPagination
+)
 from .serializers import (
     ShareLinkSerializer, CommentSerializer, ReminderSerializer, ProjectNoteSerializer
 )
 from account.models import User
 
 
-class ProjectNoteViewSet(viewsets.ModelViewSet):
+class ProjectNoteViewSet(ConditionalListMixin, CachedListMixin, CursorPaginationMixin, viewsets.ModelViewSet):
     """ViewSet for managing project notes"""
     serializer_class = ProjectNoteSerializer
     permission_classes = [IsAuthenticated]
+    cursor_pagination_class = ProjectNoteCursorPagination
+    cache_resource = 'notes'
 
     def get_queryset(self):
         """Filter notes by project_id"""
@@ -26,7 +34,7 @@ class ProjectNoteViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(project_id=project_id)
             # Verify user has access to the project
             project = get_object_or_404(Project, id=project_id)
-            if project.created_by != self.request.user:
+            if project.created_by_id != self.request.user.id:
                 # Check if user has access via share link (future enhancement)
                 pass
         else:
@@ -50,14 +58,21 @@ class ProjectNoteViewSet(viewsets.ModelViewSet):
         return context
 
 
-class ShareLinkViewSet(viewsets.ModelViewSet):
+class ShareLinkViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """ViewSet for managing share links"""
     serializer_class = ShareLinkSerializer
     permission_classes = [IsAuthenticated]
+    version_field = 'created_at'
+
+    def get_version_aggregates(self):
+        """Share links have no updated_at; deactivation changes the active count"""
+        aggregates = super().get_version_aggregates()
+        aggregates['active'] = Count('pk', filter=Q(is_active=True))
+        return aggregates
 
     def get_queryset(self):
         """Filter share links by project_id and user"""
-        queryset = ShareLink.objects.all()
+        queryset = ShareLink.objects.select_related('project', 'created_by')
         project_id = self.request.query_params.get('project_id', None)
         if project_id:
             queryset = queryset.filter(project_id=project_id)
@@ -81,14 +96,16 @@ class ShareLinkViewSet(viewsets.ModelViewSet):
         return context
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalListMixin, CachedListMixin, CursorPaginationMixin, viewsets.ModelViewSet):
     """ViewSet for managing project comments"""
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated]
+    cursor_pagination_class = CommentCursorPagination
+    cache_resource = 'comments'
 
     def get_queryset(self):
         """Filter comments by project_id"""
-        queryset = Comment.objects.all()
+        queryset = Comment.objects.select_related('user')
         project_id = self.request.query_params.get('project_id', None)
         if project_id:
             queryset = queryset.filter(project_id=project_id)
@@ -112,14 +129,31 @@ class CommentViewSet(viewsets.ModelViewSet):
         return context
 
 
-class ReminderViewSet(viewsets.ModelViewSet):
+class ReminderViewSet(ConditionalListMixin, CursorPaginationMixin, viewsets.ModelViewSet):
     """ViewSet for managing reminders"""
     serializer_class = ReminderSerializer
     permission_classes = [IsAuthenticated]
+    cursor_pagination_class = ReminderCursorPagination
+
+    def get_version_aggregates(self):
+        """Live status moves with the clock, so track the newest reminder past each boundary
+
+        A reminder crossing a boundary becomes the newest one past it, so
+        these change exactly when some live status does.
+        """
+        now = timezone.now()
+        aggregates = super().get_version_aggregates()
+        aggregates['overdue'] = Max('reminder_datetime', filter=Q(reminder_datetime__lt=now))
+        aggregates['due_soon'] = Max(
+            'reminder_datetime', filter=Q(reminder_datetime__lte=now + REMINDER_DUE_SOON_WINDOW)
+        )
+        return aggregates
 
     def get_queryset(self):
-        """Filter reminders by project_id and update statuses"""
-        queryset = Reminder.objects.all()
+        """Filter reminders by project_id, computing live statuses in the query"""
+        queryset = Reminder.objects.select_related('project', 'created_by')
+        if self.action == 'list':
+            queryset = queryset.with_current_status()
         project_id = self.request.query_params.get('project_id', None)
         
         if project_id:
@@ -127,17 +161,6 @@ class ReminderViewSet(viewsets.ModelViewSet):
         else:
             queryset = queryset.filter(created_by=self.request.user)
 
-        # Update statuses for pending reminders
-        now = timezone.now()
-        for reminder in queryset.filter(status__in=['pending', 'due_soon']):
-            if reminder.reminder_datetime < now:
-                reminder.status = 'overdue'
-                reminder.save(update_fields=['status'])
-            elif (reminder.reminder_datetime - now).total_seconds() <= 86400:
-                if reminder.status != 'overdue':
-                    reminder.status = 'due_soon'
-                    reminder.save(update_fields=['status'])
-
         return queryset.order_by('reminder_datetime')
 
     def perform_create(self, serializer):
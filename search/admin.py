@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import SearchDocument
+
+
+@admin.register(SearchDocument)
+class SearchDocumentAdmin(admin.ModelAdmin):
+    list_display = ['model', 'title', 'project', 'updated_at']
+    list_filter = ['model']
+    readonly_fields = ['object_id', 'updated_at']
+    raw_id_fields = ['project']
@@ -0,0 +1,40 @@
+from django.core.exceptions import ValidationError
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .backends import DEFAULT_SEARCH_LIMIT, get_search_backend
+from .models import SearchDocument
+from .serializers import SearchDocumentSerializer
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search(request):
+    """Full-text search over the user's projects
+
+    ?q=words (all must match, prefixes allowed), optional
+    ?type=task,note to restrict the kinds of results, ?project_id= and ?limit=.
+    """
+    query = request.query_params.get('q', '')
+    models = [model for model in request.query_params.get('type', '').split(',') if model]
+    valid_models = {choice for choice, _ in SearchDocument.MODEL_CHOICES}
+    if any(model not in valid_models for model in models):
+        return Response(
+            {'error': f'type must be a comma-separated list of {", ".join(sorted(valid_models))}.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_SEARCH_LIMIT))
+        project_id = request.query_params.get('project_id')
+        results = get_search_backend().search(
+            request.user, query, models=models, project_id=project_id, limit=max(limit, 1)
+        )
+    except (ValueError, ValidationError):
+        return Response({'error': 'Invalid limit or project_id.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'query': query,
+        'results': SearchDocumentSerializer(results, many=True).data,
+    })
@@ -0,0 +1,140 @@
+"""Search backends over SearchDocument
+
+SQLiteFTSBackend and PostgresBackend query the database's own inverted
+index (FTS5 / tsvector with a GIN index); IcontainsBackend is the
+portable fallback for anything else. All of them return documents of
+projects owned by the requesting user only.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q, UUIDField
+from django.utils.module_loading import import_string
+
+from project.models import Project
+from .models import SearchDocument
+
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+MAX_QUERY_TERMS = 16
+
+FTS_TABLE = 'search_searchdocument_fts'
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+_UUID_FIELD = UUIDField()
+
+
+def query_terms(query):
+    """Split user input into plain word terms, dropping any query syntax"""
+    return [term.lower() for term in _TERM_RE.findall(query or '')][:MAX_QUERY_TERMS]
+
+
+class SearchBackend:
+    def search(self, user, query, models=None, project_id=None, limit=DEFAULT_SEARCH_LIMIT):
+        """Best matches first, as a list of SearchDocument
+
+        Every term has to match; the last one also matches as a prefix so
+        results keep up while the user is still typing.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return []
+        return self.match(user, terms, models, project_id, min(limit, MAX_SEARCH_LIMIT))
+
+    def match(self, user, terms, models, project_id, limit):
+        raise NotImplementedError
+
+    def scope(self, user, models, project_id, alias='d'):
+        """WHERE fragments and params that keep results inside the user's projects"""
+        clauses = [f'{alias}.project_id IN (SELECT id FROM {Project._meta.db_table} WHERE created_by_id = %s)']
+        params = [_UUID_FIELD.get_db_prep_value(user.pk, connection)]
+        if models:
+            clauses.append(f'{alias}.model IN ({", ".join(["%s"] * len(models))})')
+            params.extend(models)
+        if project_id:
+            clauses.append(f'{alias}.project_id = %s')
+            params.append(_UUID_FIELD.get_db_prep_value(project_id, connection))
+        return clauses, params
+
+    def fetch(self, ids):
+        """Load documents for ranked ids, keeping the rank order"""
+        documents = SearchDocument.objects.in_bulk(ids)
+        return [documents[pk] for pk in ids if pk in documents]
+
+
+class IcontainsBackend(SearchBackend):
+    """Every term must appear in the title or body; no ranking"""
+
+    def match(self, user, terms, models, project_id, limit):
+        queryset = SearchDocument.objects.filter(project__created_by=user)
+        if models:
+            queryset = queryset.filter(model__in=models)
+        if project_id:
+            queryset = queryset.filter(project_id=project_id)
+        for term in terms:
+            queryset = queryset.filter(Q(title__icontains=term) | Q(body__icontains=term))
+        return list(queryset.order_by('-updated_at')[:limit])
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """FTS5 external-content table kept in sync by triggers, ranked by bm25"""
+
+    def match(self, user, terms, models, project_id, limit):
+        # Quoted terms, the last one as a prefix: "term" AND "oth"*
+        expression = ' '.join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+        clauses, params = self.scope(user, models, project_id)
+        sql = (
+            f'SELECT d.id FROM {FTS_TABLE} f JOIN search_searchdocument d ON d.id = f.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND {" AND ".join(clauses)} '
+            f'ORDER BY bm25({FTS_TABLE}, 2.0, 1.0) LIMIT %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [expression, *params, limit])
+            return self.fetch([row[0] for row in cursor.fetchall()])
+
+
+class PostgresBackend(SearchBackend):
+    """Generated, weighted tsvector column with a GIN index, ranked by ts_rank"""
+
+    config = 'english'
+
+    def match(self, user, terms, models, project_id, limit):
+        expression = ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+        clauses, params = self.scope(user, models, project_id)
+        sql = (
+            f'SELECT d.id FROM search_searchdocument d, to_tsquery(%s, %s) q '
+            f'WHERE d.search_vector @@ q AND {" AND ".join(clauses)} '
+            f'ORDER BY ts_rank(d.search_vector, q) DESC LIMIT %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [self.config, expression, *params, limit])
+            return self.fetch([row[0] for row in cursor.fetchall()])
+
+
+def fts_available():
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+_backend = None
+
+
+def get_search_backend():
+    """Backend named in settings.SEARCH['BACKEND'], or the best one for the database"""
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'SEARCH', {}).get('BACKEND')
+        if path:
+            _backend = import_string(path)()
+        elif connection.vendor == 'postgresql':
+            _backend = PostgresBackend()
+        elif fts_available():
+            _backend = SQLiteFTSBackend()
+        else:
+            _backend = IcontainsBackend()
+    return _backend
@@ -0,0 +1,78 @@
+"""Turning model instances into SearchDocument rows"""
+from django.db import transaction
+
+from .models import SearchDocument
+
+
+INDEX_BATCH_SIZE = 1000
+
+INDEXED_MODELS = {
+    'project.Project': 'project',
+    'todolist.Todolist': 'todolist',
+    'task.Task': 'task',
+    'project.ProjectNote': 'note',
+    'project.Comment': 'comment',
+}
+
+
+def _document(instance):
+    model = INDEXED_MODELS[instance._meta.label]
+    if model == 'project':
+        return SearchDocument(model=model, object_id=instance.pk, project_id=instance.pk,
+                              title=instance.name, body=instance.description or '')
+    if model == 'todolist':
+        return SearchDocument(model=model, object_id=instance.pk, project_id=instance.project_id,
+                              todolist_id=instance.pk, title=instance.name)
+    if model == 'task':
+        return SearchDocument(model=model, object_id=instance.pk, project_id=instance.project_id,
+                              todolist_id=instance.todolist_id, title=instance.name,
+                              body=instance.description or '')
+    if model == 'note':
+        return SearchDocument(model=model, object_id=instance.pk, project_id=instance.project_id,
+                              body=instance.content or '')
+    return SearchDocument(model=model, object_id=instance.pk, project_id=instance.project_id,
+                          body=instance.message)
+
+
+def index_instances(instances):
+    """Insert or refresh the documents of saved instances with one upsert per batch"""
+    documents = [_document(instance) for instance in instances]
+    if documents:
+        SearchDocument.objects.bulk_create(
+            documents,
+            batch_size=INDEX_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['model', 'object_id'],
+            update_fields=['project', 'todolist_id', 'title', 'body', 'updated_at'],
+        )
+
+
+def remove_instances(model_class, object_ids):
+    SearchDocument.objects.filter(model=INDEXED_MODELS[model_class._meta.label], object_id__in=object_ids).delete()
+
+
+def remove_todolists(todolist_ids):
+    """Remove todolists and every task in them with one statement"""
+    SearchDocument.objects.filter(model__in=['todolist', 'task'], todolist_id__in=todolist_ids).delete()
+
+
+def rebuild_index(stdout=None):
+    """Re-index every indexed model from scratch; returns the document count"""
+    from django.apps import apps
+
+    total = 0
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        for label in INDEXED_MODELS:
+            batch = []
+            for instance in apps.get_model(label).objects.order_by().iterator(chunk_size=INDEX_BATCH_SIZE):
+                batch.append(instance)
+                if len(batch) >= INDEX_BATCH_SIZE:
+                    index_instances(batch)
+                    total += len(batch)
+                    batch = []
+            index_instances(batch)
+            total += len(batch)
+            if stdout:
+                stdout.write(f'{label}: {total} document(s) so far')
+    return total
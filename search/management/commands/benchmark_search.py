@@ -0,0 +1,97 @@
+import itertools
+import random
+import statistics
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from project.models import Project
+from search.backends import get_search_backend
+from search.indexing import INDEX_BATCH_SIZE
+from search.models import SearchDocument
+
+
+BENCHMARK_EMAIL = 'search-benchmark@example.invalid'
+
+SYLLABLES = 'ba be co da de fi ga ho ka la li ma mo na ne ni po ra re ri sa so ta te to va ve zo'.split()
+VOCABULARY_SIZE = 20000
+# The most frequent words behave like stopwords; real queries rarely use them
+QUERY_MIN_RANK = 100
+
+
+def _vocabulary(rng):
+    """Pseudo-words with Zipf-distributed frequencies, like natural text"""
+    words = list(dict.fromkeys(
+        ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(VOCABULARY_SIZE * 2)
+    ))[:VOCABULARY_SIZE]
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    return words, weights
+
+
+class Command(BaseCommand):
+    help = 'Measure search latency, optionally after filling a throwaway project with synthetic documents'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--populate', type=int, default=0,
+                            help='Create this many synthetic documents for a benchmark user first')
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--cleanup', action='store_true', help='Delete the benchmark user and exit')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(email=BENCHMARK_EMAIL).delete()
+            self.stdout.write(f'Deleted {deleted} benchmark row(s)')
+            return
+
+        user, _ = User.objects.get_or_create(email=BENCHMARK_EMAIL, defaults={'name': 'Search benchmark'})
+        if options['populate']:
+            self.populate(user, options['populate'])
+
+        if not SearchDocument.objects.filter(project__created_by=user).exists():
+            raise CommandError('No benchmark documents, run with --populate N first')
+
+        backend = get_search_backend()
+        rng = random.Random(0)
+        words, weights = _vocabulary(random.Random(1))
+        words, weights = words[QUERY_MIN_RANK:], weights[QUERY_MIN_RANK:]
+        timings = []
+        for _ in range(options['queries']):
+            query = ' '.join(rng.choices(words, weights=weights, k=rng.choice((1, 2))))
+            started = time.perf_counter()
+            backend.search(user, query)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        timings.sort()
+        total = SearchDocument.objects.count()
+        self.stdout.write(
+            f'{type(backend).__name__}, {total} document(s), {len(timings)} queries: '
+            f'p50 {statistics.median(timings):.1f}ms, '
+            f'p95 {timings[int(len(timings) * 0.95) - 1]:.1f}ms, max {timings[-1]:.1f}ms'
+        )
+
+    def populate(self, user, count):
+        rng = random.Random(2)
+        words, weights = _vocabulary(random.Random(1))
+        cum_weights = list(itertools.accumulate(weights))
+        projects = [Project.objects.create(name=f'Benchmark {index}', created_by=user) for index in range(10)]
+        created = 0
+        while created < count:
+            size = min(INDEX_BATCH_SIZE * 10, count - created)
+            documents = [
+                SearchDocument(
+                    project=projects[index % len(projects)],
+                    model='task',
+                    object_id=uuid.uuid4(),
+                    title=' '.join(rng.choices(words, cum_weights=cum_weights, k=3)),
+                    body=' '.join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(5, 40))),
+                )
+                for index in range(size)
+            ]
+            with transaction.atomic():
+                SearchDocument.objects.bulk_create(documents, batch_size=INDEX_BATCH_SIZE)
+            created += size
+            self.stdout.write(f'Created {created}/{count} document(s)')
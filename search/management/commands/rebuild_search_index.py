@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from search.backends import get_search_backend
+from search.indexing import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild every search document from projects, todolists, tasks, notes and comments'
+
+    def handle(self, *args, **options):
+        total = rebuild_index(stdout=self.stdout)
+        self.stdout.write(f'Indexed {total} document(s) with {type(get_search_backend()).__name__}')
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('project', '0007_remove_sharelink_project_sha_token_3cf1ef_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('project', 'Project'), ('todolist', 'Todolist'), ('task', 'Task'), ('note', 'Note'), ('comment', 'Comment')], max_length=20)),
+                ('object_id', models.UUIDField()),
+                ('todolist_id', models.UUIDField(blank=True, null=True)),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='project.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'model'], name='search_sear_project_f245f6_idx')],
+                'constraints': [models.UniqueConstraint(fields=('model', 'object_id'), name='search_document_unique_object')],
+            },
+        ),
+    ]
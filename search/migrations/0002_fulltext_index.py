@@ -0,0 +1,79 @@
+from django.db import migrations
+
+
+# External-content FTS5 table kept in sync with search_searchdocument by
+# triggers. A later migration that makes Django rebuild the table on SQLite
+# drops the triggers, so it has to recreate them.
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE search_searchdocument_fts USING fts5(
+        title, body,
+        content='search_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER search_searchdocument_fts_insert AFTER INSERT ON search_searchdocument BEGIN
+        INSERT INTO search_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    """CREATE TRIGGER search_searchdocument_fts_delete AFTER DELETE ON search_searchdocument BEGIN
+        INSERT INTO search_searchdocument_fts(search_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    """CREATE TRIGGER search_searchdocument_fts_update AFTER UPDATE ON search_searchdocument BEGIN
+        INSERT INTO search_searchdocument_fts(search_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO search_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    "INSERT INTO search_searchdocument_fts(search_searchdocument_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS search_searchdocument_fts_insert',
+    'DROP TRIGGER IF EXISTS search_searchdocument_fts_delete',
+    'DROP TRIGGER IF EXISTS search_searchdocument_fts_update',
+    'DROP TABLE IF EXISTS search_searchdocument_fts',
+]
+
+# Must match search.backends.PostgresBackend.config
+POSTGRES_FORWARD = [
+    """ALTER TABLE search_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'B')
+    ) STORED""",
+    'CREATE INDEX search_searchdocument_vector_idx ON search_searchdocument USING GIN (search_vector)',
+]
+
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS search_searchdocument_vector_idx',
+    'ALTER TABLE search_searchdocument DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def _sqlite_has_fts5(cursor):
+    cursor.execute('PRAGMA compile_options')
+    return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        connection = schema_editor.connection
+        statements = statements_by_vendor.get(connection.vendor, [])
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite' and not _sqlite_has_fts5(cursor):
+                # search.backends falls back to icontains
+                return
+            for statement in statements:
+                cursor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
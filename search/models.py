@@ -0,0 +1,47 @@
+from django.db import models
+
+from project.models import Project
+
+
+class SearchDocument(models.Model):
+    """One searchable row per project, todolist, task, note or comment
+
+    The text lives here; the inverted index over title and body is kept by
+    the database (an FTS5 table on SQLite, a tsvector column on Postgres,
+    see migration 0002). Documents are scoped through their project.
+    """
+    MODEL_CHOICES = [
+        ('project', 'Project'),
+        ('todolist', 'Todolist'),
+        ('task', 'Task'),
+        ('note', 'Note'),
+        ('comment', 'Comment'),
+    ]
+
+    project = models.ForeignKey(Project, related_name='search_documents', on_delete=models.CASCADE)
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.UUIDField()
+    todolist_id = models.UUIDField(blank=True, null=True)
+    title = models.CharField(max_length=255, blank=True)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'object_id'], name='search_document_unique_object'),
+        ]
+        indexes = [
+            models.Index(fields=['project', 'model']),
+        ]
+
+    def __str__(self):
+        return f'{self.model} {self.object_id}'
+
+    def get_absolute_url(self):
+        if self.model == 'todolist':
+            return f'/projects/{self.project_id}/{self.object_id}/'
+        if self.model == 'task':
+            return f'/projects/{self.project_id}/{self.todolist_id}/{self.object_id}/'
+        if self.model == 'note':
+            return f'/projects/{self.project_id}/notes/{self.object_id}/'
+        return f'/projects/{self.project_id}/'
@@ -0,0 +1,23 @@
+from rest_framework import serializers
+
+from core.profiling import ProfiledSerializerMixin
+
+from .models import SearchDocument
+
+
+SNIPPET_LENGTH = 200
+
+
+class SearchDocumentSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
+    type = serializers.CharField(source='model')
+    id = serializers.UUIDField(source='object_id')
+    snippet = serializers.SerializerMethodField()
+    url = serializers.CharField(source='get_absolute_url')
+
+    class Meta:
+        model = SearchDocument
+        fields = ['type', 'id', 'project', 'todolist_id', 'title', 'snippet', 'url', 'updated_at']
+
+    def get_snippet(self, obj):
+        body = ' '.join(obj.body.split())
+        return body if len(body) <= SNIPPET_LENGTH else body[:SNIPPET_LENGTH].rsplit(' ', 1)[0] + '...'
@@ -0,0 +1,56 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from project.deletion import delete_scope, gather, origin_label, take
+
+from .indexing import index_instances, remove_instances, remove_todolists
+
+
+# Deleting one of these removes the documents of everything it cascades to
+# in one statement: a project's through the foreign key, a todolist's by
+# todolist_id
+CASCADE_PARENTS = ('project.Project', 'todolist.Todolist')
+
+
+@receiver(post_save, sender='project.Project')
+@receiver(post_save, sender='project.ProjectNote')
+@receiver(post_save, sender='project.Comment')
+@receiver(post_save, sender='todolist.Todolist')
+@receiver(post_save, sender='task.Task')
+def index_saved(sender, instance, raw=False, **kwargs):
+    """Refresh the search document in the same transaction as the row"""
+    if not raw:
+        index_instances([instance])
+
+
+def _covered_by_parent(sender, origin):
+    label = origin_label(origin)
+    return label in CASCADE_PARENTS and label != sender._meta.label
+
+
+@receiver(pre_delete, sender='project.ProjectNote')
+@receiver(pre_delete, sender='project.Comment')
+@receiver(pre_delete, sender='todolist.Todolist')
+@receiver(pre_delete, sender='task.Task')
+def gather_deleted(sender, instance, origin=None, **kwargs):
+    if not _covered_by_parent(sender, origin):
+        gather(delete_scope(sender, instance, origin), '_search_removals', instance.pk)
+
+
+@receiver(post_delete, sender='project.ProjectNote')
+@receiver(post_delete, sender='project.Comment')
+@receiver(post_delete, sender='todolist.Todolist')
+@receiver(post_delete, sender='task.Task')
+def remove_deleted(sender, instance, origin=None, **kwargs):
+    """Drop the documents of the deleted rows, once per delete() call
+
+    A parent's deletion covers its children's documents. Project
+    documents go with the project through the foreign key.
+    """
+    pks = take(delete_scope(sender, instance, origin), '_search_removals')
+    if not pks:
+        return
+    if sender._meta.label == 'todolist.Todolist':
+        remove_todolists(pks)
+    else:
+        remove_instances(sender, pks)
@@ -0,0 +1,160 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from account.models import User
+from project.models import Comment, Project, ProjectNote
+from task.models import Task
+from todolist.models import Todolist
+
+from .backends import IcontainsBackend, SQLiteFTSBackend, fts_available
+from .models import SearchDocument
+
+
+class SearchData:
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.other = User.objects.create_user('Other', 'other@example.com', 'pw')
+        cls.project = Project.objects.create(
+            name='Garden plans', description='Plant tomatoes in spring', created_by=cls.owner
+        )
+        cls.todolist = Todolist.objects.create(project=cls.project, name='Seeds', created_by=cls.owner)
+        cls.task = Task.objects.create(
+            project=cls.project, todolist=cls.todolist, name='Order heirloom tomatoes', created_by=cls.owner
+        )
+        cls.note = ProjectNote.objects.create(project=cls.project, content='Compost schedule')
+        cls.comment = Comment.objects.create(project=cls.project, user=cls.owner, message='Water twice a week')
+
+        cls.other_project = Project.objects.create(name='Tomato farm', created_by=cls.other)
+        other_list = Todolist.objects.create(project=cls.other_project, name='Harvest', created_by=cls.other)
+        cls.other_task = Task.objects.create(
+            project=cls.other_project, todolist=other_list, name='Pick heirloom tomatoes', created_by=cls.other
+        )
+
+    def search(self, user, query, **kwargs):
+        return {(document.model, document.object_id) for document in self.backend.search(user, query, **kwargs)}
+
+
+class IcontainsBackendTests(SearchData, TestCase):
+    backend = IcontainsBackend()
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.search(self.owner, 'heirloom tomatoes'), {('task', self.task.pk)})
+        self.assertEqual(self.search(self.owner, 'heirloom compost'), set())
+
+    def test_last_term_matches_as_prefix(self):
+        self.assertEqual(self.search(self.owner, 'heirl'), {('task', self.task.pk)})
+        self.assertEqual(
+            self.search(self.owner, 'tomat'), {('project', self.project.pk), ('task', self.task.pk)}
+        )
+
+    def test_results_stay_in_the_users_projects(self):
+        self.assertEqual(self.search(self.other, 'heirloom'), {('task', self.other_task.pk)})
+        self.assertEqual(self.search(self.other, 'compost'), set())
+        self.assertEqual(self.search(self.other, 'tomatoes', project_id=self.project.pk), set())
+
+    def test_filters(self):
+        self.assertEqual(self.search(self.owner, 'tomatoes', models=['task']), {('task', self.task.pk)})
+        self.assertEqual(self.search(self.owner, 'twice', project_id=self.project.pk),
+                         {('comment', self.comment.pk)})
+
+    def test_query_syntax_is_treated_as_words(self):
+        self.assertEqual(self.search(self.owner, '"heirloom*'), {('task', self.task.pk)})
+        self.assertEqual(self.search(self.owner, 'order -heirloom^'), {('task', self.task.pk)})
+        self.assertEqual(self.search(self.owner, '" *'), set())
+
+
+class SQLiteFTSBackendTests(IcontainsBackendTests):
+    backend = SQLiteFTSBackend()
+
+    def setUp(self):
+        if not fts_available():
+            self.skipTest('SQLite without FTS5')
+
+    def test_edits_reach_the_fts_index(self):
+        self.task.name = 'Order runner beans'
+        self.task.save()
+        self.assertEqual(self.search(self.owner, 'heirloom'), set())
+        self.assertEqual(self.search(self.owner, 'runner'), {('task', self.task.pk)})
+
+        self.note.delete()
+        self.assertEqual(self.search(self.owner, 'compost'), set())
+
+
+class IndexingTests(SearchData, TestCase):
+    def documents(self, project):
+        return set(SearchDocument.objects.filter(project=project).values_list('model', 'object_id'))
+
+    def test_saving_indexes_and_deleting_removes(self):
+        self.assertEqual(self.documents(self.project), {
+            ('project', self.project.pk), ('todolist', self.todolist.pk), ('task', self.task.pk),
+            ('note', self.note.pk), ('comment', self.comment.pk),
+        })
+        self.task.name = 'Order runner beans'
+        self.task.save()
+        self.assertEqual(SearchDocument.objects.get(model='task', object_id=self.task.pk).title, 'Order runner beans')
+
+        self.note.delete()
+        self.comment.delete()
+        self.task.delete()
+        self.assertEqual(self.documents(self.project), {('project', self.project.pk), ('todolist', self.todolist.pk)})
+
+    def search_statements(self, delete):
+        with CaptureQueriesContext(connection) as captured:
+            delete()
+        return [query['sql'] for query in captured if 'search_searchdocument' in query['sql']]
+
+    def test_todolist_delete_removes_its_tasks_in_one_statement(self):
+        for n in range(20):
+            Task.objects.create(project=self.project, todolist=self.todolist, name=f'Task {n}', created_by=self.owner)
+        self.assertEqual(len(self.search_statements(self.todolist.delete)), 1)
+        self.assertEqual(self.documents(self.project), {
+            ('project', self.project.pk), ('note', self.note.pk), ('comment', self.comment.pk),
+        })
+
+    def test_queryset_delete_removes_in_one_statement(self):
+        second = Todolist.objects.create(project=self.project, name='Beds', created_by=self.owner)
+        for n in range(10):
+            Task.objects.create(project=self.project, todolist=second, name=f'Task {n}', created_by=self.owner)
+        statements = self.search_statements(Todolist.objects.filter(project=self.project).delete)
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(self.documents(self.project), {
+            ('project', self.project.pk), ('note', self.note.pk), ('comment', self.comment.pk),
+        })
+
+    def test_task_queryset_delete_removes_in_one_statement(self):
+        for n in range(10):
+            Task.objects.create(project=self.project, todolist=self.todolist, name=f'Task {n}', created_by=self.owner)
+        self.assertEqual(len(self.search_statements(Task.objects.filter(project=self.project).delete)), 1)
+        self.assertEqual(self.documents(self.project), {
+            ('project', self.project.pk), ('todolist', self.todolist.pk), ('note', self.note.pk),
+            ('comment', self.comment.pk),
+        })
+
+    def test_project_delete_removes_its_documents_through_the_foreign_key(self):
+        self.assertEqual(len(self.search_statements(self.project.delete)), 1)
+        self.assertFalse(SearchDocument.objects.filter(project_id=self.project.pk).exists())
+        self.assertEqual(self.documents(self.other_project), {
+            ('project', self.other_project.pk), ('todolist', self.other_task.todolist_id),
+            ('task', self.other_task.pk),
+        })
+
+
+class SearchApiTests(SearchData, TestCase):
+    url = '/project-features/api/search/'
+
+    def test_results_are_scoped_to_the_requesting_user(self):
+        self.client.force_login(self.other)
+        results = self.client.get(self.url, {'q': 'heirloom'}).json()['results']
+        self.assertEqual([result['id'] for result in results], [str(self.other_task.pk)])
+        self.assertEqual(self.client.get(self.url, {'q': 'compost'}).json()['results'], [])
+
+    def test_bad_parameters(self):
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(self.url, {'q': 'x', 'type': 'user'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': 'x', 'project_id': 'nope'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': 'x', 'limit': 'many'}).status_code, 400)
+
+    def test_anonymous_is_refused(self):
+        self.assertIn(self.client.get(self.url, {'q': 'tomatoes'}).status_code, (401, 403))
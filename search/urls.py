@@ -0,0 +1,8 @@
+from django.urls import path
+
+from . import api_views
+
+
+urlpatterns = [
+    path('', api_views.search, name='api-search'),
+]
@@ -0,0 +1,102 @@
+from django.db import transaction
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from project.bulk import (
+    BULK_BATCH_SIZE, bulk_update_rows, error_response, get_item_list, get_owned_project, parse_ids, validate_items
+)
+from project.cache import get_project_cache
+from search.indexing import index_instances
+from .counters import recount_task_counters
+from .models import Task
+from .serializers import TaskBulkSerializer
+
+
+def _todolist_errors(validated, todolist_ids):
+    return [
+        {'index': index, 'errors': {'todolist': ['Todolist not found in this project.']}}
+        for index, data in enumerate(validated)
+        if 'todolist' in data and data['todolist'] not in todolist_ids
+    ]
+
+
+@api_view(['POST', 'PATCH', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def bulk_tasks(request, project_id):
+    """Create (POST), update (PATCH) or delete (DELETE) many tasks at once
+
+    The whole batch is validated first (todolists are checked with one
+    query) and written in one transaction; if any item is invalid nothing
+    is written and the errors are reported per item index.
+    """
+    project = get_owned_project(request, project_id)
+    items = get_item_list(request)
+
+    if request.method == 'DELETE':
+        ids, errors = parse_ids(items)
+        if errors:
+            return error_response(errors)
+        # Receivers adjust the counters, search index and cache once for the batch
+        _, deleted = Task.objects.filter(project=project, pk__in=ids).delete()
+        return Response({'deleted': deleted.get('task.Task', 0)})
+
+    validated, errors = validate_items(TaskBulkSerializer, items, partial=request.method == 'PATCH')
+    if errors:
+        return error_response(errors)
+
+    todolist_ids = set(project.todolists.values_list('id', flat=True))
+    errors = _todolist_errors(validated, todolist_ids)
+
+    if request.method == 'POST':
+        if errors:
+            return error_response(errors)
+
+        tasks = [
+            Task(
+                project=project,
+                todolist_id=data['todolist'],
+                name=data['name'],
+                description=data.get('description', ''),
+                is_done=data.get('is_done', False),
+                created_by=request.user,
+            )
+            for data in validated
+        ]
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks, batch_size=BULK_BATCH_SIZE)
+            index_instances(tasks)
+            recount_task_counters([project.pk])
+            transaction.on_commit(lambda: get_project_cache().bump(project.pk))
+        return Response({'ids': [task.pk for task in tasks]}, status=status.HTTP_201_CREATED)
+
+    existing = Task.objects.filter(project=project).in_bulk([data.get('id') for data in validated])
+    errors += [
+        {'index': index, 'errors': {'id': ['Task not found in this project.']}}
+        for index, data in enumerate(validated)
+        if data.get('id') not in existing
+    ]
+    if errors:
+        return error_response(sorted(errors, key=lambda error: error['index']))
+
+    fields = set()
+    for data in validated:
+        task = existing[data['id']]
+        for field in ('name', 'description', 'is_done'):
+            if field in data:
+                setattr(task, field, data[field])
+                fields.add(field)
+        if 'todolist' in data:
+            task.todolist_id = data['todolist']
+            fields.add('todolist')
+
+    if fields:
+        with transaction.atomic():
+            bulk_update_rows(Task, existing.values(), fields)
+            if fields & {'name', 'description', 'todolist'}:
+                index_instances(existing.values())
+            if fields & {'is_done', 'todolist'}:
+                recount_task_counters([project.pk])
+            transaction.on_commit(lambda: get_project_cache().bump(project.pk))
+    return Response({'updated': len(existing)})
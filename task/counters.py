@@ -0,0 +1,91 @@
+"""Keeping task_count / done_task_count on Todolist and Project in step with tasks"""
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from project.models import Project
+from todolist.models import Todolist
+
+
+def apply_task_delta(todolist_id, project_id, total, done):
+    """Add to the counters of one todolist and its project with F() updates"""
+    if not total and not done:
+        return
+    changes = {
+        'task_count': F('task_count') + total,
+        'done_task_count': F('done_task_count') + done,
+    }
+    Todolist.objects.filter(pk=todolist_id).update(**changes)
+    Project.objects.filter(pk=project_id).update(**changes)
+
+
+def subtract_deleted_tasks(project_id, per_todolist, update_todolists=True):
+    """Take deleted tasks off the counters in one UPDATE per todolist plus one for the project
+
+    per_todolist holds {'todolist', 'total', 'done'} rows. Pass
+    update_todolists=False when the todolists are being deleted too; the
+    rows then need no 'todolist'.
+    """
+    total = done = 0
+    for row in per_todolist:
+        if update_todolists:
+            Todolist.objects.filter(pk=row['todolist']).update(
+                task_count=F('task_count') - row['total'], done_task_count=F('done_task_count') - row['done'],
+            )
+        total += row['total']
+        done += row['done']
+    if total:
+        Project.objects.filter(pk=project_id).update(
+            task_count=F('task_count') - total, done_task_count=F('done_task_count') - done,
+        )
+
+
+def subtract_task_states(states):
+    """Take deleted tasks, given as (todolist_id, project_id, is_done) rows, off the counters"""
+    per_project = {}
+    for todolist_id, project_id, is_done in states:
+        row = per_project.setdefault(project_id, {}).setdefault(
+            todolist_id, {'todolist': todolist_id, 'total': 0, 'done': 0}
+        )
+        row['total'] += 1
+        row['done'] += int(is_done)
+    for project_id, per_todolist in per_project.items():
+        subtract_deleted_tasks(project_id, per_todolist.values())
+
+
+def _count(related_field, done=False):
+    from .models import Task
+
+    tasks = Task.objects.filter(**{related_field: OuterRef('pk')})
+    if done:
+        tasks = tasks.filter(is_done=True)
+    count = tasks.order_by().values(related_field).annotate(count=Count('*')).values('count')
+    return Coalesce(Subquery(count, output_field=IntegerField()), Value(0))
+
+
+def recount_task_counters(project_ids=None):
+    """Recompute counters from the tasks table, for some projects or all of them
+
+    Returns (todolists, projects) updated.
+    """
+    todolists = Todolist.objects.all()
+    projects = Project.objects.all()
+    if project_ids is not None:
+        todolists = todolists.filter(project_id__in=project_ids)
+        projects = projects.filter(pk__in=project_ids)
+
+    return (
+        todolists.update(task_count=_count('todolist'), done_task_count=_count('todolist', done=True)),
+        projects.update(task_count=_count('project'), done_task_count=_count('project', done=True)),
+    )
+
+
+def find_drifted_counters():
+    """Todolists and projects whose stored counters disagree with the tasks table"""
+    todolists = Todolist.objects.annotate(
+        real_task_count=Count('tasks'), real_done_task_count=Count('tasks', filter=Q(tasks__is_done=True)),
+    )
+    projects = Project.objects.annotate(
+        real_task_count=Count('tasks'), real_done_task_count=Count('tasks', filter=Q(tasks__is_done=True)),
+    )
+    drifted = ~Q(task_count=F('real_task_count')) | ~Q(done_task_count=F('real_done_task_count'))
+    return todolists.filter(drifted).count(), projects.filter(drifted).count()
@@ -0,0 +1,130 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+
+from project.models import Project
+from task.models import Task
+from todolist.models import Todolist
+
+
+def hot_path_workload():
+    """(label, sql, params) for the queries the project/todolist/task pages run
+
+    Sample ids are taken from the data in the database.
+    """
+    task = Task.objects.select_related('project', 'todolist').order_by().first()
+    if task is None:
+        raise CommandError('No tasks to build the built-in workload from; pass --workload instead')
+    project, todolist = task.project, task.todolist
+    todolist_ids = list(Todolist.objects.filter(project=project).values_list('pk', flat=True)[:50])
+
+    querysets = [
+        ('projects list', Project.objects.filter(created_by_id=project.created_by_id)),
+        ('project detail', Project.objects.filter(created_by_id=project.created_by_id).filter(pk=project.pk)),
+        ('project todolists', Todolist.objects.filter(project=project)),
+        ('todolist tasks', Task.objects.filter(todolist=todolist)),
+        ('open tasks', Task.objects.filter(todolist=todolist, is_done=False)),
+        ('task detail', Task.objects.filter(project=project).filter(todolist=todolist).filter(pk=task.pk)),
+        ('done count per todolist', Task.objects.filter(todolist=todolist, is_done=True)
+            .values('todolist').annotate(count=Count('*'))),
+        ('done count per project', Task.objects.filter(project=project, is_done=True)
+            .values('project').annotate(count=Count('*'))),
+        ('shared snapshot tasks', Task.objects.filter(todolist__in=todolist_ids)),
+    ]
+    workload = []
+    for label, queryset in querysets:
+        sql, params = queryset.query.sql_with_params()
+        workload.append((label, sql, params))
+    return workload
+
+
+def read_workload(path):
+    """JSONL of {"sql": ..., "params": [...]} (optionally "label"), or ;-separated SQL"""
+    with open(path) as f:
+        text = f.read()
+    if path.endswith('.jsonl'):
+        workload = []
+        for number, line in enumerate(text.splitlines(), start=1):
+            if line.strip():
+                entry = json.loads(line)
+                workload.append((entry.get('label', f'line {number}'), entry['sql'], entry.get('params', [])))
+        return workload
+    statements = [statement.strip() for statement in text.split(';') if statement.strip()]
+    return [(f'statement {number}', sql, []) for number, sql in enumerate(statements, start=1)]
+
+
+def explain(cursor, sql, params):
+    """Return (plan lines, tables read with a full scan)"""
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        lines = [row[-1] for row in cursor.fetchall()]
+        # "SCAN t" reads the whole table; "SCAN t USING [COVERING] INDEX" walks an index instead
+        scans = [line.split()[1] for line in lines if line.startswith('SCAN ') and ' USING ' not in line]
+        return lines, scans
+    if vendor == 'postgresql':
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        lines, scans = [], []
+
+        def walk(node, depth=0):
+            relation = node.get('Relation Name', '')
+            lines.append(f'{"  " * depth}{node["Node Type"]} {relation}'.rstrip())
+            if node['Node Type'] == 'Seq Scan':
+                scans.append(relation)
+            for child in node.get('Plans', []):
+                walk(child, depth + 1)
+
+        walk(plan[0]['Plan'])
+        return lines, scans
+    if vendor == 'mysql':
+        cursor.execute(f'EXPLAIN {sql}', params)
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        lines = [f'{row["table"]}: type={row["type"]} key={row["key"]}' for row in rows]
+        return lines, [row['table'] for row in rows if row['type'] == 'ALL']
+    raise CommandError(f'EXPLAIN is not supported for {vendor}')
+
+
+def time_query(cursor, sql, params, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN a query workload (by default the task/todolist hot paths) and flag full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workload', help='Captured queries: .jsonl of {"sql", "params"} or a ;-separated .sql file')
+        parser.add_argument('--benchmark', type=int, default=0, metavar='N',
+                            help='Also run every query N times and report the median time')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the full plan of every query')
+
+    def handle(self, *args, **options):
+        workload = read_workload(options['workload']) if options['workload'] else hot_path_workload()
+
+        flagged = 0
+        with connection.cursor() as cursor:
+            for label, sql, params in workload:
+                lines, scans = explain(cursor, sql, params)
+                status = f'SEQ SCAN on {", ".join(scans)}' if scans else 'ok'
+                if options['benchmark']:
+                    status += f' ({time_query(cursor, sql, params, options["benchmark"]):.2f}ms median)'
+                self.stdout.write(f'{label}: {status}')
+                if scans:
+                    flagged += 1
+                if scans or options['verbose_plans']:
+                    for line in lines:
+                        self.stdout.write(f'    {line}')
+
+        self.stdout.write(f'{flagged} of {len(workload)} queries read a whole table')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from task.counters import find_drifted_counters, recount_task_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute the task counters on every todolist and project from the tasks table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report how many counters have drifted')
+
+    def handle(self, *args, **options):
+        todolists, projects = find_drifted_counters()
+        self.stdout.write(f'{todolists} todolist(s) and {projects} project(s) with drifted counters')
+        if options['check']:
+            return
+
+        todolists, projects = recount_task_counters()
+        self.stdout.write(f'Recounted {todolists} todolist(s) and {projects} project(s)')
@@ -0,0 +1,30 @@
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_task_counters(apps, schema_editor):
+    Task = apps.get_model('task', 'Task')
+    Todolist = apps.get_model('todolist', 'Todolist')
+    Project = apps.get_model('project', 'Project')
+
+    def count(related_field, **filters):
+        tasks = Task.objects.filter(**{related_field: OuterRef('pk')}, **filters)
+        tasks = tasks.order_by().values(related_field).annotate(count=Count('pk')).values('count')
+        return Coalesce(Subquery(tasks, output_field=IntegerField()), Value(0))
+
+    Todolist.objects.update(task_count=count('todolist'), done_task_count=count('todolist', is_done=True))
+    Project.objects.update(task_count=count('project'), done_task_count=count('project', is_done=True))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0001_initial'),
+        ('todolist', '0002_todolist_done_task_count_todolist_task_count'),
+        ('project', '0008_project_done_task_count_project_task_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_task_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0008_project_done_task_count_project_task_count'),
+        ('task', '0002_populate_task_counters'),
+        ('todolist', '0002_todolist_done_task_count_todolist_task_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='task',
+            name='project',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='project.project'),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='todolist',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='todolist.todolist'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['todolist', 'is_done'], name='task_task_todolis_1e7384_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'is_done'], name='task_task_project_6415d0_idx'),
+        ),
+    ]
@@ -1,20 +1,40 @@
 import uuid
 
-from django.db import models
+from django.db import models, transaction
 
 from account.models import User
 from project.models import Project
 from todolist.models import Todolist
 
 
+COUNTED_FIELDS = ('todolist_id', 'project_id', 'is_done')
+
+
 class Task(models.Model):    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    project = models.ForeignKey(Project, related_name='tasks', on_delete=models.CASCADE)
-    todolist = models.ForeignKey(Todolist, related_name='tasks', on_delete=models.CASCADE)
+    # Indexed through the composite indexes in Meta, which lead with these columns
+    project = models.ForeignKey(Project, related_name='tasks', on_delete=models.CASCADE, db_index=False)
+    todolist = models.ForeignKey(Todolist, related_name='tasks', on_delete=models.CASCADE, db_index=False)
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     is_done = models.BooleanField(default=False)
     created_by = models.ForeignKey(User, related_name='tasks', on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            # Task lists per todolist, and done counts when counters are recomputed
+            models.Index(fields=['todolist', 'is_done']),
+            models.Index(fields=['project', 'is_done']),
+        ]
+
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    def counted_state(self):
+        """What the todolist/project counters know about this task"""
+        return tuple(getattr(self, field) for field in COUNTED_FIELDS)
+
+    def save(self, *args, **kwargs):
+        # The counter update in task.signals commits or rolls back with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
\ No newline at end of file
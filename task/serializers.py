@@ -0,0 +1,16 @@
+from rest_framework import serializers
+
+from core.profiling import ProfiledSerializerMixin
+
+
+class TaskBulkSerializer(ProfiledSerializerMixin, serializers.Serializer):
+    """One item of a bulk task create/update request
+
+    The todolist is a plain UUID; bulk views check all of them against the
+    project's todolists with a single query instead of one per item.
+    """
+    id = serializers.UUIDField(required=False)
+    todolist = serializers.UUIDField()
+    name = serializers.CharField(max_length=255)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    is_done = serializers.BooleanField(required=False)
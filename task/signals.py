@@ -0,0 +1,108 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from project.deletion import delete_scope, origin_label, take
+from todolist.models import Todolist
+
+from .counters import apply_task_delta, subtract_deleted_tasks, subtract_task_states
+from .models import COUNTED_FIELDS, Task
+
+
+def _locked_counted_state(task):
+    """Stored counted fields of a task, its row locked until the save or delete commits
+
+    Two requests that load the same undone task and mark it done must not
+    both add to done_task_count: the second one waits here and reads the
+    first one's change, so its own delta is zero.
+    """
+    return Task._base_manager.select_for_update().filter(pk=task.pk).values_list(*COUNTED_FIELDS).first()
+
+
+@receiver(pre_save, sender=Task)
+def lock_saved_task(sender, instance, raw=False, **kwargs):
+    """Read the stored state the save moves the counters away from"""
+    if raw or instance._state.adding:
+        return
+    # Deferred fields are not saved; with all of them deferred nothing counted changes
+    if set(COUNTED_FIELDS) <= instance.get_deferred_fields():
+        return
+    instance._counted_state = _locked_counted_state(instance)
+
+
+@receiver(post_save, sender=Task)
+def count_saved_task(sender, instance, created, raw=False, **kwargs):
+    """Move the task's contribution to the counters from its old state to its new one"""
+    old = instance.__dict__.pop('_counted_state', None)
+    if raw:
+        return
+    if created:
+        todolist_id, project_id, is_done = instance.counted_state()
+        apply_task_delta(todolist_id, project_id, 1, int(is_done))
+        return
+    if old is None:
+        # Unknown previous state: nothing to move
+        return
+
+    deferred = instance.get_deferred_fields()
+    new = tuple(
+        previous if field in deferred else getattr(instance, field)
+        for field, previous in zip(COUNTED_FIELDS, old)
+    )
+    todolist_id, project_id, is_done = new
+    if old != new:
+        old_todolist_id, old_project_id, old_is_done = old
+        if (old_todolist_id, old_project_id) == (todolist_id, project_id):
+            apply_task_delta(todolist_id, project_id, 0, int(is_done) - int(old_is_done))
+        else:
+            apply_task_delta(old_todolist_id, old_project_id, -1, -int(old_is_done))
+            apply_task_delta(todolist_id, project_id, 1, int(is_done))
+
+
+@receiver(pre_delete, sender=Task)
+def lock_deleted_task(sender, instance, origin=None, **kwargs):
+    # Tasks deleted with their todolist are counted off per todolist, and a
+    # deleted project takes its counters with it
+    if origin_label(origin) in ('todolist.Todolist', 'project.Project'):
+        return
+    scope = delete_scope(sender, instance, origin)
+    if '_deleted_task_states' in scope.__dict__:
+        return
+    # After the delete the rows can no longer be read. A task another
+    # request deleted first is missing here and not counted off twice.
+    rows = scope if isinstance(scope, QuerySet) else Task._base_manager.filter(pk=instance.pk)
+    scope._deleted_task_states = list(rows.order_by().select_for_update().values_list(*COUNTED_FIELDS))
+
+
+@receiver(post_delete, sender=Task)
+def count_deleted_tasks(sender, instance, origin=None, **kwargs):
+    states = take(delete_scope(sender, instance, origin), '_deleted_task_states')
+    if states:
+        subtract_task_states(states)
+
+
+@receiver(pre_delete, sender=Todolist)
+def lock_deleted_todolist(sender, instance, origin=None, **kwargs):
+    # Only todolists deleted on their own leave a project to adjust
+    if origin_label(origin) != 'todolist.Todolist':
+        return
+    scope = delete_scope(sender, instance, origin)
+    if '_deleted_todolist_counts' in scope.__dict__:
+        return
+    rows = scope if isinstance(scope, QuerySet) else Todolist._base_manager.filter(pk=instance.pk)
+    scope._deleted_todolist_counts = list(
+        rows.order_by().select_for_update().values('project_id', 'task_count', 'done_task_count')
+    )
+
+
+@receiver(post_delete, sender=Todolist)
+def count_deleted_todolists(sender, instance, origin=None, **kwargs):
+    rows = take(delete_scope(sender, instance, origin), '_deleted_todolist_counts')
+    per_project = {}
+    for row in rows or ():
+        per_project.setdefault(row['project_id'], []).append(
+            {'total': row['task_count'], 'done': row['done_task_count']}
+        )
+    for project_id, per_todolist in per_project.items():
+        # The lists' own counters go with them; only the project's change
+        subtract_deleted_tasks(project_id, per_todolist, update_todolists=False)
@@ -1,3 +1,313 @@
+from datetime import timedelta
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from account.models import User
+from project.bulk import bulk_update_rows
+from project.models import Project
+from search.models import SearchDocument
+from todolist.models import Todolist
+
+from .counters import find_drifted_counters
+from .models import Task
+
+
+class TaskCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Project', created_by=cls.user)
+        cls.todolist = Todolist.objects.create(project=cls.project, name='List', created_by=cls.user)
+        cls.other_todolist = Todolist.objects.create(project=cls.project, name='Other', created_by=cls.user)
+
+    def create_task(self, **kwargs):
+        return Task.objects.create(
+            project=self.project, todolist=self.todolist, name='Task', created_by=self.user, **kwargs
+        )
+
+    def assertCounters(self, todolist, task_count, done_task_count):
+        todolist.refresh_from_db()
+        self.assertEqual((todolist.task_count, todolist.done_task_count), (task_count, done_task_count))
+        self.assertEqual(find_drifted_counters(), (0, 0))
+
+    def test_create_toggle_move_delete(self):
+        task = self.create_task()
+        self.create_task(is_done=True)
+        self.assertCounters(self.todolist, 2, 1)
+
+        task.is_done = True
+        task.save()
+        self.assertCounters(self.todolist, 2, 2)
+
+        task.todolist = self.other_todolist
+        task.save()
+        self.assertCounters(self.todolist, 1, 1)
+        self.assertCounters(self.other_todolist, 1, 1)
+
+        task.delete()
+        self.assertCounters(self.other_todolist, 0, 0)
+
+    def test_deferred_fields(self):
+        self.create_task()
+        self.create_task(is_done=True)
+
+        tasks = list(Task.objects.only('name'))
+        self.assertEqual(sorted(task.is_done for task in tasks), [False, True])
+
+        # Saving without the counted fields loaded leaves the counters alone
+        task = Task.objects.only('name').filter(is_done=False).get()
+        task.name = 'Renamed'
+        task.save()
+        self.assertCounters(self.todolist, 2, 1)
+
+        task = Task.objects.only('name').filter(is_done=False).get()
+        task.is_done = True
+        task.save()
+        self.assertCounters(self.todolist, 2, 2)
+
+        Task.objects.only('name').get(pk=task.pk).delete()
+        self.assertCounters(self.todolist, 1, 1)
+
+
+    def test_stale_copies_move_the_counters_once(self):
+        task = self.create_task()
+        first, second = Task.objects.get(pk=task.pk), Task.objects.get(pk=task.pk)
+        first.is_done = second.is_done = True
+        first.save()
+        second.save()
+        self.assertCounters(self.todolist, 1, 1)
+
+        first, second = Task.objects.get(pk=task.pk), Task.objects.get(pk=task.pk)
+        first.delete()
+        second.delete()
+        self.assertCounters(self.todolist, 0, 0)
+
+    def counter_updates(self, delete):
+        with CaptureQueriesContext(connection) as captured:
+            delete()
+        return [
+            query['sql'] for query in captured
+            if query['sql'].startswith('UPDATE') and 'task_count' in query['sql']
+        ]
+
+    def test_todolist_delete_adjusts_the_project_once(self):
+        for n in range(10):
+            self.create_task(is_done=n % 2 == 0)
+        Task.objects.create(project=self.project, todolist=self.other_todolist, name='Kept', created_by=self.user)
+
+        self.assertEqual(len(self.counter_updates(self.todolist.delete)), 1)
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.task_count, self.project.done_task_count), (1, 0))
+        self.assertEqual(find_drifted_counters(), (0, 0))
+
+    def test_queryset_delete_adjusts_the_project_once(self):
+        for todolist in (self.todolist, self.other_todolist):
+            for _ in range(5):
+                Task.objects.create(project=self.project, todolist=todolist, name='Task', created_by=self.user)
+
+        updates = self.counter_updates(Todolist.objects.filter(project=self.project).delete)
+        self.assertEqual(len(updates), 1)
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.task_count, self.project.done_task_count), (0, 0))
+        self.assertEqual(self.counter_updates(self.project.delete), [])
+
+
+class PageQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Project', created_by=cls.user)
+        cls.todolist = Todolist.objects.create(project=cls.project, name='List', created_by=cls.user)
+        cls.task = Task.objects.create(project=cls.project, todolist=cls.todolist, name='Task', created_by=cls.user)
+        cls.url = f'/projects/{cls.project.pk}/{cls.todolist.pk}/{cls.task.pk}/'
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_detail_and_edit_pages(self):
+        # Session, user and the scoped task with its project and todolist
+        for url in (self.url, self.url + 'edit/', f'/projects/{self.project.pk}/{self.todolist.pk}/add/'):
+            with self.assertNumQueries(3):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class ScopingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.other = User.objects.create_user('Other', 'other@example.com', 'pw')
+        cls.project = Project.objects.create(name='Private', created_by=cls.owner)
+        cls.todolist = Todolist.objects.create(project=cls.project, name='List', created_by=cls.owner)
+        cls.task = Task.objects.create(project=cls.project, todolist=cls.todolist, name='Task', created_by=cls.owner)
+
+    def task_urls(self, project_id, todolist_id):
+        base = f'/projects/{project_id}/{todolist_id}/'
+        return [f'{base}{self.task.pk}/', f'{base}{self.task.pk}/edit/', f'{base}{self.task.pk}/delete/',
+                f'{base}{self.task.pk}/?is_done=yes', f'{base}add/']
+
+    def test_other_users_task_is_404(self):
+        self.client.force_login(self.other)
+        for url in self.task_urls(self.project.pk, self.todolist.pk):
+            # Session, user and the one scoped lookup
+            with self.subTest(url=url), self.assertNumQueries(3):
+                self.assertEqual(self.client.get(url).status_code, 404)
+        self.task.refresh_from_db()
+        self.assertFalse(self.task.is_done)
+
+    def test_task_under_another_todolist_is_404(self):
+        self.client.force_login(self.owner)
+        other_todolist = Todolist.objects.create(project=self.project, name='Other', created_by=self.owner)
+        other_project = Project.objects.create(name='Second', created_by=self.owner)
+        for project_id, todolist_id in ((self.project.pk, other_todolist.pk), (other_project.pk, self.todolist.pk)):
+            for url in self.task_urls(project_id, todolist_id)[:4]:
+                with self.subTest(url=url):
+                    self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertTrue(Task.objects.filter(pk=self.task.pk, is_done=False).exists())
+
+
+class BulkDeleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Project', created_by=cls.user)
+        cls.todolists = [
+            Todolist.objects.create(project=cls.project, name=f'List {n}', created_by=cls.user) for n in range(3)
+        ]
+        cls.url = reverse('api-bulk-tasks', args=[cls.project.pk])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.client.post(self.url, [
+            {'todolist': str(self.todolists[n % 3].pk), 'name': f'Task {n}', 'is_done': n % 2 == 0}
+            for n in range(300)
+        ], content_type='application/json')
+
+    def delete(self, ids):
+        return self.client.delete(self.url, [str(pk) for pk in ids], content_type='application/json')
+
+    def test_query_count_does_not_grow_with_tasks(self):
+        ids = list(Task.objects.filter(todolist__in=self.todolists[:2]).values_list('pk', flat=True))
+        # Session, user and project; the tasks and their locked counted
+        # fields; the delete in batches of 100; two todolists and the
+        # project; the search documents
+        with self.assertNumQueries(11), self.captureOnCommitCallbacks() as callbacks:
+            response = self.delete(ids)
+        self.assertEqual(response.json(), {'deleted': 200})
+        # One cache bump for the project, not one per task
+        self.assertEqual(len(callbacks), 1)
+
+        self.assertEqual(find_drifted_counters(), (0, 0))
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.task_count, self.project.done_task_count), (100, 50))
+        self.assertFalse(SearchDocument.objects.filter(model='task', object_id__in=ids).exists())
+
+    def test_other_projects_tasks_are_ignored(self):
+        other = Project.objects.create(name='Other', created_by=self.user)
+        todolist = Todolist.objects.create(project=other, name='List', created_by=self.user)
+        task = Task.objects.create(project=other, todolist=todolist, name='Keep', created_by=self.user)
+        self.assertEqual(self.delete([task.pk]).json(), {'deleted': 0})
+        self.assertTrue(Task.objects.filter(pk=task.pk).exists())
+
+
+class BulkWriteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Project', created_by=cls.user)
+        cls.todolists = [
+            Todolist.objects.create(project=cls.project, name=f'List {n}', created_by=cls.user) for n in range(2)
+        ]
+        other = Project.objects.create(name='Other', created_by=cls.user)
+        cls.foreign_todolist = Todolist.objects.create(project=other, name='Foreign', created_by=cls.user)
+        cls.url = reverse('api-bulk-tasks', args=[cls.project.pk])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def send(self, method, items):
+        return getattr(self.client, method)(self.url, items, content_type='application/json')
+
+    def test_create(self):
+        response = self.send('post', [
+            {'todolist': str(self.todolists[n % 2].pk), 'name': f'Task {n}', 'is_done': n < 3} for n in range(10)
+        ])
+        self.assertEqual(response.status_code, 201)
+        ids = response.json()['ids']
+        self.assertEqual(Task.objects.filter(pk__in=ids, project=self.project).count(), 10)
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.task_count, self.project.done_task_count), (10, 3))
+        self.assertEqual(find_drifted_counters(), (0, 0))
+        self.assertEqual(SearchDocument.objects.filter(model='task', object_id__in=ids).count(), 10)
+
+    def test_update(self):
+        tasks = [
+            Task.objects.create(
+                project=self.project, todolist=self.todolists[0], name=f'Task {n}', created_by=self.user
+            )
+            for n in range(4)
+        ]
+        response = self.send('patch', [
+            {'id': str(tasks[0].pk), 'name': 'Renamed'},
+            {'id': str(tasks[1].pk), 'is_done': True},
+            {'id': str(tasks[2].pk), 'todolist': str(self.todolists[1].pk)},
+        ])
+        self.assertEqual(response.json(), {'updated': 3})
+
+        self.assertEqual(SearchDocument.objects.get(object_id=tasks[0].pk).title, 'Renamed')
+        self.assertTrue(Task.objects.get(pk=tasks[1].pk).is_done)
+        self.assertEqual(SearchDocument.objects.get(object_id=tasks[2].pk).todolist_id, self.todolists[1].pk)
+        for todolist, counters in zip(self.todolists, ((3, 1), (1, 0))):
+            todolist.refresh_from_db()
+            self.assertEqual((todolist.task_count, todolist.done_task_count), counters)
+        self.assertEqual(find_drifted_counters(), (0, 0))
+
+    def test_invalid_items_are_reported_by_index_and_nothing_is_written(self):
+        response = self.send('post', [
+            {'todolist': str(self.todolists[0].pk), 'name': 'Fine'},
+            {'todolist': str(self.todolists[0].pk)},
+            {'todolist': str(self.foreign_todolist.pk), 'name': 'Elsewhere'},
+            {'todolist': 'nope', 'name': 'Bad id', 'is_done': 'maybe'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = {error['index']: error['errors'] for error in response.json()['errors']}
+        self.assertEqual(sorted(errors), [1, 3])
+        self.assertIn('name', errors[1])
+        self.assertEqual(sorted(errors[3]), ['is_done', 'todolist'])
+        self.assertFalse(Task.objects.exists())
+
+        # The todolists are checked once every item is well formed
+        response = self.send('post', [
+            {'todolist': str(self.todolists[0].pk), 'name': 'Fine'},
+            {'todolist': str(self.foreign_todolist.pk), 'name': 'Elsewhere'},
+        ])
+        self.assertEqual(response.json(), {'errors': [
+            {'index': 1, 'errors': {'todolist': ['Todolist not found in this project.']}},
+        ]})
+        self.assertFalse(Task.objects.exists())
+
+    def test_update_reports_unknown_ids(self):
+        task = Task.objects.create(project=self.project, todolist=self.todolists[0], name='Task', created_by=self.user)
+        foreign = Task.objects.create(
+            project=self.foreign_todolist.project, todolist=self.foreign_todolist, name='Foreign', created_by=self.user
+        )
+        response = self.send('patch', [{'id': str(task.pk), 'name': 'Renamed'}, {'id': str(foreign.pk), 'name': 'No'}])
+        self.assertEqual(response.json(), {'errors': [
+            {'index': 1, 'errors': {'id': ['Task not found in this project.']}},
+        ]})
+        task.refresh_from_db()
+        self.assertEqual(task.name, 'Task')
+
+    def test_bulk_update_rows_sets_auto_now_fields(self):
+        document = SearchDocument.objects.get(model='todolist', object_id=self.todolists[0].pk)
+        stale = document.updated_at - timedelta(days=1)
+        SearchDocument.objects.filter(pk=document.pk).update(updated_at=stale)
+        document.refresh_from_db()
 
-# Create your tests here.
+        document.title = 'Renamed'
+        bulk_update_rows(SearchDocument, [document], ['title'])
+        document.refresh_from_db()
+        self.assertEqual(document.title, 'Renamed')
+        self.assertGreater(document.updated_at, stale)
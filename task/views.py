@@ -1,21 +1,19 @@
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
 
-from project.models import Project
-from todolist.models import Todolist
+from project.scoping import get_task_or_404, get_todolist_or_404
 from .models import Task
 
 
 @login_required
 def add(request, project_id, todolist_id):
-    project = Project.objects.filter(created_by=request.user).get(pk=project_id)
-    todolist = Todolist.objects.filter(project=project).get(pk=todolist_id)
+    todolist = get_todolist_or_404(request.user, project_id, todolist_id)
 
     if request.method == 'POST':
         name = request.POST.get('name', '')
         description = request.POST.get('description', '')
 
-        Task.objects.create(project=project, todolist=todolist, name=name, description=description, created_by=request.user)
+        Task.objects.create(project=todolist.project, todolist=todolist, name=name, description=description, created_by=request.user)
 
         return redirect(f'/projects/{project_id}/{todolist_id}/')
 
@@ -24,9 +22,7 @@ def add(request, project_id, todolist_id):
 
 @login_required
 def detail(request, project_id, todolist_id, pk):
-    project = Project.objects.filter(created_by=request.user).get(pk=project_id)
-    todolist = Todolist.objects.filter(project=project).get(pk=todolist_id)
-    task = Task.objects.filter(project=project).filter(todolist=todolist).get(pk=pk)
+    task = get_task_or_404(request.user, project_id, todolist_id, pk)
 
     if request.GET.get('is_done', '') == 'yes':
         task.is_done = True
@@ -39,9 +35,7 @@ def detail(request, project_id, todolist_id, pk):
 
 @login_required
 def edit(request, project_id, todolist_id, pk):
-    project = Project.objects.filter(created_by=request.user).get(pk=project_id)
-    todolist = Todolist.objects.filter(project=project).get(pk=todolist_id)
-    task = Task.objects.filter(project=project).filter(todolist=todolist).get(pk=pk)
+    task = get_task_or_404(request.user, project_id, todolist_id, pk)
 
     if request.method == 'POST':
         name = request.POST.get('name', '')
@@ -62,9 +56,7 @@ def edit(request, project_id, todolist_id, pk):
 
 @login_required
 def delete(request, project_id, todolist_id, pk):
-    project = Project.objects.filter(created_by=request.user).get(pk=project_id)
-    todolist = Todolist.objects.filter(project=project).get(pk=todolist_id)
-    task = Task.objects.filter(project=project).filter(todolist=todolist).get(pk=pk)
+    task = get_task_or_404(request.user, project_id, todolist_id, pk)
     task.delete()
 
     return redirect(f'/projects/{project_id}/{todolist_id}/')
\ No newline at end of file
@@ -0,0 +1,79 @@
+from django.db import transaction
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from project.bulk import (
+    BULK_BATCH_SIZE, bulk_update_rows, error_response, get_item_list, get_owned_project, parse_ids, validate_items
+)
+from project.cache import get_project_cache
+from search.indexing import index_instances
+from .models import Todolist
+from .serializers import TodolistBulkSerializer
+
+
+@api_view(['POST', 'PATCH', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def bulk_todolists(request, project_id):
+    """Create (POST), update (PATCH) or delete (DELETE) many todolists at once
+
+    The whole batch is validated first and written in one transaction;
+    if any item is invalid nothing is written and the errors are reported
+    per item index.
+    """
+    project = get_owned_project(request, project_id)
+    items = get_item_list(request)
+
+    if request.method == 'DELETE':
+        ids, errors = parse_ids(items)
+        if errors:
+            return error_response(errors)
+        # Receivers adjust the counters, search index and cache once for the batch
+        _, deleted = Todolist.objects.filter(project=project, pk__in=ids).delete()
+        return Response({'deleted': deleted.get('todolist.Todolist', 0) + deleted.get('task.Task', 0)})
+
+    validated, errors = validate_items(TodolistBulkSerializer, items, partial=request.method == 'PATCH')
+    if errors:
+        return error_response(errors)
+
+    if request.method == 'POST':
+        todolists = [
+            Todolist(
+                project=project,
+                name=data['name'],
+                description=data.get('description', ''),
+                created_by=request.user,
+            )
+            for data in validated
+        ]
+        with transaction.atomic():
+            Todolist.objects.bulk_create(todolists, batch_size=BULK_BATCH_SIZE)
+            index_instances(todolists)
+            transaction.on_commit(lambda: get_project_cache().bump(project.pk))
+        return Response({'ids': [todolist.pk for todolist in todolists]}, status=status.HTTP_201_CREATED)
+
+    existing = Todolist.objects.filter(project=project).in_bulk([data.get('id') for data in validated])
+    errors = [
+        {'index': index, 'errors': {'id': ['Todolist not found in this project.']}}
+        for index, data in enumerate(validated)
+        if data.get('id') not in existing
+    ]
+    if errors:
+        return error_response(errors)
+
+    fields = set()
+    for data in validated:
+        todolist = existing[data['id']]
+        for field in ('name', 'description'):
+            if field in data:
+                setattr(todolist, field, data[field])
+                fields.add(field)
+
+    if fields:
+        with transaction.atomic():
+            bulk_update_rows(Todolist, existing.values(), fields)
+            if fields & {'name'}:
+                index_instances(existing.values())
+            transaction.on_commit(lambda: get_project_cache().bump(project.pk))
+    return Response({'updated': len(existing)})
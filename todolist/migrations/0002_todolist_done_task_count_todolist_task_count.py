@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todolist', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todolist',
+            name='done_task_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='todolist',
+            name='task_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
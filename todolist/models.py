@@ -12,6 +12,9 @@ class Todolist(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     created_by = models.ForeignKey(User, related_name='todolists', on_delete=models.CASCADE)
+    # Maintained by task.signals; `manage.py repair_task_counters` recomputes them
+    task_count = models.PositiveIntegerField(default=0)
+    done_task_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.name
\ No newline at end of file
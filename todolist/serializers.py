@@ -0,0 +1,10 @@
+from rest_framework import serializers
+
+from core.profiling import ProfiledSerializerMixin
+
+
+class TodolistBulkSerializer(ProfiledSerializerMixin, serializers.Serializer):
+    """One item of a bulk todolist create/update request"""
+    id = serializers.UUIDField(required=False)
+    name = serializers.CharField(max_length=255)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
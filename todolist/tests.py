@@ -1,3 +1,96 @@
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from account.models import User
+from project.cache import get_project_cache
+from project.models import Project
+from search.models import SearchDocument
+from task.counters import find_drifted_counters
+from task.models import Task
+
+from .models import Todolist
+
+
+class PageQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Project', created_by=cls.user)
+        cls.todolist = Todolist.objects.create(project=cls.project, name='List', created_by=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def add_tasks(self, count):
+        for n in range(count):
+            Task.objects.create(project=self.project, todolist=self.todolist, name=f'Task {n}', created_by=self.user)
+        get_project_cache().bump(self.project.pk)
+
+    def test_todolist_page(self):
+        url = f'/projects/{self.project.pk}/{self.todolist.pk}/'
+        # Session, user, the scoped todolist and its tasks
+        for count in (1, 50):
+            self.add_tasks(count)
+            with self.assertNumQueries(4):
+                self.assertContains(self.client.get(url), 'Task 0')
+
+    def test_edit_page(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/projects/{self.project.pk}/{self.todolist.pk}/edit/')
+        self.assertEqual(response.status_code, 200)
+
+
+class ScopingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.other = User.objects.create_user('Other', 'other@example.com', 'pw')
+        cls.project = Project.objects.create(name='Private', created_by=cls.owner)
+        cls.todolist = Todolist.objects.create(project=cls.project, name='List', created_by=cls.owner)
+
+    def test_other_users_todolist_is_404(self):
+        self.client.force_login(self.other)
+        base = f'/projects/{self.project.pk}/'
+        for url in (f'{base}{self.todolist.pk}/', f'{base}{self.todolist.pk}/edit/',
+                    f'{base}{self.todolist.pk}/delete/', f'{base}add/'):
+            # Session, user and the one scoped lookup
+            with self.subTest(url=url), self.assertNumQueries(3):
+                self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertTrue(Todolist.objects.filter(pk=self.todolist.pk).exists())
+
+    def test_todolist_under_another_project_is_404(self):
+        self.client.force_login(self.owner)
+        project = Project.objects.create(name='Second', created_by=self.owner)
+        self.assertEqual(self.client.get(f'/projects/{project.pk}/{self.todolist.pk}/').status_code, 404)
+
+
+class BulkDeleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('Owner', 'owner@example.com', 'pw')
+        cls.project = Project.objects.create(name='Project', created_by=cls.user)
+        cls.url = reverse('api-bulk-todolists', args=[cls.project.pk])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.todolists = [
+            Todolist.objects.create(project=self.project, name=f'List {n}', created_by=self.user) for n in range(3)
+        ]
+        self.client.post(reverse('api-bulk-tasks', args=[self.project.pk]), [
+            {'todolist': str(self.todolists[n % 3].pk), 'name': f'Task {n}', 'is_done': n % 2 == 0}
+            for n in range(300)
+        ], content_type='application/json')
+
+    def test_delete_lists_with_their_tasks(self):
+        ids = [str(todolist.pk) for todolist in self.todolists[:2]]
+        # Session, user and project; the lists, their tasks and the lists'
+        # locked counters; the tasks in batches of 100, the lists; the
+        # project; the search documents of both
+        with self.assertNumQueries(11):
+            response = self.client.delete(self.url, ids, content_type='application/json')
+        self.assertEqual(response.json(), {'deleted': 202})
+
+        self.assertEqual(list(Todolist.objects.filter(project=self.project)), [self.todolists[2]])
+        self.assertEqual(Task.objects.filter(project=self.project).count(), 100)
+        self.assertEqual(find_drifted_counters(), (0, 0))
+        self.assertFalse(SearchDocument.objects.filter(todolist_id__in=ids).exists())
@@ -2,23 +2,27 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
 
 from .models import Todolist
-from project.models import Project
+from project.cache import get_project_cache
+from project.scoping import get_project_or_404, get_todolist_or_404
 
 
 @login_required
 def todolist(request, project_id, pk):
-    project = Project.objects.filter(created_by=request.user).get(pk=project_id)
-    todolist = Todolist.objects.filter(project=project).get(pk=pk)
+    todolist = get_todolist_or_404(request.user, project_id, pk)
+    project = todolist.project
 
     return render(request, 'todolist/todolist.html', {
         'project': project,
-        'todolist': todolist
+        'todolist': todolist,
+        'tasks': get_project_cache().get_or_set(
+            project.pk, f'todolist:{todolist.pk}:tasks', lambda: list(todolist.tasks.all())
+        ),
     })
 
 
 @login_required
 def add(request, project_id):
-    project = Project.objects.filter(created_by=request.user).get(pk=project_id)
+    project = get_project_or_404(request.user, project_id)
 
     if request.method == 'POST':
         name = request.POST.get('name', '')
@@ -36,8 +40,8 @@ def add(request, project_id):
 
 @login_required
 def edit(request, project_id, pk):
-    project = Project.objects.filter(created_by=request.user).get(pk=project_id)
-    todolist = Todolist.objects.filter(project=project).get(pk=pk)
+    todolist = get_todolist_or_404(request.user, project_id, pk)
+    project = todolist.project
 
     if request.method == 'POST':
         name = request.POST.get('name', '')
@@ -58,8 +62,7 @@ def edit(request, project_id, pk):
 
 @login_required
 def delete(request, project_id, pk):
-    project = Project.objects.filter(created_by=request.user).get(pk=project_id)
-    todolist = Todolist.objects.filter(project=project).get(pk=pk)
+    todolist = get_todolist_or_404(request.user, project_id, pk)
     todolist.delete()
 
     return redirect(f'/projects/{project_id}/')
\ No newline at end of file